@@ -0,0 +1,75 @@
+# pragma version ~=0.4.3
+"""
+@title Minimal ERC20, shared by the mock tokens
+"""
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+event Approval:
+    owner: indexed(address)
+    spender: indexed(address)
+    value: uint256
+
+
+name: public(String[32])
+symbol: public(String[32])
+decimals: public(uint8)
+totalSupply: public(uint256)
+balanceOf: public(HashMap[address, uint256])
+allowance: public(HashMap[address, HashMap[address, uint256]])
+
+
+@deploy
+def __init__(name_: String[32], symbol_: String[32], decimals_: uint8):
+    self.name = name_
+    self.symbol = symbol_
+    self.decimals = decimals_
+
+
+@external
+def transfer(to: address, amount: uint256) -> bool:
+    self._transfer(msg.sender, to, amount)
+    return True
+
+
+@external
+def approve(spender: address, amount: uint256) -> bool:
+    self.allowance[msg.sender][spender] = amount
+    log Approval(owner=msg.sender, spender=spender, value=amount)
+    return True
+
+
+@external
+def transferFrom(owner: address, to: address, amount: uint256) -> bool:
+    allowed: uint256 = self.allowance[owner][msg.sender]
+    if allowed != max_value(uint256):
+        assert allowed >= amount, "erc20: insufficient allowance"
+        self.allowance[owner][msg.sender] = allowed - amount
+    self._transfer(owner, to, amount)
+    return True
+
+
+@internal
+def _transfer(owner: address, to: address, amount: uint256):
+    assert self.balanceOf[owner] >= amount, "erc20: transfer amount exceeds balance"
+    self.balanceOf[owner] -= amount
+    self.balanceOf[to] += amount
+    log Transfer(sender=owner, receiver=to, value=amount)
+
+
+@internal
+def _mint(to: address, amount: uint256):
+    self.totalSupply += amount
+    self.balanceOf[to] += amount
+    log Transfer(sender=empty(address), receiver=to, value=amount)
+
+
+@internal
+def _burn(owner: address, amount: uint256):
+    assert self.balanceOf[owner] >= amount, "erc20: burn amount exceeds balance"
+    self.balanceOf[owner] -= amount
+    self.totalSupply -= amount
+    log Transfer(sender=owner, receiver=empty(address), value=amount)
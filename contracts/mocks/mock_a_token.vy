@@ -0,0 +1,165 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Aave v3 aToken
+@notice Balances are stored scaled by the reserve liquidity index, so they
+        grow with the interest accrued by the pool, like the real aToken.
+        Minting and burning is done by the pool, which does the index math.
+        As in Aave v3, the interest accrued since an account's last action
+        is folded into its next Mint/Burn (and their Transfer), reported as
+        `balanceIncrease`.
+"""
+from ethereum.ercs import IERC20
+
+
+interface IPool:
+    def getReserveNormalizedIncome(asset: address) -> uint256: view
+
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+event Approval:
+    owner: indexed(address)
+    spender: indexed(address)
+    value: uint256
+
+event Mint:
+    caller: indexed(address)
+    onBehalfOf: indexed(address)
+    value: uint256
+    balanceIncrease: uint256
+    index: uint256
+
+event Burn:
+    sender: indexed(address)
+    target: indexed(address)
+    value: uint256
+    balanceIncrease: uint256
+    index: uint256
+
+
+RAY: constant(uint256) = 10 ** 27
+
+POOL: public(immutable(address))
+UNDERLYING_ASSET_ADDRESS: public(immutable(address))
+
+name: public(String[32])
+symbol: public(String[32])
+decimals: public(uint8)
+scaledBalanceOf: public(HashMap[address, uint256])
+scaledTotalSupply: public(uint256)
+allowance: public(HashMap[address, HashMap[address, uint256]])
+userIndex: HashMap[address, uint256]  # index of the account's last action
+
+
+@deploy
+def __init__(pool: address, underlying: address, name_: String[32], symbol_: String[32], decimals_: uint8):
+    POOL = pool
+    UNDERLYING_ASSET_ADDRESS = underlying
+    self.name = name_
+    self.symbol = symbol_
+    self.decimals = decimals_
+
+
+@internal
+@view
+def _index() -> uint256:
+    return staticcall IPool(POOL).getReserveNormalizedIncome(UNDERLYING_ASSET_ADDRESS)
+
+
+@internal
+def _accrue(account: address, index: uint256) -> uint256:
+    """Interest accrued since the account's last action, moves it to `index`."""
+    scaled: uint256 = self.scaledBalanceOf[account]
+    balance_increase: uint256 = scaled * index // RAY - scaled * self.userIndex[account] // RAY
+    self.userIndex[account] = index
+    return balance_increase
+
+
+@internal
+def _mint_increase(caller: address, account: address, index: uint256):
+    balance_increase: uint256 = self._accrue(account, index)
+    if balance_increase > 0:
+        log Transfer(sender=empty(address), receiver=account, value=balance_increase)
+        log Mint(caller=caller, onBehalfOf=account, value=balance_increase, balanceIncrease=balance_increase, index=index)
+
+
+@external
+@view
+def balanceOf(account: address) -> uint256:
+    return self.scaledBalanceOf[account] * self._index() // RAY
+
+
+@external
+@view
+def totalSupply() -> uint256:
+    return self.scaledTotalSupply * self._index() // RAY
+
+
+@external
+def transfer(to: address, amount: uint256) -> bool:
+    self._transfer(msg.sender, to, amount)
+    return True
+
+
+@external
+def approve(spender: address, amount: uint256) -> bool:
+    self.allowance[msg.sender][spender] = amount
+    log Approval(owner=msg.sender, spender=spender, value=amount)
+    return True
+
+
+@external
+def transferFrom(owner: address, to: address, amount: uint256) -> bool:
+    allowed: uint256 = self.allowance[owner][msg.sender]
+    if allowed != max_value(uint256):
+        assert allowed >= amount, "aToken: insufficient allowance"
+        self.allowance[owner][msg.sender] = allowed - amount
+    self._transfer(owner, to, amount)
+    return True
+
+
+@internal
+def _transfer(owner: address, to: address, amount: uint256):
+    index: uint256 = self._index()
+    scaled: uint256 = self.scaledBalanceOf[owner]
+    balance: uint256 = scaled * index // RAY
+    assert amount <= balance, "aToken: transfer amount exceeds balance"
+    scaled_amount: uint256 = scaled
+    if amount != balance:
+        scaled_amount = (amount * RAY + index // 2) // index
+    self._mint_increase(msg.sender, owner, index)
+    if to != owner:
+        self._mint_increase(msg.sender, to, index)
+    self.scaledBalanceOf[owner] = scaled - scaled_amount
+    self.scaledBalanceOf[to] += scaled_amount
+    log Transfer(sender=owner, receiver=to, value=amount)
+
+
+@external
+def mint(caller: address, onBehalfOf: address, scaledAmount: uint256, amount: uint256):
+    assert msg.sender == POOL, "aToken: caller must be pool"
+    index: uint256 = self._index()
+    balance_increase: uint256 = self._accrue(onBehalfOf, index)
+    self.scaledBalanceOf[onBehalfOf] += scaledAmount
+    self.scaledTotalSupply += scaledAmount
+    log Transfer(sender=empty(address), receiver=onBehalfOf, value=amount + balance_increase)
+    log Mint(caller=caller, onBehalfOf=onBehalfOf, value=amount + balance_increase, balanceIncrease=balance_increase, index=index)
+
+
+@external
+def burn(owner: address, receiver: address, scaledAmount: uint256, amount: uint256):
+    assert msg.sender == POOL, "aToken: caller must be pool"
+    index: uint256 = self._index()
+    balance_increase: uint256 = self._accrue(owner, index)
+    self.scaledBalanceOf[owner] -= scaledAmount
+    self.scaledTotalSupply -= scaledAmount
+    if balance_increase > amount:  # Aave mints the difference instead
+        log Transfer(sender=empty(address), receiver=owner, value=balance_increase - amount)
+        log Mint(caller=owner, onBehalfOf=owner, value=balance_increase - amount, balanceIncrease=balance_increase, index=index)
+    else:
+        log Transfer(sender=owner, receiver=empty(address), value=amount - balance_increase)
+        log Burn(sender=owner, target=receiver, value=amount - balance_increase, balanceIncrease=balance_increase, index=index)
+    assert extcall IERC20(UNDERLYING_ASSET_ADDRESS).transfer(receiver, amount)
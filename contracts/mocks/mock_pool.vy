@@ -0,0 +1,291 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Aave v3 Pool
+@notice Supply and withdraw with a liquidity index growing linearly at a
+        configurable rate. No borrowing: health factor is always max.
+        Collateral is valued in USD with 8 decimals from each reserve price feed.
+"""
+from ethereum.ercs import IERC20
+
+
+interface IAToken:
+    def scaledBalanceOf(account: address) -> uint256: view
+    def mint(caller: address, onBehalfOf: address, scaledAmount: uint256, amount: uint256): nonpayable
+    def burn(owner: address, receiver: address, scaledAmount: uint256, amount: uint256): nonpayable
+
+interface IAggregator:
+    def latestAnswer() -> int256: view
+    def decimals() -> uint8: view
+
+interface IERC20Metadata:
+    def decimals() -> uint8: view
+
+
+event Supply:
+    reserve: indexed(address)
+    user: address
+    onBehalfOf: indexed(address)
+    amount: uint256
+    referralCode: indexed(uint16)
+
+event Withdraw:
+    reserve: indexed(address)
+    user: indexed(address)
+    to: indexed(address)
+    amount: uint256
+
+event ReserveDataUpdated:
+    reserve: indexed(address)
+    liquidityRate: uint256
+    stableBorrowRate: uint256
+    variableBorrowRate: uint256
+    liquidityIndex: uint256
+    variableBorrowIndex: uint256
+
+
+struct Reserve:
+    aToken: address
+    variableDebtToken: address
+    priceFeed: address
+    decimals: uint8
+    id: uint16
+    liquidityRate: uint256  # ray, yearly
+    liquidityIndex: uint256  # ray
+    lastUpdateTimestamp: uint256
+
+struct ReserveConfigurationMap:
+    data: uint256
+
+# Same layout as IPool.getReserveData (ReserveDataLegacy)
+struct ReserveData:
+    configuration: ReserveConfigurationMap
+    liquidityIndex: uint128
+    currentLiquidityRate: uint128
+    variableBorrowIndex: uint128
+    currentVariableBorrowRate: uint128
+    currentStableBorrowRate: uint128
+    lastUpdateTimestamp: uint40
+    id: uint16
+    aTokenAddress: address
+    stableDebtTokenAddress: address
+    variableDebtTokenAddress: address
+    interestRateStrategyAddress: address
+    accruedToTreasury: uint128
+    unbacked: uint128
+    isolationModeTotalDebt: uint128
+
+
+MAX_RESERVES: constant(uint256) = 128
+RAY: constant(uint256) = 10 ** 27
+SECONDS_PER_YEAR: constant(uint256) = 365 * 24 * 60 * 60
+PERCENTAGE_FACTOR: constant(uint256) = 10_000
+BASE_CURRENCY_DECIMALS: constant(uint256) = 8
+
+owner: public(address)
+ltv: public(uint256)
+liquidationThreshold: public(uint256)
+reserves: HashMap[address, Reserve]
+reservesList: DynArray[address, MAX_RESERVES]
+
+
+@deploy
+def __init__():
+    self.owner = msg.sender
+    self.ltv = 8_000
+    self.liquidationThreshold = 8_250
+
+
+# ------------------------------------------------------------------
+#                             ADMIN
+# ------------------------------------------------------------------
+@external
+def initReserve(asset: address, aTokenAddress: address, variableDebtAddress: address):
+    assert msg.sender == self.owner, "Pool: caller is not the owner"
+    assert self.reserves[asset].aToken == empty(address), "Pool: reserve already initialized"
+    self.reserves[asset] = Reserve(
+        aToken=aTokenAddress,
+        variableDebtToken=variableDebtAddress,
+        priceFeed=empty(address),
+        decimals=staticcall IERC20Metadata(asset).decimals(),
+        id=convert(len(self.reservesList), uint16),
+        liquidityRate=0,
+        liquidityIndex=RAY,
+        lastUpdateTimestamp=block.timestamp,
+    )
+    self.reservesList.append(asset)
+
+
+@external
+def configureReserve(asset: address, priceFeed: address, liquidityRate: uint256):
+    """
+    @param priceFeed Chainlink USD feed used for getUserAccountData
+    @param liquidityRate Yearly supply rate in ray, 3% is 3 * 10**25
+    """
+    assert msg.sender == self.owner, "Pool: caller is not the owner"
+    self._update_state(asset)
+    self.reserves[asset].priceFeed = priceFeed
+    self.reserves[asset].liquidityRate = liquidityRate
+
+
+# ------------------------------------------------------------------
+#                           INTERNAL
+# ------------------------------------------------------------------
+@internal
+@pure
+def _ray_mul(a: uint256, b: uint256) -> uint256:
+    return (a * b + RAY // 2) // RAY
+
+
+@internal
+@pure
+def _ray_div(a: uint256, b: uint256) -> uint256:
+    return (a * RAY + b // 2) // b
+
+
+@internal
+@view
+def _normalized_income(asset: address) -> uint256:
+    reserve: Reserve = self.reserves[asset]
+    if reserve.lastUpdateTimestamp == block.timestamp:
+        return reserve.liquidityIndex
+    elapsed: uint256 = block.timestamp - reserve.lastUpdateTimestamp
+    return self._ray_mul(reserve.liquidityIndex, RAY + reserve.liquidityRate * elapsed // SECONDS_PER_YEAR)
+
+
+@internal
+def _update_state(asset: address) -> uint256:
+    assert self.reserves[asset].aToken != empty(address), "Pool: reserve not initialized"
+    index: uint256 = self._normalized_income(asset)
+    self.reserves[asset].liquidityIndex = index
+    self.reserves[asset].lastUpdateTimestamp = block.timestamp
+    log ReserveDataUpdated(
+        reserve=asset,
+        liquidityRate=self.reserves[asset].liquidityRate,
+        stableBorrowRate=0,
+        variableBorrowRate=0,
+        liquidityIndex=index,
+        variableBorrowIndex=RAY,
+    )
+    return index
+
+
+# ------------------------------------------------------------------
+#                           EXTERNAL
+# ------------------------------------------------------------------
+@external
+def supply(asset: address, amount: uint256, onBehalfOf: address, referralCode: uint16):
+    assert amount > 0, "Pool: invalid amount"
+    index: uint256 = self._update_state(asset)
+    a_token: address = self.reserves[asset].aToken
+    assert extcall IERC20(asset).transferFrom(msg.sender, a_token, amount)
+    extcall IAToken(a_token).mint(msg.sender, onBehalfOf, self._ray_div(amount, index), amount)
+    log Supply(reserve=asset, user=msg.sender, onBehalfOf=onBehalfOf, amount=amount, referralCode=referralCode)
+
+
+@external
+def withdraw(asset: address, amount: uint256, to: address) -> uint256:
+    index: uint256 = self._update_state(asset)
+    a_token: address = self.reserves[asset].aToken
+    scaled_balance: uint256 = staticcall IAToken(a_token).scaledBalanceOf(msg.sender)
+    balance: uint256 = scaled_balance * index // RAY
+
+    amount_to_withdraw: uint256 = amount
+    if amount == max_value(uint256):
+        amount_to_withdraw = balance
+    assert amount_to_withdraw > 0, "Pool: invalid amount"
+    assert amount_to_withdraw <= balance, "Pool: not enough available user balance"
+
+    scaled_amount: uint256 = scaled_balance
+    if amount_to_withdraw != balance:
+        scaled_amount = self._ray_div(amount_to_withdraw, index)
+    extcall IAToken(a_token).burn(msg.sender, to, scaled_amount, amount_to_withdraw)
+    log Withdraw(reserve=asset, user=msg.sender, to=to, amount=amount_to_withdraw)
+    return amount_to_withdraw
+
+
+@external
+@view
+def getReserveNormalizedIncome(asset: address) -> uint256:
+    return self._normalized_income(asset)
+
+
+@external
+@view
+def getReservesCount() -> uint256:
+    return len(self.reservesList)
+
+
+@external
+@view
+def getReservesList() -> DynArray[address, MAX_RESERVES]:
+    return self.reservesList
+
+
+@external
+@view
+def getReserveAToken(asset: address) -> address:
+    return self.reserves[asset].aToken
+
+
+@external
+@view
+def getReserveVariableDebtToken(asset: address) -> address:
+    return self.reserves[asset].variableDebtToken
+
+
+@external
+@view
+def getReserveData(asset: address) -> ReserveData:
+    reserve: Reserve = self.reserves[asset]
+    return ReserveData(
+        configuration=ReserveConfigurationMap(data=0),
+        liquidityIndex=convert(reserve.liquidityIndex, uint128),
+        currentLiquidityRate=convert(reserve.liquidityRate, uint128),
+        variableBorrowIndex=convert(RAY, uint128),
+        currentVariableBorrowRate=0,
+        currentStableBorrowRate=0,
+        lastUpdateTimestamp=convert(reserve.lastUpdateTimestamp, uint40),
+        id=reserve.id,
+        aTokenAddress=reserve.aToken,
+        stableDebtTokenAddress=empty(address),
+        variableDebtTokenAddress=reserve.variableDebtToken,
+        interestRateStrategyAddress=empty(address),
+        accruedToTreasury=0,
+        unbacked=0,
+        isolationModeTotalDebt=0,
+    )
+
+
+@external
+@view
+def getUserAccountData(user: address) -> (uint256, uint256, uint256, uint256, uint256, uint256):
+    """
+    @return totalCollateralBase, totalDebtBase, availableBorrowsBase,
+            currentLiquidationThreshold, ltv, healthFactor
+    """
+    total_collateral: uint256 = 0
+    for asset: address in self.reservesList:
+        reserve: Reserve = self.reserves[asset]
+        if reserve.priceFeed == empty(address):
+            continue
+        scaled_balance: uint256 = staticcall IAToken(reserve.aToken).scaledBalanceOf(user)
+        if scaled_balance == 0:
+            continue
+        balance: uint256 = scaled_balance * self._normalized_income(asset) // RAY
+        answer: uint256 = convert(staticcall IAggregator(reserve.priceFeed).latestAnswer(), uint256)
+        feed_decimals: uint256 = convert(staticcall IAggregator(reserve.priceFeed).decimals(), uint256)
+        value: uint256 = balance * answer // 10 ** convert(reserve.decimals, uint256)
+        if feed_decimals > BASE_CURRENCY_DECIMALS:
+            value = value // 10 ** (feed_decimals - BASE_CURRENCY_DECIMALS)
+        else:
+            value = value * 10 ** (BASE_CURRENCY_DECIMALS - feed_decimals)
+        total_collateral += value
+
+    return (
+        total_collateral,
+        0,
+        total_collateral * self.ltv // PERCENTAGE_FACTOR,
+        self.liquidationThreshold,
+        self.ltv,
+        max_value(uint256),
+    )
@@ -0,0 +1,27 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Aave v3 PoolAddressesProvider
+"""
+
+owner: public(address)
+getPool: public(address)
+getPoolDataProvider: public(address)
+
+
+@deploy
+def __init__(pool: address, pool_data_provider: address):
+    self.owner = msg.sender
+    self.getPool = pool
+    self.getPoolDataProvider = pool_data_provider
+
+
+@external
+def setPoolImpl(newPoolImpl: address):
+    assert msg.sender == self.owner, "Ownable: caller is not the owner"
+    self.getPool = newPoolImpl
+
+
+@external
+def setPoolDataProvider(newDataProvider: address):
+    assert msg.sender == self.owner, "Ownable: caller is not the owner"
+    self.getPoolDataProvider = newDataProvider
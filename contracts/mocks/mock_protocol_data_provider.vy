@@ -0,0 +1,77 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Aave v3 AaveProtocolDataProvider
+@notice Read-only views over the mock pool reserves.
+"""
+
+interface IPool:
+    def getReservesList() -> DynArray[address, MAX_RESERVES]: view
+    def getReserveAToken(asset: address) -> address: view
+    def getReserveVariableDebtToken(asset: address) -> address: view
+    def ltv() -> uint256: view
+    def liquidationThreshold() -> uint256: view
+
+interface IERC20Metadata:
+    def symbol() -> String[32]: view
+    def decimals() -> uint8: view
+
+
+struct TokenData:
+    symbol: String[32]
+    tokenAddress: address
+
+
+MAX_RESERVES: constant(uint256) = 128
+LIQUIDATION_BONUS: constant(uint256) = 10_500
+RESERVE_FACTOR: constant(uint256) = 1_000
+
+POOL: public(immutable(address))
+
+
+@deploy
+def __init__(pool: address):
+    POOL = pool
+
+
+@external
+@view
+def getAllReservesTokens() -> DynArray[TokenData, MAX_RESERVES]:
+    tokens: DynArray[TokenData, MAX_RESERVES] = []
+    for asset: address in staticcall IPool(POOL).getReservesList():
+        tokens.append(TokenData(symbol=staticcall IERC20Metadata(asset).symbol(), tokenAddress=asset))
+    return tokens
+
+
+@external
+@view
+def getReserveTokensAddresses(asset: address) -> (address, address, address):
+    """
+    @return aTokenAddress, stableDebtTokenAddress, variableDebtTokenAddress
+    """
+    return (
+        staticcall IPool(POOL).getReserveAToken(asset),
+        empty(address),
+        staticcall IPool(POOL).getReserveVariableDebtToken(asset),
+    )
+
+
+@external
+@view
+def getReserveConfigurationData(asset: address) -> (uint256, uint256, uint256, uint256, uint256, bool, bool, bool, bool, bool):
+    """
+    @return decimals, ltv, liquidationThreshold, liquidationBonus, reserveFactor,
+            usageAsCollateralEnabled, borrowingEnabled, stableBorrowRateEnabled, isActive, isFrozen
+    """
+    assert staticcall IPool(POOL).getReserveAToken(asset) != empty(address), "DataProvider: unknown reserve"
+    return (
+        convert(staticcall IERC20Metadata(asset).decimals(), uint256),
+        staticcall IPool(POOL).ltv(),
+        staticcall IPool(POOL).liquidationThreshold(),
+        LIQUIDATION_BONUS,
+        RESERVE_FACTOR,
+        True,
+        False,
+        False,
+        True,
+        False,
+    )
@@ -0,0 +1,37 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Uniswap v3 QuoterV2
+@notice Quotes exact input swaps against the pools of the mock SwapRouter02.
+        Reverts if the pool does not exist, like the real quoter.
+"""
+
+interface ISwapRouter:
+    def getAmountOut(tokenIn: address, tokenOut: address, fee: uint24, amountIn: uint256) -> uint256: view
+
+
+struct QuoteExactInputSingleParams:
+    tokenIn: address
+    tokenOut: address
+    amountIn: uint256
+    fee: uint24
+    sqrtPriceLimitX96: uint160
+
+
+QUOTE_GAS_ESTIMATE: constant(uint256) = 100_000  # gas of one exactInputSingle on the mock router
+
+router: public(immutable(address))
+
+
+@deploy
+def __init__(router_: address):
+    router = router_
+
+
+@external
+@view
+def quoteExactInputSingle(params: QuoteExactInputSingleParams) -> (uint256, uint160, uint32, uint256):
+    """
+    @return amountOut, sqrtPriceX96After (not tracked), initializedTicksCrossed (always 0), gasEstimate
+    """
+    amount_out: uint256 = staticcall ISwapRouter(router).getAmountOut(params.tokenIn, params.tokenOut, params.fee, params.amountIn)
+    return (amount_out, 0, 0, QUOTE_GAS_ESTIMATE)
@@ -0,0 +1,112 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Uniswap v3 SwapRouter02
+@notice One constant-product (x * y = k) pool per token pair and fee tier,
+        held by the router itself. Fees are in hundredths of a bip like
+        Uniswap v3, 3000 is 0.3%. sqrtPriceLimitX96 is ignored.
+"""
+from ethereum.ercs import IERC20
+
+
+# Same signature as the Uniswap v3 pool event, emitted by the router
+event Swap:
+    sender: indexed(address)
+    recipient: indexed(address)
+    amount0: int256
+    amount1: int256
+    sqrtPriceX96: uint160
+    liquidity: uint128
+    tick: int24  # not tracked, always 0
+
+event LiquidityAdded:
+    tokenA: indexed(address)
+    tokenB: indexed(address)
+    fee: indexed(uint24)
+    amountA: uint256
+    amountB: uint256
+
+
+struct ExactInputSingleParams:
+    tokenIn: address
+    tokenOut: address
+    fee: uint24
+    recipient: address
+    amountIn: uint256
+    amountOutMinimum: uint256
+    sqrtPriceLimitX96: uint160
+
+
+FEE_DENOMINATOR: constant(uint256) = 1_000_000
+
+WETH9: public(immutable(address))
+
+# token -> other token -> fee -> reserve of token in the (token, other token, fee) pool
+reserves: public(HashMap[address, HashMap[address, HashMap[uint24, uint256]]])
+
+
+@deploy
+def __init__(weth9: address):
+    WETH9 = weth9
+
+
+@internal
+@view
+def _amount_out(token_in: address, token_out: address, fee: uint24, amount_in: uint256) -> uint256:
+    reserve_in: uint256 = self.reserves[token_in][token_out][fee]
+    reserve_out: uint256 = self.reserves[token_out][token_in][fee]
+    assert reserve_in > 0 and reserve_out > 0, "SwapRouter: pool does not exist"
+    amount_in_after_fee: uint256 = amount_in * (FEE_DENOMINATOR - convert(fee, uint256)) // FEE_DENOMINATOR
+    return reserve_out * amount_in_after_fee // (reserve_in + amount_in_after_fee)
+
+
+@external
+def addLiquidity(tokenA: address, tokenB: address, fee: uint24, amountA: uint256, amountB: uint256):
+    assert tokenA != tokenB, "SwapRouter: identical tokens"
+    assert convert(fee, uint256) < FEE_DENOMINATOR, "SwapRouter: invalid fee"
+    assert extcall IERC20(tokenA).transferFrom(msg.sender, self, amountA)
+    assert extcall IERC20(tokenB).transferFrom(msg.sender, self, amountB)
+    self.reserves[tokenA][tokenB][fee] += amountA
+    self.reserves[tokenB][tokenA][fee] += amountB
+    log LiquidityAdded(tokenA=tokenA, tokenB=tokenB, fee=fee, amountA=amountA, amountB=amountB)
+
+
+@external
+@view
+def getAmountOut(tokenIn: address, tokenOut: address, fee: uint24, amountIn: uint256) -> uint256:
+    return self._amount_out(tokenIn, tokenOut, fee, amountIn)
+
+
+@external
+@payable
+def exactInputSingle(params: ExactInputSingleParams) -> uint256:
+    amount_out: uint256 = self._amount_out(params.tokenIn, params.tokenOut, params.fee, params.amountIn)
+    assert amount_out >= params.amountOutMinimum, "Too little received"
+
+    assert extcall IERC20(params.tokenIn).transferFrom(msg.sender, self, params.amountIn)
+    self.reserves[params.tokenIn][params.tokenOut][params.fee] += params.amountIn
+    self.reserves[params.tokenOut][params.tokenIn][params.fee] -= amount_out
+    assert extcall IERC20(params.tokenOut).transfer(params.recipient, amount_out)
+
+    # Uniswap orders a pool's tokens by address, amounts are + into the pool and - out of it
+    token0: address = params.tokenIn
+    token1: address = params.tokenOut
+    amount0: int256 = convert(params.amountIn, int256)
+    amount1: int256 = -convert(amount_out, int256)
+    if convert(params.tokenOut, uint256) < convert(params.tokenIn, uint256):
+        token0 = params.tokenOut
+        token1 = params.tokenIn
+        amount0 = -convert(amount_out, int256)
+        amount1 = convert(params.amountIn, int256)
+
+    reserve0: uint256 = self.reserves[token0][token1][params.fee]
+    reserve1: uint256 = self.reserves[token1][token0][params.fee]
+    log Swap(
+        sender=msg.sender,
+        recipient=params.recipient,
+        amount0=amount0,
+        amount1=amount1,
+        sqrtPriceX96=convert(isqrt(reserve1 * 2 ** 96 // reserve0) * 2 ** 48, uint160),
+        liquidity=convert(isqrt(reserve0 * reserve1), uint128),
+        tick=0,
+    )
+    return amount_out
@@ -0,0 +1,63 @@
+# pragma version ~=0.4.3
+"""
+@title Mock USDC
+@notice Same minting roles as FiatTokenV2: the owner sets the master minter,
+        the master minter configures minters and their allowance.
+"""
+from . import erc20
+
+initializes: erc20
+
+exports: erc20.__interface__
+
+
+event MasterMinterChanged:
+    newMasterMinter: indexed(address)
+
+event MinterConfigured:
+    minter: indexed(address)
+    minterAllowedAmount: uint256
+
+event Mint:
+    minter: indexed(address)
+    to: indexed(address)
+    amount: uint256
+
+
+owner: public(address)
+masterMinter: public(address)
+isMinter: public(HashMap[address, bool])
+minterAllowance: public(HashMap[address, uint256])
+
+
+@deploy
+def __init__():
+    erc20.__init__("USD Coin", "USDC", 6)
+    self.owner = msg.sender
+    self.masterMinter = msg.sender
+
+
+@external
+def updateMasterMinter(_newMasterMinter: address):
+    assert msg.sender == self.owner, "Ownable: caller is not the owner"
+    self.masterMinter = _newMasterMinter
+    log MasterMinterChanged(newMasterMinter=_newMasterMinter)
+
+
+@external
+def configureMinter(minter: address, minterAllowedAmount: uint256) -> bool:
+    assert msg.sender == self.masterMinter, "FiatToken: caller is not the masterMinter"
+    self.isMinter[minter] = True
+    self.minterAllowance[minter] = minterAllowedAmount
+    log MinterConfigured(minter=minter, minterAllowedAmount=minterAllowedAmount)
+    return True
+
+
+@external
+def mint(_to: address, _amount: uint256) -> bool:
+    assert self.isMinter[msg.sender], "FiatToken: caller is not a minter"
+    assert _amount <= self.minterAllowance[msg.sender], "FiatToken: mint amount exceeds minterAllowance"
+    self.minterAllowance[msg.sender] -= _amount
+    erc20._mint(_to, _amount)
+    log Mint(minter=msg.sender, to=_to, amount=_amount)
+    return True
@@ -0,0 +1,74 @@
+# pragma version ~=0.4.3
+"""
+@title Mock Chainlink price feed
+@notice Anyone can push a new answer, every update opens a new round.
+"""
+
+event AnswerUpdated:
+    current: indexed(int256)
+    roundId: indexed(uint256)
+    updatedAt: uint256
+
+event NewRound:
+    roundId: indexed(uint256)
+    startedBy: indexed(address)
+    startedAt: uint256
+
+
+version: public(constant(uint256)) = 4
+
+decimals: public(uint8)
+description: public(String[64])
+latestAnswer: public(int256)
+latestTimestamp: public(uint256)
+latestRound: public(uint256)
+getAnswer: public(HashMap[uint256, int256])
+getTimestamp: public(HashMap[uint256, uint256])
+getStartedAt: public(HashMap[uint256, uint256])
+
+
+@deploy
+def __init__(decimals_: uint8, initial_answer: int256, description_: String[64]):
+    self.decimals = decimals_
+    self.description = description_
+    self._update_round_data(1, initial_answer, block.timestamp, block.timestamp)
+
+
+@internal
+def _update_round_data(round_id: uint256, answer: int256, timestamp: uint256, started_at: uint256):
+    self.latestRound = round_id
+    self.latestAnswer = answer
+    self.latestTimestamp = timestamp
+    self.getAnswer[round_id] = answer
+    self.getTimestamp[round_id] = timestamp
+    self.getStartedAt[round_id] = started_at
+    log NewRound(roundId=round_id, startedBy=msg.sender, startedAt=started_at)
+    log AnswerUpdated(current=answer, roundId=round_id, updatedAt=timestamp)
+
+
+@external
+def updateAnswer(answer: int256):
+    self._update_round_data(self.latestRound + 1, answer, block.timestamp, block.timestamp)
+
+
+@external
+def updateRoundData(roundId: uint80, answer: int256, timestamp: uint256, startedAt: uint256):
+    """
+    @notice Write a round with any id and time, e.g. to replay a price history
+    """
+    self._update_round_data(convert(roundId, uint256), answer, timestamp, startedAt)
+
+
+@external
+@view
+def getRoundData(_roundId: uint80) -> (uint80, int256, uint256, uint256, uint80):
+    round_id: uint256 = convert(_roundId, uint256)
+    assert self.getTimestamp[round_id] != 0, "No data present"
+    return (_roundId, self.getAnswer[round_id], self.getStartedAt[round_id], self.getTimestamp[round_id], _roundId)
+
+
+@external
+@view
+def latestRoundData() -> (uint80, int256, uint256, uint256, uint80):
+    round_id: uint80 = convert(self.latestRound, uint80)
+    return (round_id, self.latestAnswer, self.getStartedAt[self.latestRound], self.latestTimestamp, round_id)
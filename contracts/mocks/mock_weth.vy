@@ -0,0 +1,37 @@
+# pragma version ~=0.4.3
+"""
+@title Mock WETH9
+"""
+from . import erc20
+
+initializes: erc20
+
+exports: erc20.__interface__
+
+
+event Deposit:
+    dst: indexed(address)
+    wad: uint256
+
+event Withdrawal:
+    src: indexed(address)
+    wad: uint256
+
+
+@deploy
+def __init__():
+    erc20.__init__("Wrapped Ether", "WETH", 18)
+
+
+@external
+@payable
+def deposit():
+    erc20._mint(msg.sender, msg.value)
+    log Deposit(dst=msg.sender, wad=msg.value)
+
+
+@external
+def withdraw(wad: uint256):
+    erc20._burn(msg.sender, wad)
+    send(msg.sender, wad)
+    log Withdrawal(src=msg.sender, wad=wad)
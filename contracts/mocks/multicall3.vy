@@ -0,0 +1,56 @@
+# pragma version ~=0.4.3
+"""
+@title Read-only Multicall3
+@notice The view subset of Multicall3 used by script/_multicall.py,
+        for local networks where the canonical deployment does not exist.
+"""
+
+MAX_CALLS: constant(uint256) = 500  # script/_multicall.py MAX_CALLS_PER_BATCH
+MAX_DATA: constant(uint256) = 1024
+
+
+struct Call3:
+    target: address
+    allowFailure: bool
+    callData: Bytes[MAX_DATA]
+
+struct Result:
+    success: bool
+    returnData: Bytes[MAX_DATA]
+
+
+@external
+@view
+def aggregate3(calls: DynArray[Call3, MAX_CALLS]) -> DynArray[Result, MAX_CALLS]:
+    results: DynArray[Result, MAX_CALLS] = []
+    for call: Call3 in calls:
+        success: bool = False
+        data: Bytes[MAX_DATA] = b""
+        success, data = raw_call(
+            call.target,
+            call.callData,
+            max_outsize=MAX_DATA,
+            is_static_call=True,
+            revert_on_failure=False,
+        )
+        assert success or call.allowFailure, "Multicall3: call failed"
+        results.append(Result(success=success, returnData=data))
+    return results
+
+
+@external
+@view
+def getBlockNumber() -> uint256:
+    return block.number
+
+
+@external
+@view
+def getCurrentBlockTimestamp() -> uint256:
+    return block.timestamp
+
+
+@external
+@view
+def getEthBalance(addr: address) -> uint256:
+    return addr.balance
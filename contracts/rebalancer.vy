@@ -0,0 +1,113 @@
+# pragma version ~=0.4.3
+"""
+@title Atomic Aave v3 / Uniswap v3 rebalancer
+@notice Moves the overweight part of an Aave position into the underweight
+        asset in one transaction: pull the caller's aTokens, withdraw them,
+        swap along up to two Uniswap v3 pools, supply the output on behalf
+        of the caller. Reverts as a whole, so a position is never left
+        half-rebalanced. The caller approves the aToken once; nothing is
+        kept by the contract between calls.
+"""
+from ethereum.ercs import IERC20
+
+
+interface IPoolAddressesProvider:
+    def getPool() -> address: view
+
+interface IPool:
+    def withdraw(asset: address, amount: uint256, to: address) -> uint256: nonpayable
+    def supply(asset: address, amount: uint256, onBehalfOf: address, referralCode: uint16): nonpayable
+
+
+struct ExactInputSingleParams:
+    tokenIn: address
+    tokenOut: address
+    fee: uint24
+    recipient: address
+    amountIn: uint256
+    amountOutMinimum: uint256
+    sqrtPriceLimitX96: uint160
+
+interface ISwapRouter:
+    def exactInputSingle(params: ExactInputSingleParams) -> uint256: payable
+
+
+# One pool of a route, as planned off-chain from the quoter
+struct Leg:
+    fee: uint24
+    amountIn: uint256
+    amountOutMinimum: uint256
+
+
+event Rebalanced:
+    account: indexed(address)
+    tokenIn: indexed(address)
+    tokenOut: indexed(address)
+    amountIn: uint256
+    amountOut: uint256
+
+
+MAX_LEGS: constant(uint256) = 2
+REFERRAL_CODE: constant(uint16) = 0
+
+POOL_ADDRESSES_PROVIDER: public(immutable(address))
+SWAP_ROUTER: public(immutable(address))
+
+
+@deploy
+def __init__(pool_addresses_provider: address, swap_router: address):
+    POOL_ADDRESSES_PROVIDER = pool_addresses_provider
+    SWAP_ROUTER = swap_router
+
+
+@external
+def rebalance(
+    aTokenIn: address,
+    tokenIn: address,
+    tokenOut: address,
+    legs: DynArray[Leg, MAX_LEGS],
+    minAmountOut: uint256,
+) -> (uint256, uint256):
+    """
+    @param aTokenIn aToken of tokenIn, the caller approved this contract for the legs' total
+    @param legs Route of the swap, the last leg takes what the aToken rounding left
+    @param minAmountOut Smallest total output, on top of every leg's own minimum
+    @return (amount withdrawn and swapped, amount swapped out and supplied)
+    """
+    assert len(legs) > 0, "Rebalancer: no legs"
+    amount_in: uint256 = 0
+    for leg: Leg in legs:
+        amount_in += leg.amountIn
+
+    # aTokens move with index rounding, withdraw exactly what arrived
+    pool: address = staticcall IPoolAddressesProvider(POOL_ADDRESSES_PROVIDER).getPool()
+    assert extcall IERC20(aTokenIn).transferFrom(msg.sender, self, amount_in)
+    withdrawn: uint256 = extcall IPool(pool).withdraw(tokenIn, max_value(uint256), self)
+
+    assert extcall IERC20(tokenIn).approve(SWAP_ROUTER, withdrawn)
+    remaining: uint256 = withdrawn
+    amount_out: uint256 = 0
+    for i: uint256 in range(MAX_LEGS):
+        if i == len(legs):
+            break
+        leg_in: uint256 = legs[i].amountIn
+        if i == len(legs) - 1:
+            leg_in = remaining
+        remaining -= leg_in
+        amount_out += extcall ISwapRouter(SWAP_ROUTER).exactInputSingle(
+            ExactInputSingleParams(
+                tokenIn=tokenIn,
+                tokenOut=tokenOut,
+                fee=legs[i].fee,
+                recipient=self,
+                amountIn=leg_in,
+                amountOutMinimum=legs[i].amountOutMinimum,
+                sqrtPriceLimitX96=0,
+            )
+        )
+    assert amount_out >= minAmountOut, "Rebalancer: too little received"
+
+    assert extcall IERC20(tokenOut).approve(pool, amount_out)
+    extcall IPool(pool).supply(tokenOut, amount_out, msg.sender, REFERRAL_CODE)
+    log Rebalanced(account=msg.sender, tokenIn=tokenIn, tokenOut=tokenOut, amountIn=withdrawn, amountOut=amount_out)
+    return withdrawn, amount_out
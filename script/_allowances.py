@@ -0,0 +1,107 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from script._multicall import Multicall
+import boa
+import os
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# "max" approves max_value(uint256) once per spender, anything else only the amount of each transfer
+APPROVE_POLICY_ENV_VAR = "MOX_REBALANCE_APPROVE"
+MAX_UINT256 = 2 ** 256 - 1
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+def approve_max_from_env() -> bool:
+    return os.environ.get(APPROVE_POLICY_ENV_VAR, "exact").lower() == "max"
+
+
+def _address(contract_or_address) -> str:
+    return str(getattr(contract_or_address, "address", contract_or_address))
+
+
+class AllowanceManager:
+    """
+    Known allowances of one owner per (token, spender), approves only what is missing.
+
+    Usage:
+        allowances = AllowanceManager()
+        allowances.approve_all([(usdc, pool, usdc_amount), (weth, router, weth_amount)])
+        pool.supply(usdc.address, usdc_amount, boa.env.eoa, 0)
+        allowances.spend(usdc, pool, usdc_amount)
+
+    By default a spender is approved only the missing amount. With approve_max=True
+    (opt-in, it leaves the spender free to move any amount later) a spender is
+    approved max_value(uint256) the first time it is needed, so later runs find
+    the allowance on chain and send no approve.
+    Cached allowances are lower bounds: spend() subtracts what a transferFrom may
+    have used, tokens that keep a max allowance untouched only make it stricter.
+    """
+
+    def __init__(self, owner=None, approve_max: bool = False, approve=None):
+        """
+        Args:
+            owner: Account of the allowances, boa.env.eoa if None
+            approve_max: Approve max_value(uint256) instead of the missing amount
+            approve: approve(token, spender, amount) sending the transaction as owner,
+                token.approve from boa.env.eoa if None
+        """
+        self.owner = owner or boa.env.eoa
+        self.approve_max = approve_max
+        self._approve = approve or (lambda token, spender, amount: token.approve(spender, amount))
+        self._allowances: dict[tuple[str, str], int] = {}
+
+    def remember(self, token: ABIContract, spender, allowance: int):
+        """Record an allowance read elsewhere, e.g. in a larger multicall."""
+        self._allowances[(_address(token), _address(spender))] = allowance
+
+    def prefetch(self, pairs):
+        """Read the unknown allowances of (token, spender) pairs in one multicall."""
+        batch = Multicall()
+        for token, spender in pairs:
+            key = (_address(token), _address(spender))
+            if key not in self._allowances:
+                batch.add(f"{key[0]}/{key[1]}", token.allowance, self.owner, key[1])
+        for name, allowance in batch.execute().items():
+            token_address, spender_address = name.split("/")
+            self._allowances[(token_address, spender_address)] = allowance
+
+    def allowance(self, token: ABIContract, spender) -> int:
+        self.prefetch([(token, spender)])
+        return self._allowances[(_address(token), _address(spender))]
+
+    def ensure(self, token: ABIContract, spender, amount: int) -> bool:
+        """Approve `spender` if the known allowance is below `amount`, True if a transaction was sent."""
+        if self.allowance(token, spender) >= amount:
+            return False
+        approval = MAX_UINT256 if self.approve_max else amount
+        self._approve(token, _address(spender), approval)
+        self._allowances[(_address(token), _address(spender))] = approval
+        return True
+
+    def approve_all(self, requirements) -> int:
+        """
+        Prefetch then approve a list of (token, spender, amount) ahead of the transfers.
+
+        Returns:
+            Number of approve transactions sent, 0 in steady state with approve_max
+        """
+        totals = {}  # (token, spender) -> total amount, several transfers can share one approval
+        for token, spender, amount in requirements:
+            if amount > 0:
+                key = (_address(token), _address(spender))
+                totals[key] = (token, spender, totals.get(key, (None, None, 0))[2] + amount)
+        self.prefetch((token, spender) for token, spender, _ in totals.values())
+        return sum(self.ensure(token, spender, amount) for token, spender, amount in totals.values())
+
+    def spend(self, token: ABIContract, spender, amount: int):
+        """Record a transferFrom of `amount` by `spender`."""
+        key = (_address(token), _address(spender))
+        if key in self._allowances:
+            self._allowances[key] = max(self._allowances[key] - amount, 0)
@@ -0,0 +1,232 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from dataclasses import dataclass
+from script._contract_registry import get_contract
+from script._history import (
+    SECONDS_PER_YEAR,
+    align,
+    estimate_block_at,
+    get_history_store,
+    iter_rounds,
+    iter_supply_rates,
+    price_series,
+    rate_series,
+)
+from script._rebalance_engine import DEFAULT_BUFFER, plan_rebalance
+from typing import NamedTuple
+import numpy as np
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+DEFAULT_INITIAL_VALUE = 10_000  # USD, invested at the target allocations on the first tick
+SEGMENT_WINDOW = 1024           # ticks planned at once when looking for the next rebalance
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+@dataclass(frozen=True)
+class CostModel:
+    """
+    USD cost of selling `trade_usd` in one swap:
+        trade_usd * (fee + slippage + trade_usd / liquidity_usd) + gas_usd
+
+    The last term is the price impact of a constant-product pool holding
+    `liquidity_usd` on each side, to first order.
+    """
+    fee: float = 0.003                  # pool fee tier, 3000 = 0.3%
+    slippage: float = 0.0005            # fixed execution slippage
+    liquidity_usd: float = 10_000_000   # per side of the pool, inf for no price impact
+    gas_usd: float = 0.0                # per rebalance: withdraw, swap and supply
+
+    def price_loss(self, trade_usd):
+        """Fraction of `trade_usd` lost in the swap, compared with min-out tolerances"""
+        return self.fee + self.slippage + np.asarray(trade_usd, dtype=np.float64) / self.liquidity_usd
+
+    def cost(self, trade_usd):
+        return np.asarray(trade_usd, dtype=np.float64) * self.price_loss(trade_usd) + self.gas_usd
+
+
+class BacktestResult(NamedTuple):
+    """
+    Value path of the rebalanced portfolio and of the same portfolio never rebalanced.
+    """
+    timestamps: np.ndarray        # (N,)
+    values: np.ndarray            # (N,) USD value of the rebalanced portfolio
+    hold_values: np.ndarray       # (N,) USD value without rebalancing
+    rebalance_ticks: np.ndarray   # (R,) indices into timestamps
+    traded_usd: np.ndarray        # (R,) USD sold at each rebalance
+    costs_usd: np.ndarray         # (R,) fees, slippage and gas of each rebalance
+    failed_ticks: np.ndarray      # (F,) ticks whose swap would revert on amountOutMinimum
+
+    @property
+    def pnl(self) -> float:
+        return float(self.values[-1] - self.values[0])
+
+    @property
+    def hold_pnl(self) -> float:
+        return float(self.hold_values[-1] - self.hold_values[0])
+
+    @property
+    def turnover(self) -> float:
+        """Traded USD over the initial value"""
+        return float(self.traded_usd.sum() / self.values[0])
+
+    @property
+    def rebalance_count(self) -> int:
+        return len(self.rebalance_ticks)
+
+    def summary(self) -> dict:
+        return {
+            "start": int(self.timestamps[0]),
+            "end": int(self.timestamps[-1]),
+            "ticks": len(self.timestamps),
+            "initial_value": float(self.values[0]),
+            "final_value": float(self.values[-1]),
+            "pnl": self.pnl,
+            "hold_pnl": self.hold_pnl,
+            "excess_pnl": self.pnl - self.hold_pnl,
+            "turnover": self.turnover,
+            "rebalance_count": self.rebalance_count,
+            "failed_count": len(self.failed_ticks),
+            "costs_usd": float(self.costs_usd.sum()),
+        }
+
+
+def growth_factors(timestamps: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """
+    Cumulative aToken growth of each asset since the first tick, (N, A).
+    The yearly rate of a tick accrues linearly until the next tick, like the Aave liquidity index.
+    """
+    dt = np.diff(timestamps).astype(np.float64)[:, None] / SECONDS_PER_YEAR
+    steps = 1.0 + rates[:-1] * dt
+    return np.vstack([np.ones((1, rates.shape[1])), np.cumprod(steps, axis=0)])
+
+
+def run_backtest(
+    timestamps,
+    prices,
+    targets,
+    buffer: float = DEFAULT_BUFFER,
+    rates=None,
+    costs: CostModel = CostModel(),
+    initial_value: float = DEFAULT_INITIAL_VALUE,
+    min_out: float = 0.0,
+) -> BacktestResult:
+    """
+    Replay the drift rule of run_script over a price history.
+
+    Holdings only change at rebalances, so instead of stepping tick by tick the
+    ticks after a rebalance are planned in one plan_rebalance call over a window
+    of ticks: the first tick with drift > buffer ends the segment. The Python
+    loop runs about once per rebalance, not once per tick.
+
+    Args:
+        timestamps: (N,) increasing unix timestamps
+        prices: (N, A) USD price of each asset
+        targets: (A,) target allocations
+        buffer: Drift above which the portfolio is rebalanced
+        rates: (N, A) yearly Aave supply rates, no interest if None
+        costs: Fee and slippage model of the swap
+        initial_value: USD invested at the targets on the first tick
+        min_out: amountOutMinimum as a fraction of the oracle value, e.g. 0.9 in run_script.
+            A rebalance losing more in the swap reverts: nothing is traded and the
+            drift rule fires again on the next tick
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    rates = np.zeros_like(prices) if rates is None else np.asarray(rates, dtype=np.float64)
+    growth = growth_factors(timestamps, rates)
+
+    initial_holdings = initial_value * targets / prices[0]
+    hold_values = (initial_holdings * growth * prices).sum(axis=1)
+
+    # holdings[t] = principal * growth[t], the principal only changes at rebalances
+    principal = initial_holdings / growth[0]
+    values = np.empty(len(timestamps))
+    ticks, traded, paid, failed = [], [], [], []
+    start, window = 0, SEGMENT_WINDOW
+    while True:
+        # Plan a window of ticks at once, doubled until it holds the next rebalance
+        stop = min(start + window, len(timestamps))
+        plan = plan_rebalance(principal * growth[start:stop], prices[start:stop], targets, buffer)
+        sold_usd = np.clip(-plan.trades_usd, 0, None).sum(axis=1)
+        executable = costs.price_loss(sold_usd) <= 1.0 - min_out
+        triggered = np.flatnonzero(plan.needs_rebalancing[1:] & executable[1:])  # the start tick was just rebalanced
+        end = stop if len(triggered) == 0 else start + 1 + triggered[0]
+        values[start:end] = plan.total_values[: end - start]
+        failed.append(start + 1 + np.flatnonzero(plan.needs_rebalancing[1 : end - start] & ~executable[1 : end - start]))
+        if end == len(timestamps):
+            break
+        if len(triggered) == 0:
+            start, window = end - 1, window * 2  # keep the last tick as the next segment start
+            continue
+        window = SEGMENT_WINDOW
+
+        # Sell the overweight assets to their targets, the buys absorb the cost pro rata
+        trades_usd = plan.trades_usd[end - start]
+        sold = -trades_usd[trades_usd < 0].sum()
+        cost = float(costs.cost(sold))
+        bought = np.clip(trades_usd, 0, None)
+        new_values = plan.values[end - start] + trades_usd - cost * bought / bought.sum()
+
+        principal = new_values / prices[end] / growth[end]
+        ticks.append(end)
+        traded.append(sold)
+        paid.append(cost)
+        start = end
+
+    return BacktestResult(
+        timestamps,
+        values,
+        hold_values,
+        np.asarray(ticks, dtype=np.int64),
+        np.asarray(traded, dtype=np.float64),
+        np.asarray(paid, dtype=np.float64),
+        np.concatenate(failed).astype(np.int64),
+    )
+
+
+def load_history(
+    feed_names: tuple[str, ...] = ("usdc_usd", "eth_usd"),
+    token_names: tuple[str, ...] = ("usdc", "weth"),
+    rounds: int = 10_000,
+    with_rates: bool = True,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """
+    Price and supply rate history of the active network, aligned on the union of
+    the round timestamps of every feed.
+
+    Args:
+        feed_names: Chainlink feeds, in the order of the assets
+        token_names: Tokens of the Aave reserves, in the same order
+        rounds: Rounds to go back on each feed
+        with_rates: Also load the supply rates since the first block of the history
+
+    Returns:
+        timestamps (N,), prices (N, A), rates (N, A) or None
+    """
+    store = get_history_store()
+
+    series = []
+    for feed_name in feed_names:
+        feed = get_contract(feed_name)
+        series.append(price_series(iter_rounds(feed, count=rounds, store=store), feed.decimals()))
+    timestamps = np.unique(np.concatenate([series_timestamps for series_timestamps, _ in series]))
+    timestamps = timestamps[timestamps >= max(series_timestamps[0] for series_timestamps, _ in series)]
+    prices = np.column_stack([align(timestamps, *s) for s in series])
+
+    if not with_rates:
+        return timestamps, prices, None
+
+    pool = get_contract("pool", address=get_contract("aavev3_pool_address_provider").getPool())
+    from_block = estimate_block_at(int(timestamps[0]), pool.env)
+    rates = np.column_stack([
+        align(timestamps, *rate_series(iter_supply_rates(pool, str(get_contract(name).address), from_block, store=store)))
+        for name in token_names
+    ])
+    return timestamps, prices, rates
@@ -0,0 +1,229 @@
+"""
+Benchmarks of the rebalancer: trade math, pipeline stages, RPC calls and
+transactions, stored as JSON baselines.
+
+    mox run benchmark --network pyevm
+    python -m script._benchmark check benchmarks/latest_pyevm.json benchmarks/baseline_pyevm.json
+
+Every result is one flat {metric: value} dict, e.g.
+"micro/plan_rebalance/100000/seconds" or "macro/rebalance/eth_calls" ("macro_separate/..."
+without the Rebalancer), so two runs
+compare key by key without any network access:
+    - counts (eth_calls, transactions, rpc_requests, gas_used) are exact on
+      pyevm and on a fork pinned to a block: any increase is a regression
+    - timings are medians over repeats: a regression only past `threshold`
+      relative and `min_seconds` absolute, shared machines are noisy
+The committed baseline holds the counts only, timings depend on the machine:
+compare timings between two results of the same machine, e.g. before and
+after a change.
+For a pinned fork without network access, replay recorded RPC traffic:
+    python -m script._rpc_replay replay --block 21000000 -- mox run benchmark --network eth-forked
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from moccasin.config import get_active_network
+from pathlib import Path
+from script._instrumentation import UNATTRIBUTED, instrument
+from script._rebalance_engine import plan_rebalance, plan_rebalance_exact
+from script._simulation import local_fork, prepare
+from script.rebalance_portfolio import ATOMIC_ENV_VAR, TARGET_ALLOCATIONS, _run_rebalance, calculate_rebalancing_trades
+from statistics import median
+from typing import NamedTuple
+from unittest.mock import patch
+import argparse
+import boa
+import io
+import json
+import numpy as np
+import os
+import platform
+import sys
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+PORTFOLIO_SIZES = (1, 1_000, 100_000)
+WRAPPER_MAX_SIZE = 1_000       # calculate_rebalancing_trades is one call per portfolio, looped up to this size
+MICRO_REPEATS = 20
+MACRO_REPEATS = 5
+DEFAULT_THRESHOLD = 0.5        # timings may grow 50% before failing the check, counts not at all
+MIN_SECONDS = 0.005            # and by more than 5 ms, below that it is scheduling noise
+COUNT_METRICS = ("eth_calls", "transactions", "rpc_requests", "gas_used")
+BENCHMARK_DIR = "benchmarks"     # under the project root
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class Regression(NamedTuple):
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline if self.baseline else float("inf")
+
+
+def _median_seconds(function, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return median(timings)
+
+
+def bench_trade_math(sizes=PORTFOLIO_SIZES, repeats: int = MICRO_REPEATS, seed: int = 0) -> dict[str, float]:
+    """
+    Median seconds of the trade math over `sizes` random USDC/WETH portfolios.
+
+    The vectorized engine plans every portfolio in one call,
+    calculate_rebalancing_trades (one portfolio per call) is looped up to
+    WRAPPER_MAX_SIZE portfolios.
+    """
+    rng = np.random.default_rng(seed)
+    targets = [TARGET_ALLOCATIONS["usdc"], TARGET_ALLOCATIONS["weth"]]
+    prices = [1.0, 3500.0]
+    metrics = {}
+    for size in sizes:
+        balances = rng.uniform(0, 10_000, (size, 2)) / [1, 3500]
+        balances_wei = [[int(usdc * 1e6), int(weth * 1e18)] for usdc, weth in balances]
+        metrics[f"micro/plan_rebalance/{size}/seconds"] = _median_seconds(
+            lambda: plan_rebalance(balances, prices, targets), repeats
+        )
+        metrics[f"micro/plan_rebalance_exact/{size}/seconds"] = _median_seconds(
+            lambda: plan_rebalance_exact(balances_wei, [10 ** 8, 3500 * 10 ** 8], [8, 8], [6, 18], targets), repeats
+        )
+        if size <= WRAPPER_MAX_SIZE:
+            rows = [({"balance": usdc, "price": prices[0], "contract": None}, {"balance": weth, "price": prices[1], "contract": None}) for usdc, weth in balances]
+            metrics[f"micro/calculate_rebalancing_trades/{size}/seconds"] = _median_seconds(
+                lambda: [calculate_rebalancing_trades(usdc, weth, TARGET_ALLOCATIONS) for usdc, weth in rows], repeats
+            )
+    return metrics
+
+
+def bench_pipeline(repeats: int = MACRO_REPEATS, atomic: bool = True) -> dict[str, float]:
+    """
+    Per-stage seconds (median) and counts of the full rebalance.
+
+    Every run is reverted, so each one starts from the same state, after a
+    warm-up run that fills the process caches. A live network is forked
+    in-process first, nothing is broadcast.
+
+    Args:
+        atomic: Trade through the Rebalancer, "macro/..." metrics, or in
+            separate transactions as with $MOX_REBALANCE_ATOMIC=0, "macro_separate/..."
+    """
+    prefix = "macro" if atomic else "macro_separate"
+    runs = []
+    with local_fork(), patch.dict(os.environ, {ATOMIC_ENV_VAR: "1" if atomic else "0"}):
+        prepare()
+        for run in range(repeats + 1):
+            with boa.env.anchor(), instrument() as instrumentation, redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                _run_rebalance(quiet=True)
+                seconds = time.perf_counter() - start
+            if run:  # the first run is the warm-up
+                runs.append((seconds, instrumentation))
+
+    metrics = {f"{prefix}/run/seconds": median(seconds for seconds, _ in runs)}
+    stages = [name for name in runs[-1][1].stages if name != UNATTRIBUTED]
+    for name in stages:
+        metrics[f"{prefix}/{name}/seconds"] = median(i.stages[name].seconds for _, i in runs if name in i.stages)
+        for count in COUNT_METRICS:
+            metrics[f"{prefix}/{name}/{count}"] = getattr(runs[-1][1].stages[name], count)
+    totals = runs[-1][1].totals()
+    for count in COUNT_METRICS:
+        metrics[f"{prefix}/total/{count}"] = getattr(totals, count)
+    return metrics
+
+
+def run_benchmarks(micro: bool = True, macro: bool = True, sizes=PORTFOLIO_SIZES) -> dict:
+    """All benchmarks of the active network, as a JSON-ready result."""
+    metrics = {}
+    if micro:
+        metrics.update(bench_trade_math(sizes))
+    if macro:
+        metrics.update(bench_pipeline())
+        metrics.update(bench_pipeline(atomic=False))
+    return {
+        "meta": {
+            "network": get_active_network().name,
+            "block": boa.env.evm.patch.block_number,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "metrics": metrics,
+    }
+
+
+def save(result: dict, path: str | Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+
+
+def without_timings(result: dict) -> dict:
+    """The counts of a result only, a baseline valid on any machine."""
+    return {**result, "metrics": {m: v for m, v in result["metrics"].items() if not m.endswith("/seconds")}}
+
+
+def load(path: str | Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD, min_seconds: float = MIN_SECONDS) -> list[Regression]:
+    """
+    Metrics of `current` worse than in `baseline`, both results of run_benchmarks.
+
+    Metrics missing from either side are skipped, a new stage is not a regression.
+    """
+    regressions = []
+    for metric, base in baseline["metrics"].items():
+        value = current["metrics"].get(metric)
+        if value is None:
+            continue
+        if metric.endswith("/seconds"):
+            worse = value > base * (1 + threshold) and value - base > min_seconds
+        else:
+            worse = value > base
+        if worse:
+            regressions.append(Regression(metric, base, value))
+    return regressions
+
+
+def format_regressions(regressions: list[Regression]) -> str:
+    if not regressions:
+        return "No regression"
+    header = f"{'metric':<56}{'baseline':>14}{'current':>14}{'change':>9}"
+    lines = [header, "-" * len(header)]
+    for r in regressions:
+        lines.append(f"{r.metric:<56}{r.baseline:>14.6g}{r.current:>14.6g}{r.change:>+9.1%}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m script._benchmark", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    check = subparsers.add_parser("check", help="compare a result with a baseline, exit 1 on regression")
+    check.add_argument("current")
+    check.add_argument("baseline")
+    check.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="relative slowdown allowed")
+    check.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="absolute slowdown ignored")
+    args = parser.parse_args(argv)
+
+    regressions = compare(load(args.current), load(args.baseline), args.threshold, args.min_seconds)
+    print(format_regressions(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
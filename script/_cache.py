@@ -0,0 +1,13 @@
+from pathlib import Path
+import os
+
+
+# Local cache for data that is expensive to fetch from chain,
+# override with $MOX_REBALANCE_CACHE_DIR (e.g. in CI or tests)
+DEFAULT_CACHE_DIR = "~/.cache/mox-portfolio-rebalance"
+
+
+def get_cache_dir() -> Path:
+    cache_dir = Path(os.path.expanduser(os.environ.get("MOX_REBALANCE_CACHE_DIR", DEFAULT_CACHE_DIR)))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
@@ -0,0 +1,122 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract, ABIContractFactory
+from moccasin.config import get_active_network, get_config
+from script._cache import get_cache_dir
+from pathlib import Path
+import boa
+import hashlib
+import json
+import marshal
+import os
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+ABI_CACHE_VERSION = 2  # bump when the cached layout changes
+
+# network name -> ContractRegistry, lives for the whole process
+_REGISTRIES: dict[str, "ContractRegistry"] = {}
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class ContractRegistry:
+    """
+    Contracts of the moccasin.toml names, resolved once per process.
+
+    Usage:
+        registry = get_contract_registry()
+        usdc = registry.get("usdc")
+        a_usdc = registry.get("a_token", address=...)
+
+    - each abis/*.json is parsed once, and the parsed ABI is marshalled to
+      the cache dir keyed on (path, mtime, size) of the file, so later
+      processes stat the file instead of reading and parsing it
+    - one ABIContract per (name, address), built lazily on first use: no
+      ABIFunction rebuild and no get_code per lookup
+    - names without an address (pyevm mocks of a deployer script) go to
+      manifest_named, which deploys them once and tracks their redeployment
+    """
+
+    def __init__(self, network=None, cache_dir: Path | None = None, persist: bool = True):
+        """
+        Args:
+            network: moccasin network, the active one if None
+            cache_dir: Where to store the parsed ABIs, defaults to get_cache_dir()
+            persist: Keep the parsed ABIs in memory only if False
+        """
+        self.network = network or get_active_network()
+        self.persist = persist
+        self.cache_dir = (cache_dir or get_cache_dir()) / "abis"
+        self._abis: dict[str, list] = {}                  # abi path -> parsed ABI
+        self._factories: dict[str, ABIContractFactory] = {}
+        self._contracts: dict[tuple[str, str], ABIContract] = {}
+
+    def _named(self, name: str):
+        return self.network.named_contracts.get(name)
+
+    def abi(self, path: str) -> list:
+        """Parsed ABI of a project file, e.g. "abis/pool.json"."""
+        if path not in self._abis:
+            file = get_config().project_root / path
+            stat = file.stat()
+            key = hashlib.sha256(f"{file}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:16]
+            cache = self.cache_dir / f"{Path(path).stem}_{key}_v{ABI_CACHE_VERSION}.marshal"
+            if self.persist and cache.exists():
+                abi = marshal.loads(cache.read_bytes())
+            else:
+                abi = json.loads(file.read_bytes())
+                if isinstance(abi, dict):  # {"abi": [...]} build artifacts, as boa.load_abi
+                    abi = abi["abi"]
+                if self.persist:
+                    self.cache_dir.mkdir(parents=True, exist_ok=True)
+                    tmp = cache.with_suffix(f".{os.getpid()}.tmp")  # concurrent processes never read half a file
+                    tmp.write_bytes(marshal.dumps(abi))
+                    tmp.replace(cache)
+            self._abis[path] = abi
+        return self._abis[path]
+
+    def factory(self, name: str) -> ABIContractFactory | None:
+        """ABIContractFactory of a name, None if the name has no ABI file."""
+        if name not in self._factories:
+            named = self._named(name)
+            abi_path = getattr(named, "abi", None)
+            if not isinstance(abi_path, str) or not abi_path.endswith(".json"):
+                return None
+            self._factories[name] = ABIContractFactory(name, self.abi(abi_path))
+        return self._factories[name]
+
+    def get(self, name: str, address=None):
+        """
+        Contract of a moccasin.toml name, at `address` or at its configured address.
+        """
+        named = self._named(name)
+        address = address or getattr(named, "address", None)
+        factory = self.factory(name) if address else None
+        if factory is None:
+            return self.network.manifest_named(name, address=address)
+
+        key = (name, str(address).lower())
+        contract = self._contracts.get(key)
+        if contract is None or contract.env is not boa.env:  # bound to the env it was built in
+            contract = self._contracts[key] = factory.at(address)
+        return contract
+
+
+def get_contract_registry() -> ContractRegistry:
+    """Shared ContractRegistry of the active network."""
+    active_network = get_active_network()
+    if active_network.name not in _REGISTRIES:
+        _REGISTRIES[active_network.name] = ContractRegistry(active_network)
+    registry = _REGISTRIES[active_network.name]
+    registry.network = active_network  # same name, possibly reloaded config
+    return registry
+
+
+def get_contract(name: str, address=None):
+    """Shortcut for get_contract_registry().get(name, address)."""
+    return get_contract_registry().get(name, address)
@@ -0,0 +1,149 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.vyper.vyper_contract import VyperContract
+from decimal import Decimal
+from moccasin.config import get_active_network
+import boa
+
+from contracts.mocks import (
+    mock_a_token,
+    mock_pool,
+    mock_pool_addresses_provider,
+    mock_protocol_data_provider,
+    mock_quoter,
+    mock_swap_router,
+    mock_usdc,
+    mock_v3_aggregator,
+    mock_weth,
+    multicall3,
+)
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# Override any of these in [networks.pyevm.extra_data] of moccasin.toml
+DEFAULT_MOCK_CONFIG = {
+    "eth_usd_price": 3500,
+    "usdc_usd_price": 1,
+    "price_feed_decimals": 8,
+    "supply_rate": 0.03,  # yearly Aave supply rate of every reserve
+    "lending_liquidity_usd": 1_000_000,  # supplied to each reserve, pays the accrued interest
+    "swap_liquidity_usd": {"100": 1_000_000, "500": 20_000_000, "3000": 10_000_000, "10000": 1_000_000},  # per side and fee tier
+}
+PRICE_FEED_DESCRIPTIONS = {"eth_usd": "ETH / USD", "usdc_usd": "USDC / USD"}
+RAY = 10 ** 27
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+def get_mock_config() -> dict:
+    return {**DEFAULT_MOCK_CONFIG, **get_active_network().extra_data}
+
+
+def _to_units(amount, decimals: int) -> int:
+    return int(Decimal(str(amount)) * 10 ** decimals)
+
+
+def _liquidity_provider() -> str:
+    return boa.env.generate_address("mock_liquidity_provider")
+
+
+# Give `account` tokens worth `usd` dollars at the configured mock prices
+def _fund(account: str, usd) -> tuple[int, int]:
+    active_network = get_active_network()
+    config = get_mock_config()
+    usdc = active_network.manifest_named("usdc")
+    weth = active_network.manifest_named("weth")
+
+    usdc_amount = _to_units(Decimal(str(usd)) / Decimal(str(config["usdc_usd_price"])), 6)
+    weth_amount = _to_units(Decimal(str(usd)) / Decimal(str(config["eth_usd_price"])), 18)
+
+    with boa.env.prank(usdc.masterMinter()):
+        usdc.configureMinter(account, usdc_amount)
+    boa.env.set_balance(account, boa.env.get_balance(account) + weth_amount)
+    with boa.env.prank(account):
+        usdc.mint(account, usdc_amount)
+        weth.deposit(value=weth_amount)
+    return usdc_amount, weth_amount
+
+
+def deploy_usdc() -> VyperContract:
+    return mock_usdc.deploy()
+
+
+def deploy_weth() -> VyperContract:
+    return mock_weth.deploy()
+
+
+def deploy_price_feed(feed_name: str) -> VyperContract:
+    config = get_mock_config()
+    decimals = config["price_feed_decimals"]
+    answer = _to_units(config[f"{feed_name}_price"], decimals)
+    return mock_v3_aggregator.deploy(decimals, answer, PRICE_FEED_DESCRIPTIONS[feed_name])
+
+
+def deploy_pool() -> VyperContract:
+    """Pool with a USDC and a WETH reserve, seeded with lending liquidity."""
+    active_network = get_active_network()
+    config = get_mock_config()
+    pool = mock_pool.deploy()
+    supply_rate = int(Decimal(str(config["supply_rate"])) * RAY)
+
+    for token_name, feed_name in (("usdc", "usdc_usd"), ("weth", "eth_usd")):
+        token = active_network.manifest_named(token_name)
+        symbol = token.symbol()
+        a_token = mock_a_token.deploy(pool.address, token.address, f"Aave Ethereum {symbol}", f"aEth{symbol}", token.decimals())
+        pool.initReserve(token.address, a_token.address, ZERO_ADDRESS)  # no borrowing, no debt token
+        pool.configureReserve(token.address, active_network.manifest_named(feed_name).address, supply_rate)
+
+    usdc = active_network.manifest_named("usdc")
+    weth = active_network.manifest_named("weth")
+    liquidity_provider = _liquidity_provider()
+    usdc_amount, weth_amount = _fund(liquidity_provider, config["lending_liquidity_usd"])
+    with boa.env.prank(liquidity_provider):
+        for token, amount in ((usdc, usdc_amount), (weth, weth_amount)):
+            token.approve(pool.address, amount)
+            pool.supply(token.address, amount, liquidity_provider, 0)
+    return pool
+
+
+def deploy_protocol_data_provider() -> VyperContract:
+    return mock_protocol_data_provider.deploy(get_active_network().manifest_named("pool").address)
+
+
+def deploy_pool_addresses_provider() -> VyperContract:
+    active_network = get_active_network()
+    return mock_pool_addresses_provider.deploy(
+        active_network.manifest_named("pool").address,
+        active_network.manifest_named("aave_protocol_data_provider").address,
+    )
+
+
+def deploy_swap_router() -> VyperContract:
+    """Router with a USDC/WETH constant-product pool per configured fee tier."""
+    active_network = get_active_network()
+    config = get_mock_config()
+    usdc = active_network.manifest_named("usdc")
+    weth = active_network.manifest_named("weth")
+    router = mock_swap_router.deploy(weth.address)
+
+    liquidity_provider = _liquidity_provider()
+    for fee, liquidity_usd in config["swap_liquidity_usd"].items():
+        usdc_amount, weth_amount = _fund(liquidity_provider, liquidity_usd)
+        with boa.env.prank(liquidity_provider):
+            usdc.approve(router.address, usdc_amount)
+            weth.approve(router.address, weth_amount)
+            router.addLiquidity(usdc.address, weth.address, int(fee), usdc_amount, weth_amount)
+    return router
+
+
+def deploy_quoter() -> VyperContract:
+    return mock_quoter.deploy(get_active_network().manifest_named("uniswap_swap_router").address)
+
+
+def deploy_multicall3() -> VyperContract:
+    return multicall3.deploy()
@@ -0,0 +1,137 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.rpc import to_hex, to_int
+from eth_utils import keccak, to_checksum_address
+from script._hooks import EnvListener, attach, detach
+from typing import NamedTuple
+import boa
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+def _topic(signature: str) -> int:
+    return int.from_bytes(keccak(text=signature), "big")
+
+
+TRANSFER = _topic("Transfer(address,address,uint256)")
+SUPPLY = _topic("Supply(address,address,address,uint256,uint16)")
+WITHDRAW = _topic("Withdraw(address,address,address,uint256)")
+SWAP = _topic("Swap(address,address,int256,int256,uint160,uint128,int24)")
+MINT = _topic("Mint(address,address,uint256,uint256,uint256)")  # Aave v3 aToken
+BURN = _topic("Burn(address,address,uint256,uint256,uint256)")
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class LogEntry(NamedTuple):
+    address: str              # checksummed emitter
+    topics: tuple[int, ...]   # topics[0] is the event signature
+    data: bytes
+    block: int
+
+
+def address_topic(address) -> int:
+    """An address as an indexed topic."""
+    return int(str(address), 16)
+
+
+def topic_address(topic: int) -> str:
+    return to_checksum_address(topic.to_bytes(32, "big")[12:])
+
+
+class LocalLogSource(EnvListener):
+    """
+    Logs of the transactions executed by the in-process EVM (pyevm and forks),
+    collected from env.execute_code since the last poll. Forks do not mine
+    blocks of their own, so their logs never reach the RPC.
+
+    Usage:
+        with LocalLogSource() as logs:
+            ...
+            block, entries = logs.poll()
+    """
+    is_local = True
+
+    def __init__(self, env=None):
+        self.env = env or boa.env
+        self._entries: list[LogEntry] = []
+
+    def on_execute_code(self, computation, kwargs: dict, token):
+        if kwargs.get("is_modifying", True) and not computation.is_error:
+            block = self.env.evm.patch.block_number
+            for address, topics, data in computation.get_log_entries():
+                self._entries.append(LogEntry(to_checksum_address(address), tuple(topics), data, block))
+
+    def start(self) -> "LocalLogSource":
+        attach(self, self.env)
+        return self
+
+    def stop(self):
+        detach(self)
+
+    def __enter__(self) -> "LocalLogSource":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def poll(self) -> tuple[int, list[LogEntry]]:
+        entries, self._entries = self._entries, []
+        return self.env.evm.patch.block_number, entries
+
+
+class RPCLogSource:
+    """
+    Logs of `addresses` from eth_getLogs, one request per poll and only once a
+    new block is out. Live networks only.
+    """
+    is_local = False
+
+    def __init__(self, addresses, rpc=None, from_block: int | None = None):
+        self.addresses = [str(address) for address in addresses]
+        self._rpc = rpc or boa.env._rpc
+        self._last_block = from_block if from_block is not None else to_int(self._rpc.fetch("eth_blockNumber", []))
+
+    def start(self) -> "RPCLogSource":
+        return self
+
+    def stop(self):
+        pass
+
+    def __enter__(self) -> "RPCLogSource":
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def poll(self) -> tuple[int, list[LogEntry]]:
+        head = to_int(self._rpc.fetch("eth_blockNumber", []))
+        if head <= self._last_block:
+            return self._last_block, []
+        logs = self._rpc.fetch("eth_getLogs", [{
+            "address": self.addresses,
+            "fromBlock": to_hex(self._last_block + 1),
+            "toBlock": to_hex(head),
+        }])
+        self._last_block = head
+        return head, [
+            LogEntry(
+                to_checksum_address(log["address"]),
+                tuple(int(topic, 16) for topic in log["topics"]),
+                bytes.fromhex(log["data"][2:]),
+                to_int(log["blockNumber"]),
+            )
+            for log in logs
+            if not log.get("removed")
+        ]
+
+
+def get_log_source(addresses, env=None):
+    """RPCLogSource on live networks, LocalLogSource on pyevm and forks."""
+    env = env or boa.env
+    if hasattr(env, "get_chain_id"):  # NetworkEnv
+        return RPCLogSource(addresses, env._rpc)
+    return LocalLogSource(env)
@@ -0,0 +1,228 @@
+"""
+Execution of swaps too large for one exactInputSingle.
+
+    quotes = quote_tiers(quoter, weth, usdc, amount, extra_amounts=impact_amounts(amount))
+    curves = estimate_impact(quotes)   # one per pool
+    plan = plan_slices(curves, amount, gas_out)
+    report = execute_slices(router, quoter, weth, usdc, plan, boa.env.eoa, oracle_out=expected)
+    report.summary()  # realized against expected and single-shot cost, in bps of the oracle value
+
+The impact curve of every pool is fitted to its quotes at growing sizes (the
+QuoterV2 simulates every size against the current pool state), as a
+constant-product pool: out(x) = spot_rate * x * depth / (depth + x). A slice
+is expected to fill in whichever pool gives the most for its size. Slices
+are spaced `interval` seconds apart so arbitrage restores the pools between
+them; each slice is quoted again, routed over the fee tiers and sent with its
+own amountOutMinimum.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from script._routing import DEFAULT_SLIPPAGE, FEE_TIERS, execute_route, plan_route
+from statistics import median
+from typing import NamedTuple
+import boa
+import math
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+IMPACT_FRACTIONS = (1 / 256, 1 / 64, 1 / 16)  # quoted on top of the route amounts (quarters of the trade)
+MAX_SLICES = 16
+MIN_SLICE_GAIN = 0.0005   # one more slice must save 5 bps of the trade, it pays a swap and a wait
+SLICE_INTERVAL = 60       # seconds between slices, five blocks for arbitrage to restore the pools
+SWAP_GAS = 130_000        # one exactInputSingle through a v3 pool
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class ImpactCurve(NamedTuple):
+    spot_rate: float   # token_out base units per token_in base unit of a vanishing trade, fee included
+    depth: float       # token_in that moves the price by half, inf if no impact was measured
+
+    def amount_out(self, amount_in: float) -> float:
+        if math.isinf(self.depth):
+            return self.spot_rate * amount_in
+        return self.spot_rate * amount_in * self.depth / (self.depth + amount_in)
+
+    def impact(self, amount_in: float) -> float:
+        """Fraction of the spot value lost by a trade of amount_in, fee excluded."""
+        return 0.0 if math.isinf(self.depth) else amount_in / (self.depth + amount_in)
+
+
+class SlicePlan(NamedTuple):
+    amounts: tuple[int, ...]  # token_in of each slice
+    interval: float           # seconds between slices
+    expected_out: int         # along the curve, pools restored between slices
+    single_out: int           # along the curve, everything in one swap
+
+
+class SliceFill(NamedTuple):
+    amount_in: int
+    quoted_out: int
+    min_out: int
+    amount_out: int
+    fees: tuple[int, ...]     # pools of the slice route
+
+
+class ExecutionReport(NamedTuple):
+    plan: SlicePlan
+    fills: tuple[SliceFill, ...]
+    oracle_out: int           # value of the whole trade at the oracle price, 0 if unknown
+
+    @property
+    def amount_in(self) -> int:
+        return sum(fill.amount_in for fill in self.fills)
+
+    @property
+    def amount_out(self) -> int:
+        return sum(fill.amount_out for fill in self.fills)
+
+    def _cost_bps(self, amount_out: int) -> float | None:
+        return (self.oracle_out - amount_out) / self.oracle_out * 10_000 if self.oracle_out else None
+
+    def summary(self) -> dict:
+        """Realized against expected and single-shot amounts, costs in bps of the oracle value."""
+        return {
+            "slices": len(self.fills),
+            "amount_in": self.amount_in,
+            "amount_out": self.amount_out,
+            "expected_out": self.plan.expected_out,
+            "single_out": self.plan.single_out,
+            "realized_cost_bps": self._cost_bps(self.amount_out),
+            "expected_cost_bps": self._cost_bps(self.plan.expected_out),
+            "single_cost_bps": self._cost_bps(self.plan.single_out),
+        }
+
+
+def impact_amounts(amount_in: int) -> set[int]:
+    """Amounts to quote, with the route amounts, to fit the impact curve of a trade."""
+    return {max(int(amount_in * fraction), 1) for fraction in IMPACT_FRACTIONS}
+
+
+def _fit(sizes: dict[int, int]) -> ImpactCurve:
+    x0, *larger = sorted(sizes)
+    r0 = sizes[x0] / x0
+    depths = []
+    for x in larger:
+        r = sizes[x] / x
+        if r < r0:  # equal rates: no impact measurable at this size
+            depths.append((r * x - r0 * x0) / (r0 - r))
+    if not depths:
+        return ImpactCurve(r0, math.inf)
+    depth = median(depths)
+    return ImpactCurve(r0 * (depth + x0) / depth, depth)
+
+
+def estimate_impact(quotes: dict[tuple[int, int], int | None], fee_tiers=FEE_TIERS) -> dict[int, ImpactCurve]:
+    """
+    Fit the impact curve of every pool to its quotes.
+
+    Two sizes x0 < x with rates r0 = out(x0) / x0 and r = out(x) / x give
+    depth = (r * x - r0 * x0) / (r0 - r), the median over all pairs with the
+    smallest size is kept.
+
+    Args:
+        quotes: {(fee, amount_in): amount_out} of quote_tiers
+
+    Returns:
+        {fee: ImpactCurve} of the pools that quoted at least one amount
+    """
+    sizes: dict[int, dict[int, int]] = {}
+    for (fee, amount), out in quotes.items():
+        if fee in fee_tiers and out:
+            sizes.setdefault(fee, {})[amount] = out
+    return {fee: _fit(pool_sizes) for fee, pool_sizes in sizes.items()}
+
+
+def best_out(curves: dict[int, ImpactCurve], amount_in: float) -> float:
+    """Expected output of the best pool for a trade of amount_in."""
+    return max(curve.amount_out(amount_in) for curve in curves.values())
+
+
+def gas_cost_out(gas_price: int, eth_price: float, out_price: float, out_decimals: int, gas: int = SWAP_GAS) -> float:
+    """Cost of one more swap in token_out base units."""
+    return gas * gas_price / 1e18 * eth_price / out_price * 10 ** out_decimals
+
+
+def plan_slices(
+    curves: dict[int, ImpactCurve],
+    amount_in: int,
+    gas_out: float = 0.0,
+    max_slices: int = MAX_SLICES,
+    min_gain: float = MIN_SLICE_GAIN,
+    interval: float = SLICE_INTERVAL,
+) -> SlicePlan:
+    """
+    Fewest equal slices past which one more saves less than min_gain of the trade.
+
+    n slices receive n * out(amount_in / n) less n swaps of gas, out being
+    the best pool for the slice size and the pools restored between slices.
+
+    Args:
+        curves: Impact curves of the pools, see estimate_impact
+        gas_out: Cost of one swap in token_out base units, see gas_cost_out
+    """
+    def net_out(n: int) -> float:
+        return n * (best_out(curves, amount_in / n) - gas_out)
+
+    threshold = min_gain * max(curve.spot_rate for curve in curves.values()) * amount_in
+    n = 1
+    while n < max_slices and net_out(n + 1) - net_out(n) > threshold:
+        n += 1
+    amounts = [amount_in // n] * n
+    amounts[-1] += amount_in - sum(amounts)
+    return SlicePlan(
+        tuple(amounts),
+        interval,
+        int(sum(best_out(curves, amount) for amount in amounts)),
+        int(best_out(curves, amount_in)),
+    )
+
+
+def wait_for_recovery(seconds: float):
+    """Let the pools recover: blocks are mined in-process on pyevm and forks, waited for on live networks."""
+    if hasattr(boa.env, "get_chain_id"):
+        time.sleep(seconds)
+    else:
+        boa.env.time_travel(seconds=int(seconds))
+
+
+def execute_slices(
+    router: ABIContract,
+    quoter: ABIContract,
+    token_in,
+    token_out,
+    plan: SlicePlan,
+    recipient,
+    slippage: float = DEFAULT_SLIPPAGE,
+    fee_tiers=FEE_TIERS,
+    oracle_out: int = 0,
+    min_rate: float = 0.0,
+    wait=wait_for_recovery,
+) -> ExecutionReport:
+    """
+    Swap every slice of a plan, token_in must be approved for the whole amount.
+
+    Args:
+        min_rate: Lowest token_out per token_in a slice may be quoted, raises ValueError under it
+        wait: wait(seconds) called between slices
+
+    Returns:
+        ExecutionReport
+    """
+    fills = []
+    for i, amount in enumerate(plan.amounts):
+        if i:
+            wait(plan.interval)
+        route = plan_route(quoter, token_in, token_out, amount, slippage, fee_tiers)
+        if route is None or route.quoted_out < amount * min_rate:
+            quoted = route.quoted_out if route else 0
+            raise ValueError(f"Slice {i + 1}/{len(plan.amounts)} quotes {quoted}, under the floor of {int(amount * min_rate)}")
+        amounts_out = execute_route(router, route, token_in, token_out, recipient)
+        fills.append(SliceFill(amount, route.quoted_out, route.min_out, sum(amounts_out), tuple(leg.fee for leg in route.legs)))
+    return ExecutionReport(plan, tuple(fills), oracle_out)
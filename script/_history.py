@@ -0,0 +1,310 @@
+"""
+Historical Chainlink rounds and Aave supply rates for backtesting.
+
+Both are streamed oldest first through generators, fetched in batches and kept
+in a local SQLite store: past rounds and logs never change, so once a range has
+been read it is never fetched again.
+
+    rounds = iter_rounds(eth_usd, count=10_000)      # batched getRoundData
+    timestamps, prices = price_series(rounds, decimals=8)
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from boa.rpc import to_hex, to_int
+from boa.util.abi import abi_decode
+from eth_utils import keccak
+from moccasin.config import get_active_network
+from pathlib import Path
+from script._cache import get_cache_dir
+from script._multicall import Multicall
+from script._reserve_registry import get_chain_id
+from typing import Iterable, Iterator, NamedTuple
+import numpy as np
+import sqlite3
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+ROUND_BATCH_SIZE = 200     # getRoundData calls per multicall
+LOG_BLOCK_RANGE = 10_000   # blocks per eth_getLogs request, the usual provider limit
+PHASE_OFFSET = 64          # Chainlink proxy round id = phaseId << 64 | aggregator round id
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+SECONDS_PER_SLOT = 12     # block time since the merge
+RAY = 10 ** 27
+RESERVE_DATA_UPDATED_TOPIC = "0x" + keccak(text="ReserveDataUpdated(address,uint256,uint256,uint256,uint256,uint256)").hex()
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class Round(NamedTuple):
+    round_id: int
+    answer: int
+    started_at: int
+    updated_at: int  # 0 if the feed has no data for this round
+
+
+class RatePoint(NamedTuple):
+    timestamp: int
+    block: int
+    liquidity_rate: int  # yearly supply rate in ray, as in ReserveDataUpdated
+
+
+class HistoryStore:
+    """
+    Rounds per (chain, feed) and supply rates per (chain, pool, asset) in SQLite.
+    Large integers are stored as text, Chainlink answers and rays overflow int64.
+    """
+
+    def __init__(self, path: Path | None = None, persist: bool = True):
+        """
+        Args:
+            path: SQLite file, defaults to history.sqlite in get_cache_dir()
+            persist: Keep the history in memory only if False (e.g. local pyevm mocks)
+        """
+        self.path = path or get_cache_dir() / "history.sqlite"
+        if persist:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path if persist else ":memory:")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS rounds ("
+            " chain_id INTEGER NOT NULL, feed TEXT NOT NULL, round_id TEXT NOT NULL,"
+            " answer TEXT NOT NULL, started_at INTEGER NOT NULL, updated_at INTEGER NOT NULL,"
+            " PRIMARY KEY (chain_id, feed, round_id)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS supply_rates ("
+            " chain_id INTEGER NOT NULL, pool TEXT NOT NULL, asset TEXT NOT NULL, block INTEGER NOT NULL,"
+            " log_index INTEGER NOT NULL, timestamp INTEGER NOT NULL, liquidity_rate TEXT NOT NULL,"
+            " PRIMARY KEY (chain_id, pool, asset, block, log_index)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS supply_rate_scans ("
+            " chain_id INTEGER NOT NULL, pool TEXT NOT NULL, asset TEXT NOT NULL,"
+            " from_block INTEGER NOT NULL, to_block INTEGER NOT NULL,"
+            " PRIMARY KEY (chain_id, pool, asset)) WITHOUT ROWID;"
+        )
+
+    # ---- rounds ----
+    def get_rounds(self, chain_id: int, feed: str, round_ids: Iterable[int]) -> dict[int, Round]:
+        round_ids = [str(round_id) for round_id in round_ids]
+        rows = self._db.execute(
+            f"SELECT round_id, answer, started_at, updated_at FROM rounds"
+            f" WHERE chain_id = ? AND feed = ? AND round_id IN ({','.join('?' * len(round_ids))})",
+            (chain_id, feed.lower(), *round_ids),
+        )
+        return {int(r[0]): Round(int(r[0]), int(r[1]), r[2], r[3]) for r in rows}
+
+    def put_rounds(self, chain_id: int, feed: str, rounds: Iterable[Round]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO rounds VALUES (?, ?, ?, ?, ?, ?)",
+            [(chain_id, feed.lower(), str(r.round_id), str(r.answer), r.started_at, r.updated_at) for r in rounds],
+        )
+        self._db.commit()
+
+    # ---- supply rates ----
+    def get_rate_scan(self, chain_id: int, pool: str, asset: str) -> tuple[int, int] | None:
+        return self._db.execute(
+            "SELECT from_block, to_block FROM supply_rate_scans WHERE chain_id = ? AND pool = ? AND asset = ?",
+            (chain_id, pool.lower(), asset.lower()),
+        ).fetchone()
+
+    def put_rates(self, chain_id: int, pool: str, asset: str, rows: Iterable[tuple[int, int, RatePoint]], scan: tuple[int, int]):
+        """rows: (block, log_index, RatePoint), scan: block range now covered"""
+        key = (chain_id, pool.lower(), asset.lower())
+        self._db.executemany(
+            "INSERT OR REPLACE INTO supply_rates VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*key, block, log_index, p.timestamp, str(p.liquidity_rate)) for block, log_index, p in rows],
+        )
+        self._db.execute("INSERT OR REPLACE INTO supply_rate_scans VALUES (?, ?, ?, ?, ?)", (*key, *scan))
+        self._db.commit()
+
+    def get_rates(self, chain_id: int, pool: str, asset: str, from_block: int, to_block: int) -> Iterator[RatePoint]:
+        rows = self._db.execute(
+            "SELECT timestamp, block, liquidity_rate FROM supply_rates"
+            " WHERE chain_id = ? AND pool = ? AND asset = ? AND block BETWEEN ? AND ?"
+            " ORDER BY block, log_index",
+            (chain_id, pool.lower(), asset.lower(), from_block, to_block),
+        )
+        for timestamp, block, liquidity_rate in rows:
+            yield RatePoint(timestamp, block, int(liquidity_rate))
+
+
+def get_history_store() -> HistoryStore:
+    active_network = get_active_network()
+    # Local mocks are redeployed between runs at the same addresses with other data
+    return HistoryStore(persist=active_network.is_fork or not active_network.is_local_or_forked_network())
+
+
+def _round_range(feed: ABIContract, first_round: int | None, last_round: int | None, count: int | None) -> range:
+    if last_round is None:
+        last_round = feed.latestRoundData()[0]
+    if first_round is None:
+        phase_start = (last_round >> PHASE_OFFSET << PHASE_OFFSET) + 1  # first round of the current phase
+        first_round = phase_start if count is None else max(phase_start, last_round - count + 1)
+    return range(first_round, last_round + 1)
+
+
+def _fetch_rounds(feed: ABIContract, round_ids: list[int]) -> list[Round]:
+    batch = Multicall()
+    for round_id in round_ids:
+        batch.add(str(round_id), feed.getRoundData, round_id, allow_failure=True)  # reverts for missing rounds
+    results = batch.execute()
+    return [
+        Round(round_id, 0, 0, 0) if results[str(round_id)] is None else Round(round_id, *results[str(round_id)][1:4])
+        for round_id in round_ids
+    ]
+
+
+def iter_rounds(
+    feed: ABIContract,
+    first_round: int | None = None,
+    last_round: int | None = None,
+    count: int | None = None,
+    store: HistoryStore | None = None,
+    batch_size: int = ROUND_BATCH_SIZE,
+) -> Iterator[Round]:
+    """
+    Rounds of a Chainlink feed with data, oldest first.
+
+    Args:
+        feed: Price feed proxy, e.g. manifest_named("eth_usd")
+        first_round: Defaults to `count` rounds before last_round, or the start of its phase
+        last_round: Defaults to the latest round
+        count: Number of rounds to go back if first_round is None
+        store: Local cache, defaults to get_history_store()
+        batch_size: getRoundData calls per multicall for rounds not cached yet
+    """
+    store = store or get_history_store()
+    chain_id = get_chain_id()
+    feed_address = str(feed.address)
+    round_ids = _round_range(feed, first_round, last_round, count)
+
+    for start in range(0, len(round_ids), batch_size):
+        chunk = list(round_ids[start : start + batch_size])
+        rounds = store.get_rounds(chain_id, feed_address, chunk)
+        missing = [round_id for round_id in chunk if round_id not in rounds]
+        if missing:
+            fetched = _fetch_rounds(feed, missing)
+            store.put_rounds(chain_id, feed_address, fetched)
+            rounds.update((r.round_id, r) for r in fetched)
+        for round_id in chunk:
+            if rounds[round_id].updated_at:
+                yield rounds[round_id]
+
+
+# JSON-RPC client behind the environment: NetworkEnv or a forked pyevm, None on plain pyevm
+def _find_rpc(env):
+    rpc = getattr(env, "_rpc", None)
+    if rpc is None and getattr(env, "evm", None) is not None and env.evm.is_forked:
+        rpc = env.evm.vm.state._account_db._rpc
+    return rpc
+
+
+def latest_block(env) -> tuple[int, int]:
+    """(number, timestamp) of the block the environment runs on"""
+    if hasattr(env, "get_chain_id"):  # NetworkEnv
+        header = env._rpc.fetch("eth_getBlockByNumber", ["latest", False])
+        return to_int(header["number"]), to_int(header["timestamp"])
+    return env.evm.patch.block_number, env.evm.patch.timestamp
+
+
+def estimate_block_at(timestamp: int, env) -> int:
+    """Block at a past timestamp, counting 12 second slots back from the latest block."""
+    block_number, block_timestamp = latest_block(env)
+    return max(0, block_number - max(0, block_timestamp - timestamp) // SECONDS_PER_SLOT)
+
+
+def _fetch_rate_logs(rpc, pool: str, asset: str, from_block: int, to_block: int, block_range: int):
+    asset_topic = "0x" + asset.lower().removeprefix("0x").rjust(64, "0")
+    for start in range(from_block, to_block + 1, block_range):
+        logs = rpc.fetch("eth_getLogs", [{
+            "address": pool,
+            "topics": [RESERVE_DATA_UPDATED_TOPIC, asset_topic],
+            "fromBlock": to_hex(start),
+            "toBlock": to_hex(min(start + block_range - 1, to_block)),
+        }])
+        blocks = sorted({to_int(log["blockNumber"]) for log in logs})
+        headers = rpc.fetch_multi([("eth_getBlockByNumber", [to_hex(block), False]) for block in blocks]) if blocks else []
+        timestamps = {block: to_int(header["timestamp"]) for block, header in zip(blocks, headers)}
+        rows = []
+        for log in logs:
+            block = to_int(log["blockNumber"])
+            liquidity_rate = abi_decode("(uint256,uint256,uint256,uint256,uint256)", bytes.fromhex(log["data"][2:]))[0]
+            rows.append((block, to_int(log["logIndex"]), RatePoint(timestamps[block], block, liquidity_rate)))
+        yield rows, (start, min(start + block_range - 1, to_block))
+
+
+def iter_supply_rates(
+    pool: ABIContract,
+    asset: str,
+    from_block: int,
+    to_block: int | None = None,
+    store: HistoryStore | None = None,
+    block_range: int = LOG_BLOCK_RANGE,
+) -> Iterator[RatePoint]:
+    """
+    Supply rate history of an Aave reserve from its ReserveDataUpdated logs, oldest first.
+
+    Without an RPC (plain pyevm) there are no logs to query: the current rate
+    of getReserveData is returned as a single point, i.e. a constant rate.
+    """
+    env = pool.env
+    rpc = _find_rpc(env)
+    if rpc is None:
+        current_rate = pool.getReserveData(asset)[2]  # currentLiquidityRate
+        block_number, block_timestamp = latest_block(env)
+        yield RatePoint(block_timestamp, block_number, current_rate)
+        return
+
+    store = store or get_history_store()
+    chain_id = get_chain_id()
+    pool_address = str(pool.address)
+    to_block = latest_block(env)[0] if to_block is None else to_block
+
+    # Only scan the blocks around the range already in the store
+    scanned = store.get_rate_scan(chain_id, pool_address, asset)
+    if scanned is None or to_block < scanned[0] - 1 or from_block > scanned[1] + 1:
+        gaps, covered = [(from_block, to_block)], None  # disjoint, start over
+    else:
+        gaps, covered = [], scanned
+        if from_block < scanned[0]:
+            gaps.append((from_block, scanned[0] - 1))
+        if to_block > scanned[1]:
+            gaps.append((scanned[1] + 1, to_block))
+
+    for gap_start, gap_end in gaps:
+        for rows, (start, end) in _fetch_rate_logs(rpc, pool_address, asset, gap_start, gap_end, block_range):
+            covered = (min(start, covered[0]), max(end, covered[1])) if covered else (start, end)
+            store.put_rates(chain_id, pool_address, asset, rows, covered)
+
+    yield from store.get_rates(chain_id, pool_address, asset, from_block, to_block)
+
+
+def price_series(rounds: Iterable[Round], decimals: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Collect rounds into (timestamps, prices) arrays.
+    Rounds with a non positive answer or not newer than the previous one are dropped.
+    """
+    timestamps, prices = [], []
+    for r in rounds:
+        if r.answer > 0 and (not timestamps or r.updated_at > timestamps[-1]):
+            timestamps.append(r.updated_at)
+            prices.append(r.answer / 10 ** decimals)
+    return np.asarray(timestamps, dtype=np.int64), np.asarray(prices, dtype=np.float64)
+
+
+def rate_series(points: Iterable[RatePoint]) -> tuple[np.ndarray, np.ndarray]:
+    """Collect supply rates into (timestamps, yearly rates as fractions) arrays."""
+    points = list(points)
+    timestamps = np.asarray([p.timestamp for p in points], dtype=np.int64)
+    rates = np.asarray([p.liquidity_rate / RAY for p in points], dtype=np.float64)
+    return timestamps, rates
+
+
+def align(timestamps: np.ndarray, series_timestamps: np.ndarray, series_values: np.ndarray) -> np.ndarray:
+    """
+    Forward fill a series onto `timestamps`: the last value at or before each timestamp,
+    the first value for timestamps before the series starts.
+    """
+    positions = np.searchsorted(series_timestamps, timestamps, side="right") - 1
+    return series_values[np.clip(positions, 0, len(series_values) - 1)]
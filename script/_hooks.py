@@ -0,0 +1,176 @@
+"""
+Listeners of the activity of a boa environment: transactions and calls,
+deployments, broadcasts and RPC requests.
+
+    class GasCounter(EnvListener):
+        def on_execute_code(self, computation, kwargs, token):
+            ...
+
+    with listen(GasCounter()) as counter:
+        ...
+
+Each hooked method (env.execute_code, env.deploy, NetworkEnv._send_txn and
+the HTTP session of the RPC) is wrapped once, when the first listener
+attaches, and the wrapper dispatches to every listener attached at the time
+of the call. The original method is put back when the last listener
+detaches, so listeners can attach and detach in any order without one
+restoring over another's wrapper.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from contextlib import contextmanager
+from typing import Any, Iterator, TypeVar
+import boa
+import threading
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# (id of the hooked object, attribute) -> _Hook, while any listener is attached or a foreign wrapper sits on top
+_HOOKS: dict[tuple[int, str], "_Hook"] = {}
+_LOCK = threading.Lock()
+
+Listener = TypeVar("Listener", bound="EnvListener")
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class EnvListener:
+    """
+    Base of the listeners, every callback is a no-op. `token` is what
+    on_call_start returned for the same call, e.g. a start time.
+    """
+
+    def on_call_start(self) -> Any:
+        return None
+
+    def on_execute_code(self, computation, kwargs: dict, token: Any):
+        """After env.execute_code: kwargs["is_modifying"] tells calls from transactions."""
+
+    def on_deploy(self, computation, kwargs: dict, token: Any):
+        """After env.deploy."""
+
+    def on_send_txn(self, receipt: dict):
+        """After a NetworkEnv broadcast, with its receipt."""
+
+    def on_http(self, response, seconds: float):
+        """After an HTTP round trip to the RPC node."""
+
+
+class _Hook:
+    def __init__(self, obj, attribute: str, make_wrapper):
+        self.obj = obj
+        self.attribute = attribute
+        self.listeners: list[EnvListener] = []
+        self.own = attribute in vars(obj)  # set on the instance, not looked up on its class
+        self.original = getattr(obj, attribute)
+        self.wrapper = make_wrapper(self.original, self)
+        setattr(obj, attribute, self.wrapper)
+
+    def restore(self) -> bool:
+        """Put the original back, False if another wrapper was installed over ours since."""
+        if vars(self.obj).get(self.attribute) is not self.wrapper:
+            return False
+        if self.own:
+            setattr(self.obj, self.attribute, self.original)
+        else:
+            delattr(self.obj, self.attribute)
+        return True
+
+
+def _wrap_execute_code(execute_code, hook: _Hook):
+    def wrapped(*args, **kwargs):
+        listeners = list(hook.listeners)
+        tokens = [listener.on_call_start() for listener in listeners]
+        computation = execute_code(*args, **kwargs)
+        for listener, token in zip(listeners, tokens):
+            listener.on_execute_code(computation, kwargs, token)
+        return computation
+    return wrapped
+
+
+def _wrap_deploy(deploy, hook: _Hook):
+    def wrapped(*args, **kwargs):
+        listeners = list(hook.listeners)
+        tokens = [listener.on_call_start() for listener in listeners]
+        address, computation = deploy(*args, **kwargs)
+        for listener, token in zip(listeners, tokens):
+            listener.on_deploy(computation, kwargs, token)
+        return address, computation
+    return wrapped
+
+
+def _wrap_send_txn(send_txn, hook: _Hook):
+    def wrapped(*args, **kwargs):
+        tx_data, receipt, trace = send_txn(*args, **kwargs)
+        for listener in list(hook.listeners):
+            listener.on_send_txn(receipt)
+        return tx_data, receipt, trace
+    return wrapped
+
+
+def _wrap_post(post, hook: _Hook):
+    def wrapped(*args, **kwargs):
+        start = time.perf_counter()
+        response = post(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        for listener in list(hook.listeners):
+            listener.on_http(response, seconds)
+        return response
+    return wrapped
+
+
+# HTTP session of the RPC behind the environment: NetworkEnv or a forked pyevm, None on plain pyevm
+def find_rpc_session(env):
+    rpc = getattr(env, "_rpc", None)
+    if rpc is None and getattr(env, "evm", None) is not None and env.evm.is_forked:
+        rpc = env.evm.vm.state._account_db._rpc
+    while rpc is not None and not hasattr(rpc, "_session"):
+        rpc = getattr(rpc, "_rpc", None)  # unwrap CachingRPC
+    return rpc._session if rpc is not None else None
+
+
+def _targets(env) -> list[tuple[Any, str, Any]]:
+    targets = [(env, "execute_code", _wrap_execute_code), (env, "deploy", _wrap_deploy)]
+    if hasattr(env, "_send_txn"):  # NetworkEnv
+        targets.append((env, "_send_txn", _wrap_send_txn))
+    session = find_rpc_session(env)
+    if session is not None:
+        targets.append((session, "post", _wrap_post))
+    return targets
+
+
+def attach(listener: EnvListener, env=None):
+    """Dispatch the activity of `env` (boa.env if None) to `listener` until detach()."""
+    env = env or boa.env
+    with _LOCK:
+        for obj, attribute, make_wrapper in _targets(env):
+            key = (id(obj), attribute)
+            hook = _HOOKS.get(key)
+            if hook is None or hook.obj is not obj:
+                hook = _HOOKS[key] = _Hook(obj, attribute, make_wrapper)
+            if listener not in hook.listeners:
+                hook.listeners.append(listener)
+
+
+def detach(listener: EnvListener):
+    """Stop dispatching to `listener`, unhooking what no other listener uses."""
+    with _LOCK:
+        for key, hook in list(_HOOKS.items()):
+            if listener in hook.listeners:
+                hook.listeners.remove(listener)
+            if not hook.listeners and hook.restore():
+                del _HOOKS[key]
+
+
+@contextmanager
+def listen(listener: Listener, env=None) -> Iterator[Listener]:
+    attach(listener, env)
+    try:
+        yield listener
+    finally:
+        detach(listener)
@@ -0,0 +1,176 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from script._hooks import EnvListener, attach, detach
+from typing import Iterator
+import boa
+import json
+import os
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# "1" prints the summary table at the end of the run, a path ending in .json also writes the stats there
+INSTRUMENT_ENV_VAR = "MOX_REBALANCE_INSTRUMENT"
+UNATTRIBUTED = "(outside stages)"
+
+_NO_SPAN = nullcontext()  # returned by stage() while disabled, reused so disabled spans cost one lookup
+_active: "Instrumentation | None" = None
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+@dataclass
+class StageStats:
+    name: str
+    seconds: float = 0.0
+    eth_calls: int = 0       # read-only contract calls, a Multicall3 batch counts once
+    transactions: int = 0    # state changing calls and deployments
+    gas_used: int = 0        # of the transactions
+    rpc_requests: int = 0    # HTTP round trips to the RPC node (fork cache misses)
+    bytes_fetched: int = 0   # size of the RPC responses
+
+
+class Instrumentation(EnvListener):
+    """
+    Named spans with per-stage counters of the boa environment activity.
+
+    Usage:
+        with instrument() as instrumentation:
+            with stage("swap"):
+                router.exactInputSingle(...)
+        print(instrumentation.summary())
+
+    Counters go to the innermost open span. Hooks on the environment are only
+    installed between enable() and disable().
+    """
+
+    def __init__(self):
+        self.stages: dict[str, StageStats] = {}
+        self._open: list[StageStats] = []
+        self._seconds = 0.0  # of the top level spans, nested ones are inside them
+
+    def _stats(self, name: str) -> StageStats:
+        if name not in self.stages:
+            self.stages[name] = StageStats(name)
+        return self.stages[name]
+
+    def _current(self) -> StageStats:
+        return self._open[-1] if self._open else self._stats(UNATTRIBUTED)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[StageStats]:
+        stats = self._stats(name)
+        self._open.append(stats)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            seconds = time.perf_counter() - start
+            stats.seconds += seconds
+            self._open.pop()
+            if not self._open:
+                self._seconds += seconds
+
+    # ---- hooks ----
+    def on_execute_code(self, computation, kwargs: dict, token):
+        stats = self._current()
+        if kwargs.get("is_modifying", True):
+            stats.transactions += 1
+            stats.gas_used += computation.get_gas_used()
+        else:
+            stats.eth_calls += 1
+
+    def on_deploy(self, computation, kwargs: dict, token):
+        stats = self._current()
+        stats.transactions += 1
+        stats.gas_used += computation.get_gas_used()
+
+    def on_http(self, response, seconds: float):
+        stats = self._current()
+        stats.rpc_requests += 1
+        stats.bytes_fetched += len(response.content)
+
+    def enable(self, env=None):
+        attach(self, env)
+
+    def disable(self):
+        detach(self)
+
+    # ---- reporting ----
+    def totals(self) -> StageStats:
+        totals = StageStats("total")
+        for stats in self.stages.values():
+            for field in fields(StageStats)[2:]:  # counters go to the innermost span only
+                setattr(totals, field.name, getattr(totals, field.name) + getattr(stats, field.name))
+        totals.seconds = self._seconds  # a stage's seconds include the spans nested in it
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": [asdict(stats) for stats in self.stages.values()],
+            "total": asdict(self.totals()),
+        }
+
+    def to_json(self, path: str | Path | None = None) -> str:
+        data = json.dumps(self.to_dict(), indent=4)
+        if path is not None:
+            Path(path).write_text(data)
+        return data
+
+    def summary(self) -> str:
+        header = f"{'stage':<20}{'seconds':>10}{'eth_calls':>11}{'txs':>6}{'gas_used':>12}{'rpc_reqs':>10}{'bytes':>12}"
+        rows = [header, "-" * len(header)]
+        for stats in [*self.stages.values(), self.totals()]:
+            if stats.name == "total":
+                rows.append("-" * len(header))
+            rows.append(
+                f"{stats.name:<20}{stats.seconds:>10.3f}{stats.eth_calls:>11}{stats.transactions:>6}"
+                f"{stats.gas_used:>12}{stats.rpc_requests:>10}{stats.bytes_fetched:>12}"
+            )
+        return "\n".join(rows)
+
+
+def current_stage() -> str | None:
+    """Name of the innermost open span, UNATTRIBUTED outside spans, None while disabled."""
+    return None if _active is None else _active._current().name
+
+
+def stage(name: str):
+    """Span of the active instrumentation, a shared no-op context when disabled."""
+    if _active is None:
+        return _NO_SPAN
+    return _active.span(name)
+
+
+@contextmanager
+def instrument(env=None) -> Iterator[Instrumentation]:
+    global _active
+    instrumentation = Instrumentation()
+    instrumentation.enable(env)
+    previous, _active = _active, instrumentation
+    try:
+        yield instrumentation
+    finally:
+        _active = previous
+        instrumentation.disable()
+
+
+@contextmanager
+def instrument_from_env() -> Iterator[Instrumentation | None]:
+    """Instrument the block if $MOX_REBALANCE_INSTRUMENT is set, then print/export the stats."""
+    setting = os.environ.get(INSTRUMENT_ENV_VAR)
+    if not setting:
+        yield None
+        return
+    with instrument() as instrumentation:
+        yield instrumentation
+    print(instrumentation.summary())
+    if setting.endswith(".json"):
+        instrumentation.to_json(setting)
@@ -0,0 +1,388 @@
+"""
+Journal of rebalance runs: one row per run in a local SQLite file, appended,
+never updated.
+
+    journal = get_journal()                             # None unless enabled, see below
+    with record_activity() as activity:
+        _, result = _run_rebalance()
+    journal.record(journal_entry(result, activity, assets))   # record_many: one transaction
+    journal.aggregate(account=..., group_by="quarter")  # "what did rebalancing cost last quarter"
+    journal.export("runs.csv", since=...)               # streamed, never all rows at once
+
+Each row keeps the balances before and after, the Chainlink prices, the trade,
+the gas, the fees and the hashes of the broadcast transactions. USD values are
+fixed at the oracle prices of the run when it is recorded, so aggregates are
+plain sums.
+
+Every insert also adds the run to a per (network, account, day) rollup in the
+same transaction. Aggregates over whole days are summed from the rollup, a
+handful of rows per account and day whatever the number of runs; other ranges
+(blocks, timestamps inside a day) read the covering indexes of the runs table.
+No row is loaded into Python either way.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.rpc import to_int
+from contextlib import contextmanager
+from moccasin.config import get_active_network
+from pathlib import Path
+from script._cache import get_cache_dir
+from script._history import latest_block
+from script._hooks import EnvListener, listen
+from script._reserve_registry import get_chain_id
+from typing import Iterator, NamedTuple
+import boa
+import csv
+import json
+import os
+import sqlite3
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# Path of the journal file, "1" for journal.sqlite in the cache directory, "0" to disable.
+# Unset: live networks are journaled in the cache directory, pyevm and forks are not.
+JOURNAL_ENV_VAR = "MOX_REBALANCE_JOURNAL"
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Period keys of a day number (days since the epoch) in SQL
+PERIODS = {
+    "day": "date(day * 86400, 'unixepoch')",
+    "month": "strftime('%Y-%m', day * 86400, 'unixepoch')",
+    "quarter": "strftime('%Y', day * 86400, 'unixepoch') || '-Q' || ((CAST(strftime('%m', day * 86400, 'unixepoch') AS INTEGER) + 2) / 3)",
+    "year": "strftime('%Y', day * 86400, 'unixepoch')",
+}
+GROUPS = ("account", "network", *PERIODS)
+
+# Columns read by aggregate(), at the end of every index of the runs table so it never reads a row
+_INDEXED = "network, sold, value_in_usd, trade_cost_usd, gas_used, gas_cost_usd"
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class JournalEntry(NamedTuple):
+    chain_id: int
+    network: str
+    account: str
+    block: int
+    timestamp: int
+    needs_rebalancing: bool
+    sold: str | None               # asset names of the trade, None if nothing was traded
+    bought: str | None
+    amount_in: int                 # base units
+    amount_out: int
+    value_in_usd: float            # of the amounts, at the oracle prices of the run
+    value_out_usd: float
+    value_before_usd: float        # of the whole portfolio, wallet and aTokens
+    value_after_usd: float
+    transactions: int
+    gas_used: int
+    gas_cost_usd: float
+    prices: dict[str, float]       # feed name: price
+    balances_before: dict[str, int]
+    balances_after: dict[str, int]
+    route: list[dict]              # legs of the swap, see RouteLeg
+    tx_hashes: tuple[str, ...]     # empty on pyevm and forks, nothing is broadcast
+
+    @property
+    def trade_cost_usd(self) -> float:
+        """Fees and price impact of the swap, at the oracle prices."""
+        return self.value_in_usd - self.value_out_usd
+
+
+class Aggregate(NamedTuple):
+    key: str | None                # group, None without group_by
+    runs: int
+    trades: int
+    value_in_usd: float
+    trade_cost_usd: float
+    gas_used: int
+    gas_cost_usd: float
+
+    @property
+    def total_cost_usd(self) -> float:
+        return self.trade_cost_usd + self.gas_cost_usd
+
+
+class RunActivity(EnvListener):
+    """Transactions sent while recording: count, gas, fees and hashes of the broadcast ones."""
+
+    def __init__(self, env=None):
+        self.env = env or boa.env
+        self.transactions = 0
+        self.gas_used = 0
+        self.tx_hashes: list[str] = []
+        self._receipt_fees = 0
+
+    @property
+    def fees_wei(self) -> int:
+        """From the receipts once anything was broadcast, at the gas price of the env otherwise."""
+        if self.tx_hashes:
+            return self._receipt_fees
+        return self.gas_used * self.env.get_gas_price()
+
+    # ---- hooks ----
+    def on_execute_code(self, computation, kwargs: dict, token):
+        if kwargs.get("is_modifying", True) and not kwargs.get("simulate", False):
+            self.transactions += 1
+            self.gas_used += computation.get_gas_used()
+
+    def on_deploy(self, computation, kwargs: dict, token):
+        self.transactions += 1
+        self.gas_used += computation.get_gas_used()
+
+    def on_send_txn(self, receipt: dict):
+        self.tx_hashes.append(receipt["transactionHash"])
+        self._receipt_fees += to_int(receipt["gasUsed"]) * to_int(receipt["effectiveGasPrice"])
+
+
+@contextmanager
+def record_activity(env=None) -> Iterator[RunActivity]:
+    activity = RunActivity(env)
+    with listen(activity, activity.env):
+        yield activity
+
+
+def journal_entry(result: dict, activity: RunActivity, assets: dict[str, tuple[str, int]], eth_feed: str = "eth_usd") -> JournalEntry:
+    """
+    Row of a run, from the result of _run_rebalance.
+
+    Args:
+        assets: {asset name: (feed name, token decimals)}, aToken balances are "a_<asset name>"
+        eth_feed: Feed pricing the gas
+    """
+    prices = result["prices"]
+
+    def value(name: str, amount: int) -> float:
+        feed_name, decimals = assets[name]
+        return amount / 10 ** decimals * prices[feed_name]
+
+    def portfolio(balances: dict[str, int]) -> float:
+        return sum(value(name, balances.get(name, 0) + balances.get(f"a_{name}", 0)) for name in assets)
+
+    trades = result["trades"]
+    block, timestamp = latest_block(boa.env)
+    return JournalEntry(
+        chain_id=get_chain_id(),
+        network=result["network"],
+        account=result["account"].lower(),
+        block=block,
+        timestamp=timestamp,
+        needs_rebalancing=result["needs_rebalancing"],
+        sold=trades["sold"],
+        bought=trades["bought"],
+        amount_in=trades["amount_in"],
+        amount_out=trades["amount_out"],
+        value_in_usd=value(trades["sold"], trades["amount_in"]) if trades["sold"] else 0.0,
+        value_out_usd=value(trades["bought"], trades["amount_out"]) if trades["bought"] else 0.0,
+        value_before_usd=portfolio(result["balances_before"]),
+        value_after_usd=portfolio(result["balances_after"]),
+        transactions=activity.transactions,
+        gas_used=activity.gas_used,
+        gas_cost_usd=activity.fees_wei / 1e18 * prices[eth_feed],
+        prices=prices,
+        balances_before=result["balances_before"],
+        balances_after=result["balances_after"],
+        route=result["route"],
+        tx_hashes=tuple(activity.tx_hashes),
+    )
+
+
+class RunJournal:
+    """
+    Runs in SQLite, indexed by account, block and timestamp. Amounts and
+    balances are kept exact (text and JSON), USD values and gas as numbers
+    for the aggregates.
+    """
+
+    def __init__(self, path: Path | str | None = None, persist: bool = True):
+        """
+        Args:
+            path: SQLite file, defaults to journal.sqlite in get_cache_dir()
+            persist: Keep the journal in memory only if False
+        """
+        self.path = Path(path) if path else get_cache_dir() / "journal.sqlite"
+        if persist:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path if persist else ":memory:")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " id INTEGER PRIMARY KEY, chain_id INTEGER NOT NULL, network TEXT NOT NULL, account TEXT NOT NULL,"
+            " block INTEGER NOT NULL, timestamp INTEGER NOT NULL, needs_rebalancing INTEGER NOT NULL,"
+            " sold TEXT, bought TEXT, amount_in TEXT NOT NULL, amount_out TEXT NOT NULL,"
+            " value_in_usd REAL NOT NULL, value_out_usd REAL NOT NULL, trade_cost_usd REAL NOT NULL,"
+            " value_before_usd REAL NOT NULL, value_after_usd REAL NOT NULL,"
+            " transactions INTEGER NOT NULL, gas_used INTEGER NOT NULL, gas_cost_usd REAL NOT NULL,"
+            " prices TEXT NOT NULL, balances_before TEXT NOT NULL, balances_after TEXT NOT NULL,"
+            " route TEXT NOT NULL, tx_hashes TEXT NOT NULL);"
+            f"CREATE INDEX IF NOT EXISTS runs_account ON runs (account, timestamp, {_INDEXED});"
+            f"CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp, account, {_INDEXED});"
+            f"CREATE INDEX IF NOT EXISTS runs_block ON runs (block, account, {_INDEXED});"
+            "CREATE TABLE IF NOT EXISTS daily ("
+            " network TEXT NOT NULL, account TEXT NOT NULL, day INTEGER NOT NULL,"
+            " runs INTEGER NOT NULL, trades INTEGER NOT NULL, value_in_usd REAL NOT NULL,"
+            " trade_cost_usd REAL NOT NULL, gas_used INTEGER NOT NULL, gas_cost_usd REAL NOT NULL,"
+            " PRIMARY KEY (network, account, day)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS daily_day ON daily (day);"
+        )
+
+    # ---- writes ----
+    def record(self, entry: JournalEntry):
+        self.record_many([entry])
+
+    def record_many(self, entries):
+        """Append runs and their rollup in one transaction."""
+        rows = [
+            (
+                e.chain_id, e.network, e.account.lower(), e.block, e.timestamp, int(e.needs_rebalancing),
+                e.sold, e.bought, str(e.amount_in), str(e.amount_out),
+                e.value_in_usd, e.value_out_usd, e.trade_cost_usd, e.value_before_usd, e.value_after_usd,
+                e.transactions, e.gas_used, e.gas_cost_usd,
+                json.dumps(e.prices), json.dumps(e.balances_before), json.dumps(e.balances_after),
+                json.dumps(e.route), json.dumps(list(e.tx_hashes)),
+            )
+            for e in entries
+        ]
+        with self._db:
+            self._db.executemany(f"INSERT INTO runs VALUES (NULL{', ?' * 23})", rows)
+            self._db.executemany(
+                "INSERT INTO daily VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (network, account, day) DO UPDATE SET"
+                " runs = runs + 1, trades = trades + excluded.trades, value_in_usd = value_in_usd + excluded.value_in_usd,"
+                " trade_cost_usd = trade_cost_usd + excluded.trade_cost_usd, gas_used = gas_used + excluded.gas_used,"
+                " gas_cost_usd = gas_cost_usd + excluded.gas_cost_usd",
+                [(row[1], row[2], row[4] // SECONDS_PER_DAY, int(row[6] is not None), row[10], row[12], row[16], row[17]) for row in rows],
+            )
+
+    # ---- reads ----
+    @staticmethod
+    def _where(filters: dict, columns: dict[str, str]) -> tuple[str, list]:
+        clauses, params = [], []
+        for name, value in filters.items():
+            if value is not None:
+                clauses.append(columns[name])
+                params.append(value.lower() if name == "account" else value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def aggregate(
+        self,
+        network: str | None = None,
+        account: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        from_block: int | None = None,
+        to_block: int | None = None,
+        group_by: str | None = None,
+    ) -> list[Aggregate]:
+        """
+        Totals of the runs matching every filter given.
+
+        Args:
+            since: First timestamp, inclusive
+            until: Last timestamp, exclusive
+            from_block: First block, inclusive
+            to_block: Last block, inclusive
+            group_by: One of GROUPS ("account", "network", "day", "month", "quarter", "year"), None for one total
+
+        Returns:
+            Aggregates ordered by key, one with zero runs if nothing matched and group_by is None
+        """
+        if group_by is not None and group_by not in GROUPS:
+            raise ValueError(f"group_by must be one of {GROUPS}, not {group_by!r}")
+        whole_days = all(t is None or t % SECONDS_PER_DAY == 0 for t in (since, until))
+        if from_block is None and to_block is None and whole_days:
+            table, totals = "daily", "sum(runs), sum(trades)"
+            where, params = self._where(
+                {"network": network, "account": account,
+                 "since": None if since is None else since // SECONDS_PER_DAY,
+                 "until": None if until is None else until // SECONDS_PER_DAY},
+                {"network": "network = ?", "account": "account = ?", "since": "day >= ?", "until": "day < ?"},
+            )
+        else:
+            table, totals = "runs", "count(*), count(sold)"
+            where, params = self._where(
+                {"network": network, "account": account, "since": since, "until": until,
+                 "from_block": from_block, "to_block": to_block},
+                {"network": "network = ?", "account": "account = ?", "since": "timestamp >= ?", "until": "timestamp < ?",
+                 "from_block": "block >= ?", "to_block": "block <= ?"},
+            )
+        key = "NULL"
+        if group_by in PERIODS:
+            key = PERIODS[group_by] if table == "daily" else PERIODS[group_by].replace("day *", "timestamp / 86400 *")
+        elif group_by is not None:
+            key = group_by
+        query = (
+            f"SELECT {key}, {totals}, total(value_in_usd), total(trade_cost_usd), total(gas_used), total(gas_cost_usd)"
+            f" FROM {table}{where}"
+        )
+        if group_by is not None:
+            query += " GROUP BY 1 ORDER BY 1"
+        return [
+            Aggregate(k, runs or 0, trades or 0, value_in, trade_cost, int(gas), gas_cost)
+            for k, runs, trades, value_in, trade_cost, gas, gas_cost in self._db.execute(query, params)
+        ]
+
+    def rows(
+        self,
+        network: str | None = None,
+        account: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        from_block: int | None = None,
+        to_block: int | None = None,
+    ) -> Iterator[JournalEntry]:
+        """Runs matching every filter, oldest first, read from the cursor as they are iterated."""
+        where, params = self._where(
+            {"network": network, "account": account, "since": since, "until": until, "from_block": from_block, "to_block": to_block},
+            {"network": "network = ?", "account": "account = ?", "since": "timestamp >= ?", "until": "timestamp < ?",
+             "from_block": "block >= ?", "to_block": "block <= ?"},
+        )
+        cursor = self._db.execute(
+            "SELECT chain_id, network, account, block, timestamp, needs_rebalancing, sold, bought, amount_in, amount_out,"
+            " value_in_usd, value_out_usd, value_before_usd, value_after_usd, transactions, gas_used, gas_cost_usd,"
+            f" prices, balances_before, balances_after, route, tx_hashes FROM runs{where} ORDER BY timestamp, id",
+            params,
+        )
+        for row in cursor:
+            (chain_id, network_name, account_address, block, timestamp, needs_rebalancing, sold, bought, amount_in, amount_out,
+             *numbers, prices, balances_before, balances_after, route, tx_hashes) = row
+            yield JournalEntry(
+                chain_id, network_name, account_address, block, timestamp, bool(needs_rebalancing), sold, bought,
+                int(amount_in), int(amount_out), *numbers,
+                json.loads(prices), json.loads(balances_before), json.loads(balances_after), json.loads(route),
+                tuple(json.loads(tx_hashes)),
+            )
+
+    def export(self, path: Path | str, **filters) -> int:
+        """
+        Write the runs matching `filters` (see rows) to a CSV file, one run at a time.
+
+        Returns:
+            Number of runs written
+        """
+        count = 0
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow([*JournalEntry._fields, "trade_cost_usd"])
+            for entry in self.rows(**filters):
+                writer.writerow([
+                    json.dumps(value) if isinstance(value, (dict, list, tuple)) else value
+                    for value in (*entry, entry.trade_cost_usd)
+                ])
+                count += 1
+        return count
+
+
+def get_journal() -> RunJournal | None:
+    """Journal of the active network, None if it is not journaled (see JOURNAL_ENV_VAR)."""
+    setting = os.environ.get(JOURNAL_ENV_VAR)
+    if setting == "0":
+        return None
+    if setting and setting != "1":
+        return RunJournal(Path(os.path.expanduser(setting)))
+    if setting == "1" or not get_active_network().is_local_or_forked_network():
+        return RunJournal()
+    return None  # pyevm and forks: nothing real was traded
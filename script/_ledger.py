@@ -0,0 +1,152 @@
+"""
+Token positions of one account kept in memory from the logs of its own
+transactions, instead of balanceOf reads after every step.
+
+    ledger = PositionLedger(boa.env.eoa, {"usdc": usdc, "a_usdc": a_usdc}, balances)
+    with ledger:
+        pool.withdraw(usdc.address, amount, boa.env.eoa)
+        ledger.sync()
+        ledger.positions["usdc"]       # no read
+    ledger.reconcile()                 # one multicall, once at the end
+
+Every balance change of an ERC20 and of an Aave aToken emits a Transfer, mints
+and burns included. An aToken folds the interest accrued since the account's
+last action into the minted or burnt amount, interest already counted in
+the balances the ledger opened with: the `balanceIncrease` of the Mint or Burn
+emitted alongside is taken back out. Interest accrued after the ledger opened
+only shows up in reconcile(). Supply, Withdraw and Swap logs are decoded into
+`events`, the record of what each step did.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from script._events import BURN, MINT, SUPPLY, SWAP, TRANSFER, WITHDRAW, LocalLogSource, LogEntry, address_topic, topic_address
+from script._multicall import Multicall
+from typing import NamedTuple
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+INT256_OFFSET = 2 ** 256
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class LedgerEvent(NamedTuple):
+    kind: str                 # "transfer", "supply", "withdraw" or "swap"
+    address: str              # emitter
+    asset: str | None         # token of a transfer, reserve of a supply/withdraw, None for a swap
+    amounts: tuple[int, ...]  # (value,), (amount,) or (amount0, amount1) signed, + paid into the pool
+    block: int
+
+
+def _words(data: bytes) -> list[int]:
+    return [int.from_bytes(data[i:i + 32], "big") for i in range(0, len(data), 32)]
+
+
+def _signed(word: int) -> int:
+    return word - INT256_OFFSET if word >= INT256_OFFSET // 2 else word
+
+
+class PositionLedger:
+    """
+    Balances of `tokens` held by `account`, updated from the logs collected
+    while the ledger is open.
+    """
+
+    def __init__(self, account, tokens: dict[str, ABIContract], balances: dict[str, int] | None = None, env=None):
+        """
+        Args:
+            account: Account whose positions are tracked
+            tokens: {"usdc": contract, "a_usdc": contract, ...}
+            balances: Positions at the point the ledger opens, read in one multicall if None
+        """
+        self.account = str(account)
+        self.tokens = tokens
+        self.positions = dict(balances) if balances is not None else self._read_balances()
+        self.events: list[LedgerEvent] = []
+        self._names = {str(token.address): name for name, token in tokens.items()}
+        self._account_topic = address_topic(self.account)
+        self._logs = LocalLogSource(env or next(iter(tokens.values())).env)
+
+    def __enter__(self) -> "PositionLedger":
+        self._logs.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.sync()
+        self._logs.stop()
+
+    def _read_balances(self) -> dict[str, int]:
+        batch = Multicall()
+        for name, token in self.tokens.items():
+            batch.add(name, token.balanceOf, self.account)
+        return batch.execute()
+
+    def sync(self) -> list[LedgerEvent]:
+        """Apply the logs collected since the last sync, returns their events."""
+        _, entries = self._logs.poll()
+        return self.apply(entries)
+
+    def apply(self, entries: list[LogEntry]) -> list[LedgerEvent]:
+        """Update the positions from decoded logs, returns the events concerning the account."""
+        events = []
+        for entry in entries:
+            event = self._decode(entry)
+            if event is not None:
+                events.append(event)
+        self.events.extend(events)
+        return events
+
+    def _decode(self, entry: LogEntry) -> LedgerEvent | None:
+        signature, *indexed = entry.topics
+        if signature == TRANSFER and entry.address in self._names and len(indexed) == 2:
+            if self._account_topic not in indexed:
+                return None
+            (value,) = _words(entry.data)
+            name = self._names[entry.address]
+            if indexed[0] == self._account_topic:
+                self.positions[name] -= value
+            if indexed[1] == self._account_topic:
+                self.positions[name] += value
+            return LedgerEvent("transfer", entry.address, entry.address, (value,), entry.block)
+        if signature in (MINT, BURN) and entry.address in self._names:
+            # onBehalfOf of a Mint, from of a Burn: already booked by its Transfer, but for the interest
+            if indexed[1 if signature == MINT else 0] == self._account_topic:
+                self.positions[self._names[entry.address]] -= _words(entry.data)[1]  # balanceIncrease
+            return None
+        if signature == SUPPLY and indexed[1:2] == [self._account_topic]:  # onBehalfOf
+            return LedgerEvent("supply", entry.address, topic_address(indexed[0]), (_words(entry.data)[1],), entry.block)
+        if signature == WITHDRAW and self._account_topic in indexed[1:]:  # user or to
+            return LedgerEvent("withdraw", entry.address, topic_address(indexed[0]), (_words(entry.data)[0],), entry.block)
+        if signature == SWAP and indexed[1:2] == [self._account_topic]:  # recipient
+            amount0, amount1 = (_signed(word) for word in _words(entry.data)[:2])
+            return LedgerEvent("swap", entry.address, None, (amount0, amount1), entry.block)
+        return None
+
+    def last(self, kind: str) -> LedgerEvent | None:
+        """Latest event of a kind, e.g. the withdraw of the current step."""
+        return next((event for event in reversed(self.events) if event.kind == kind), None)
+
+    def reconcile(self) -> dict[str, tuple[int, int]]:
+        """
+        Read every balance once and reset the positions to the chain.
+
+        Returns:
+            {name: (ledger, chain)} of the positions that differed, empty if none
+        """
+        chain = self._read_balances()
+        differences = {name: (self.positions[name], chain[name]) for name in chain if self.positions[name] != chain[name]}
+        self.positions = chain
+        return differences
+
+
+def swap_amounts(event: LedgerEvent, token_in, token_out) -> tuple[int, int]:
+    """(amount_in, amount_out) of a swap event, token0 being the lower address as in Uniswap v3."""
+    amount0, amount1 = event.amounts
+    if int(str(token_in.address), 16) < int(str(token_out.address), 16):
+        return amount0, -amount1
+    return amount1, -amount0
@@ -0,0 +1,226 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from script._events import address_topic, get_log_source
+from script._multi_account import (
+    Market,
+    execute_plans,
+    get_market,
+    get_transactor,
+    plan_accounts,
+    snapshot_accounts,
+)
+from script._multicall import Multicall
+from script._rebalance_engine import DEFAULT_BUFFER, plan_rebalance
+from dataclasses import dataclass
+import numpy as np
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+DEFAULT_POLL_INTERVAL = 1.0  # seconds between polls, about a tenth of a block
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+@dataclass
+class MonitorStats:
+    polls: int = 0
+    idle_polls: int = 0      # no new block, nothing read
+    price_reads: int = 0     # feeds re-read after a new round
+    balance_reads: int = 0   # accounts re-read after one of their events
+    triggers: int = 0        # accounts handed to the trade pipeline
+
+
+class DriftMonitor:
+    """
+    Keep the drift of accounts up to date with as few reads as possible.
+
+    Usage:
+        with DriftMonitor(accounts, targets=[0.3, 0.7]) as monitor:
+            monitor.run()  # until interrupted
+
+    Each poll:
+        - no new block on a live network, no new log on pyevm and forks:
+          nothing is read
+        - latestRound of every feed in one multicall, latestAnswer only of the
+          feeds with a new round
+        - aToken balances only of the accounts named in a Transfer, Supply or
+          Withdraw log of the pool or the aTokens since the last poll
+        - drift recomputed for the changed rows, or every row after a new price
+    Accounts whose drift exceeds the buffer go to `on_drift`, by default the
+    multi-account trade pipeline through `transactor`. Interest accrues without events: balances
+    are refreshed in full on the first new block after `refresh_every` polls.
+    """
+
+    def __init__(
+        self,
+        accounts,
+        targets,
+        buffer: float = DEFAULT_BUFFER,
+        market: Market | None = None,
+        on_drift=None,
+        transactor=None,
+        refresh_every: int = 3600,
+        log_source=None,
+    ):
+        """
+        Args:
+            accounts: Addresses to watch
+            targets: (A,) target allocations, in the order of the market assets
+            on_drift: on_drift(accounts) called with the accounts to rebalance,
+                rebalances them with `transactor` if None
+            transactor: Used if on_drift is None, get_transactor() if None: live
+                networks need a RawTransactor with the signers of the accounts
+            log_source: LocalLogSource or RPCLogSource, get_log_source() if None
+        """
+        self.accounts = [str(account) for account in accounts]
+        self.targets = np.asarray(targets, dtype=np.float64)
+        self.buffer = buffer
+        self.market = market or get_market()
+        self.on_drift = on_drift or self._rebalance
+        self.transactor = transactor or (get_transactor() if on_drift is None else None)
+        self.refresh_every = refresh_every
+        self.stats = MonitorStats()
+        self.log_source = log_source or get_log_source([self.market.pool.address, *(t.address for t in self.market.a_tokens)])
+
+        self._account_topics = {address_topic(account): p for p, account in enumerate(self.accounts)}
+        self._watched = {str(self.market.pool.address), *(str(t.address) for t in self.market.a_tokens)}
+        self._scales = np.array([10 ** d for d in self.market.token_decimals], dtype=np.float64)
+        self._block = None
+        self._refreshed_at = None  # poll of the last full read, None until the first one
+        self._rounds = [None] * len(self.market.feeds)
+        self._decimals = [None] * len(self.market.feeds)
+        self._prices = np.zeros(len(self.market.feeds))
+        self._balances = np.zeros((len(self.accounts), len(self.market.tokens)))
+        self.drift = np.zeros(len(self.accounts))
+        self.needs_rebalancing = np.zeros(len(self.accounts), dtype=bool)
+        self._triggered = np.zeros(len(self.accounts), dtype=bool)  # handed over, wait for their events
+
+    def __enter__(self) -> "DriftMonitor":
+        self.log_source.start()
+        self.refresh()
+        return self
+
+    def __exit__(self, *exc):
+        self.log_source.stop()
+
+    # ---- reads ----
+    def refresh(self):
+        """Read every price and balance, e.g. at start."""
+        batch = Multicall()
+        for i, feed in enumerate(self.market.feeds):
+            batch.add(f"round/{i}", feed.latestRound)
+            batch.add(f"answer/{i}", feed.latestAnswer)
+            batch.add(f"decimals/{i}", feed.decimals)
+        self._add_balance_calls(batch, range(len(self.accounts)))
+        results = batch.execute()
+        self._decimals = [results[f"decimals/{i}"] for i in range(len(self.market.feeds))]
+        self._rounds = [results[f"round/{i}"] for i in range(len(self.market.feeds))]
+        self._prices = np.array([results[f"answer/{i}"] / 10 ** d for i, d in enumerate(self._decimals)])
+        self._set_balances(results, range(len(self.accounts)))
+        self._triggered[:] = False
+        self._refreshed_at = self.stats.polls
+        self._evaluate(slice(None))
+
+    def _add_balance_calls(self, batch: Multicall, rows):
+        for p in rows:
+            for i, a_token in enumerate(self.market.a_tokens):
+                batch.add(f"{p}/{i}", a_token.balanceOf, self.accounts[p])
+
+    def _set_balances(self, results: dict, rows):
+        for p in rows:
+            self._balances[p] = [results[f"{p}/{i}"] for i in range(len(self.market.a_tokens))]
+        self._balances[list(rows)] /= self._scales
+
+    def _touched_accounts(self, entries) -> set[int]:
+        rows = set()
+        for entry in entries:
+            if entry.address in self._watched:
+                rows.update(self._account_topics[t] for t in entry.topics[1:] if t in self._account_topics)
+        return rows
+
+    def _evaluate(self, rows):
+        plan = plan_rebalance(self._balances[rows], self._prices, self.targets, self.buffer)
+        self.drift[rows] = plan.drift
+        self.needs_rebalancing[rows] = plan.needs_rebalancing
+
+    # ---- loop ----
+    def poll(self) -> list[str]:
+        """
+        One incremental update.
+
+        Returns:
+            Accounts handed to on_drift by this poll
+        """
+        self.stats.polls += 1
+        block, entries = self.log_source.poll()
+        if self._refreshed_at is None:  # first poll outside `with`
+            self._block = block
+            self.refresh()
+            return self._trigger()
+        # Every transaction of the in-process EVM is seen, feed updates included
+        idle = not entries if self.log_source.is_local else block == self._block
+        if idle:
+            self.stats.idle_polls += 1
+            return self._trigger()
+        self._block = block
+        if self.stats.polls - self._refreshed_at >= self.refresh_every:
+            self.refresh()
+            return self._trigger()
+
+        # New rounds, with the balances of the accounts named in the new logs
+        touched = sorted(self._touched_accounts(entries))
+        batch = Multicall()
+        for i, feed in enumerate(self.market.feeds):
+            batch.add(f"round/{i}", feed.latestRound)
+        self._add_balance_calls(batch, touched)
+        results = batch.execute()
+
+        new_rounds = [i for i, current in enumerate(self._rounds) if results[f"round/{i}"] != current]
+        if new_rounds:
+            answers = Multicall()
+            for i in new_rounds:
+                answers.add(str(i), self.market.feeds[i].latestAnswer)
+            for i, answer in answers.execute().items():
+                self._prices[int(i)] = answer / 10 ** self._decimals[int(i)]
+                self._rounds[int(i)] = results[f"round/{i}"]
+            self.stats.price_reads += len(new_rounds)
+
+        if touched:
+            self._set_balances(results, touched)
+            self._triggered[touched] = False
+            self.stats.balance_reads += len(touched)
+
+        if new_rounds:
+            self._evaluate(slice(None))
+        elif touched:
+            self._evaluate(touched)
+        return self._trigger()
+
+    def _trigger(self) -> list[str]:
+        rows = np.flatnonzero(self.needs_rebalancing & ~self._triggered)
+        if len(rows) == 0:
+            return []
+        self._triggered[rows] = True
+        accounts = [self.accounts[p] for p in rows]
+        self.stats.triggers += len(accounts)
+        self.on_drift(accounts)
+        return accounts
+
+    def _rebalance(self, accounts: list[str]):
+        snapshot = snapshot_accounts(self.market, accounts)
+        plans = plan_accounts(self.market, accounts, snapshot, self.targets, self.buffer)
+        execute_plans(self.transactor, self.market, plans, snapshot)
+
+    def run(self, poll_interval: float = DEFAULT_POLL_INTERVAL, max_polls: int | None = None):
+        """Poll until interrupted, or `max_polls` times."""
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            start = time.perf_counter()
+            self.poll()
+            polls += 1
+            time.sleep(max(0.0, poll_interval - (time.perf_counter() - start)))
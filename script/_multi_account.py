@@ -0,0 +1,389 @@
+"""
+Rebalance many accounts in one run.
+
+    results = rebalance_accounts([account_1, account_2, ...], targets=[0.3, 0.7])
+
+1. One multicall reads the aToken balances and the allowances of every
+   account, with the prices.
+2. All portfolios are planned at once with plan_rebalance / plan_swap_leg.
+3. Each account quotes its route over the Uniswap fee tiers, withdraws its
+   delta, swaps it and supplies the output. A failing account is reported
+   and does not stop the others.
+
+On live networks transactions are signed locally and broadcast as raw
+transactions, with the nonces of each account counted locally, so several
+accounts wait for their receipts at the same time. pyevm and forks run
+transactions in the in-process EVM one at a time, impersonating the accounts.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from boa.rpc import to_hex, to_int
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from eth_account import Account
+from eth_utils import keccak
+from pathlib import Path
+from script._allowances import AllowanceManager, approve_max_from_env
+from script._contract_registry import get_contract
+from script._multicall import Multicall
+from script._rebalance_engine import DEFAULT_BUFFER, SwapLeg, plan_rebalance, plan_rebalance_exact, plan_swap_leg
+from script._reserve_registry import get_reserve_registry
+from script._routing import DEFAULT_SLIPPAGE, FEE_TIERS, plan_route
+from typing import Any, NamedTuple
+import boa
+import threading
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+REBALANCED = "rebalanced"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+DEFAULT_MAX_WORKERS = 8     # accounts in flight at once on live networks
+DEFAULT_MIN_OUT = 0.9       # floor of amountOutMinimum over the oracle value, ORACLE_FLOOR in run_script
+REFERRAL_CODE = 0
+RECEIPT_TIMEOUT = 240       # seconds
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+
+# Gas limits of the raw transactions: the swap cannot be estimated before the withdraw is mined
+GAS_LIMITS = {"approve": 100_000, "withdraw": 400_000, "exactInputSingle": 300_000, "supply": 400_000}
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class Market(NamedTuple):
+    """Contracts shared by every account, assets in the order of the plan columns."""
+    pool: ABIContract
+    router: ABIContract
+    quoter: ABIContract
+    tokens: tuple[ABIContract, ...]
+    a_tokens: tuple[ABIContract, ...]
+    feeds: tuple[ABIContract, ...]
+    token_decimals: tuple[int, ...]
+
+
+class AccountPlan(NamedTuple):
+    account: str
+    a_balances: tuple[int, ...]  # aToken balances in base units
+    drift: float
+    swap_leg: SwapLeg | None     # None if within the buffer
+
+
+class AccountResult(NamedTuple):
+    account: str
+    status: str                  # REBALANCED, SKIPPED or FAILED
+    amount_in: int = 0
+    amount_out: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+def get_market(token_names=("usdc", "weth"), feed_names=("usdc_usd", "eth_usd")) -> Market:
+    pool_address = get_contract("aavev3_pool_address_provider").getPool()
+    pool = get_contract("pool", address=pool_address)
+    tokens = tuple(get_contract(name) for name in token_names)
+    reserve_registry = get_reserve_registry()
+    return Market(
+        pool=pool,
+        router=get_contract("uniswap_swap_router"),
+        quoter=get_contract("uniswap_quoter"),
+        tokens=tokens,
+        a_tokens=tuple(get_contract("a_token", address=reserve_registry.get(t.address)["a_token"]) for t in tokens),
+        feeds=tuple(get_contract(name) for name in feed_names),
+        token_decimals=tuple(reserve_registry.get(t.address)["decimals"] for t in tokens),
+    )
+
+
+def snapshot_accounts(market: Market, accounts: list[str]) -> dict[str, Any]:
+    """aToken balances and allowances of every account and the prices, in one multicall."""
+    batch = Multicall()
+    for i, feed in enumerate(market.feeds):
+        batch.add(f"answer/{i}", feed.latestAnswer)
+        batch.add(f"decimals/{i}", feed.decimals)
+    for account in accounts:
+        for i, (token, a_token) in enumerate(zip(market.tokens, market.a_tokens)):
+            batch.add(f"{account}/a_balance/{i}", a_token.balanceOf, account)
+            batch.add(f"{account}/pool_allowance/{i}", token.allowance, account, market.pool.address)
+            batch.add(f"{account}/router_allowance/{i}", token.allowance, account, market.router.address)
+    return batch.execute()
+
+
+def plan_accounts(
+    market: Market,
+    accounts: list[str],
+    snapshot: dict[str, Any],
+    targets,
+    buffer: float = DEFAULT_BUFFER,
+) -> list[AccountPlan]:
+    """Plan every account in one vectorized pass over the snapshot."""
+    assets = range(len(market.tokens))
+    answers = [snapshot[f"answer/{i}"] for i in assets]
+    answer_decimals = [snapshot[f"decimals/{i}"] for i in assets]
+    a_balances = [tuple(snapshot[f"{account}/a_balance/{i}"] for i in assets) for account in accounts]
+
+    plan = plan_rebalance(
+        balances=[[balance / 10 ** market.token_decimals[i] for i, balance in enumerate(row)] for row in a_balances],
+        prices=[answer / 10 ** decimals for answer, decimals in zip(answers, answer_decimals)],
+        targets=targets,
+        buffer=buffer,
+    )
+    exact_trades = plan_rebalance_exact(a_balances, answers, answer_decimals, market.token_decimals, targets)
+    return [
+        AccountPlan(
+            account=account,
+            a_balances=a_balances[p],
+            drift=float(plan.drift[p]),
+            swap_leg=plan_swap_leg(exact_trades[p]) if plan.needs_rebalancing[p] else None,
+        )
+        for p, account in enumerate(accounts)
+    ]
+
+
+class InProcessTransactor:
+    """
+    pyevm and forks: accounts are impersonated with boa.env.prank. The in-process
+    EVM runs one transaction at a time, so accounts are rebalanced in turn and a
+    failing account is reverted to its state before the rebalance.
+    """
+    max_workers = 1
+
+    def transact(self, account: str, function, *args) -> tuple[Any, dict | None]:
+        with boa.env.prank(account):
+            return function(*args), None
+
+    @contextmanager
+    def isolated(self, account: str):
+        state = boa.env.evm.vm.state
+        snapshot_id = state.snapshot()
+        try:
+            yield
+        except Exception:
+            state.revert(snapshot_id)
+            raise
+        state.commit(snapshot_id)  # keep the changes, drop the checkpoint: long monitor loops would pile them up
+
+
+class NonceManager:
+    """Next nonce of each account, read once from the node then counted locally."""
+
+    def __init__(self, rpc):
+        self._rpc = rpc
+        self._nonces: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def next(self, account: str) -> int:
+        with self._lock:
+            if account not in self._nonces:
+                self._nonces[account] = to_int(self._rpc.fetch("eth_getTransactionCount", [account, "pending"]))
+            nonce = self._nonces[account]
+            self._nonces[account] += 1
+            return nonce
+
+    def reset(self, account: str):
+        """Forget the local count, e.g. after a transaction was not broadcast."""
+        with self._lock:
+            self._nonces.pop(account, None)
+
+
+class RawTransactor:
+    """
+    Live networks: signs with the local keys of the accounts and broadcasts raw
+    transactions, up to `max_workers` accounts waiting for receipts at once.
+    Transactions of one account are sent in order with locally counted nonces.
+    """
+
+    def __init__(self, signers: list, env=None, max_workers: int = DEFAULT_MAX_WORKERS, gas_limits: dict | None = None):
+        """
+        Args:
+            signers: eth_account LocalAccount of each account, see load_signers
+            env: NetworkEnv, boa.env if None
+        """
+        env = env or boa.env
+        self.max_workers = max_workers
+        self._signers = {str(signer.address): signer for signer in signers}
+        self._rpc = env._rpc
+        self._gas_limits = {**GAS_LIMITS, **(gas_limits or {})}
+        self.nonces = NonceManager(self._rpc)
+        # Fees of the whole run, priced a few blocks ahead like NetworkEnv
+        _, self._max_priority_fee, self._max_fee, self._chain_id = env.get_eip1559_fee()
+
+    def transact(self, account: str, function, *args) -> tuple[Any, dict]:
+        tx = {
+            "from": account,
+            "to": str(function.contract.address),
+            "data": to_hex(function.prepare_calldata(*args)),
+            "value": 0,
+            "gas": self._gas_limits.get(function.name, max(self._gas_limits.values())),
+            "maxPriorityFeePerGas": self._max_priority_fee,
+            "maxFeePerGas": self._max_fee,
+            "chainId": self._chain_id,
+            "nonce": self.nonces.next(account),
+        }
+        signed = self._signers[account].sign_transaction(tx)
+        try:
+            tx_hash = self._rpc.fetch("eth_sendRawTransaction", [to_hex(bytes(signed.raw_transaction))])
+        except Exception:
+            self.nonces.reset(account)  # the nonce was not used
+            raise
+        receipt = self._rpc.wait_for_tx_receipt(tx_hash, RECEIPT_TIMEOUT)
+        if receipt.get("status") != "0x1":
+            raise RuntimeError(f"{function.name} reverted: {tx_hash}")
+        return None, receipt
+
+    @contextmanager
+    def isolated(self, account: str):
+        try:
+            yield
+        except Exception:
+            self.nonces.reset(account)  # resync with the node, some transactions may be pending
+            raise
+
+
+def get_transactor(signers: list | None = None, env=None):
+    """
+    InProcessTransactor on pyevm and forks, RawTransactor signing with `signers`
+    on live networks: impersonating there would only simulate, nothing broadcast.
+    """
+    env = env or boa.env
+    if not hasattr(env, "get_chain_id"):  # not a NetworkEnv
+        return InProcessTransactor()
+    if not signers:
+        raise ValueError("live networks need the signers of the accounts, see load_signers")
+    return RawTransactor(signers, env)
+
+
+def load_signers(keystore_paths: list[str | Path], password: str) -> list:
+    """Decrypt keystore files into eth_account LocalAccounts for RawTransactor."""
+    return [Account.from_key(Account.decrypt(Path(path).read_text(), password)) for path in keystore_paths]
+
+
+# Sum of the token Transfers to `account` in a receipt
+def _transferred_to(receipt: dict, token: ABIContract, account: str) -> int:
+    account_topic = "0x" + str(account).lower().removeprefix("0x").rjust(64, "0")
+    return sum(
+        to_int(log["data"])
+        for log in receipt["logs"]
+        if log["address"].lower() == str(token.address).lower()
+        and log["topics"][0] == TRANSFER_TOPIC
+        and log["topics"][2].lower() == account_topic
+    )
+
+
+def rebalance_account(
+    transactor,
+    market: Market,
+    plan: AccountPlan,
+    allowances: AllowanceManager,
+    min_out: float = DEFAULT_MIN_OUT,
+    slippage: float = DEFAULT_SLIPPAGE,
+    fee_tiers=FEE_TIERS,
+) -> AccountResult:
+    """
+    Withdraw the delta of one account, swap it along the best route of
+    `fee_tiers` and supply the output. The route is quoted in one multicall
+    right before the trade, each leg keeps at least `min_out` of its share of
+    the oracle value on chain.
+    """
+    leg = plan.swap_leg
+    account = plan.account
+    token_in, token_out = market.tokens[leg.sell], market.tokens[leg.buy]
+    route = plan_route(market.quoter, token_in, token_out, leg.amount_in, slippage, fee_tiers)
+    if route is None:
+        raise ValueError(f"No pool of {fee_tiers} can take {leg.amount_in} of {token_in.address}")
+    oracle_rate = leg.expected_out * min_out / leg.amount_in
+
+    transactor.transact(account, market.pool.withdraw, token_in.address, leg.amount_in, account)
+    allowances.ensure(token_in, market.router, leg.amount_in)
+    amount_out = 0
+    for route_leg in route.legs:
+        leg_out, receipt = transactor.transact(
+            account,
+            market.router.exactInputSingle,
+            (token_in.address, token_out.address, route_leg.fee, account, route_leg.amount_in,
+             max(route_leg.min_out, int(route_leg.amount_in * oracle_rate)), 0),
+        )
+        amount_out += _transferred_to(receipt, token_out, account) if leg_out is None else leg_out
+    allowances.spend(token_in, market.router, leg.amount_in)
+
+    allowances.ensure(token_out, market.pool, amount_out)
+    transactor.transact(account, market.pool.supply, token_out.address, amount_out, account, REFERRAL_CODE)
+    allowances.spend(token_out, market.pool, amount_out)
+    return AccountResult(account, REBALANCED, leg.amount_in, amount_out)
+
+
+def _allowances_of(transactor, market: Market, account: str, snapshot: dict[str, Any]) -> AllowanceManager:
+    allowances = AllowanceManager(
+        owner=account,
+        approve_max=approve_max_from_env(),
+        approve=lambda token, spender, amount: transactor.transact(account, token.approve, spender, amount),
+    )
+    for i, token in enumerate(market.tokens):
+        allowances.remember(token, market.pool, snapshot[f"{account}/pool_allowance/{i}"])
+        allowances.remember(token, market.router, snapshot[f"{account}/router_allowance/{i}"])
+    return allowances
+
+
+def execute_plans(
+    transactor,
+    market: Market,
+    plans: list[AccountPlan],
+    snapshot: dict[str, Any],
+    min_out: float = DEFAULT_MIN_OUT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    fee_tiers=FEE_TIERS,
+) -> list[AccountResult]:
+    """
+    Run the plans, at most min(max_workers, transactor.max_workers) accounts at once.
+
+    Returns:
+        One AccountResult per plan, in the same order. An exception of one
+        account is reported as FAILED in its result, the others carry on.
+    """
+    def run(plan: AccountPlan) -> AccountResult:
+        if plan.swap_leg is None:
+            return AccountResult(plan.account, SKIPPED)
+        start = time.perf_counter()
+        try:
+            with transactor.isolated(plan.account):
+                allowances = _allowances_of(transactor, market, plan.account, snapshot)
+                result = rebalance_account(transactor, market, plan, allowances, min_out, fee_tiers=fee_tiers)
+        except Exception as e:
+            return AccountResult(plan.account, FAILED, seconds=time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        return result._replace(seconds=time.perf_counter() - start)
+
+    workers = min(max_workers, transactor.max_workers, len(plans))
+    if workers <= 1:
+        return [run(plan) for plan in plans]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, plans))
+
+
+def rebalance_accounts(
+    accounts: list[str],
+    targets,
+    buffer: float = DEFAULT_BUFFER,
+    transactor=None,
+    min_out: float = DEFAULT_MIN_OUT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    fee_tiers=FEE_TIERS,
+) -> list[AccountResult]:
+    """
+    Snapshot, plan and rebalance every account.
+
+    Args:
+        accounts: Addresses, impersonated on pyevm and forks
+        targets: (A,) target allocations, e.g. [0.3, 0.7]
+        transactor: RawTransactor on live networks, InProcessTransactor if None
+    """
+    transactor = transactor or get_transactor()
+    accounts = [str(account) for account in accounts]
+    market = get_market()
+    snapshot = snapshot_accounts(market, accounts)
+    plans = plan_accounts(market, accounts, snapshot, targets, buffer)
+    return execute_plans(transactor, market, plans, snapshot, min_out, max_workers, fee_tiers)
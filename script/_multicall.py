@@ -0,0 +1,133 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import (
+    ABIContract,
+    ABIOverload,
+    _format_abi_type,
+    _parse_complex,
+)
+from boa.contracts.vyper.vyper_contract import VyperFunction, vyper_object
+from boa.util.abi import abi_decode
+from script._contract_registry import get_contract
+from typing import Any
+from vyper.codegen.core import calculate_type_for_external_return
+from vyper.semantics.types import TupleT
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# Same address on every EVM chain, see https://www.multicall3.com
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MAX_CALLS_PER_BATCH = 500
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+# Multicall3 contract of the active network, None if not available
+def get_multicall3() -> ABIContract | None:
+    try:
+        multicall3 = get_contract("multicall3")
+    except ValueError:  # no address nor deployer script for this network
+        return None
+    if not multicall3.env.get_code(multicall3.address):
+        return None
+    return multicall3
+
+
+def _decode_return(function, data: bytes) -> Any:
+    if isinstance(function, VyperFunction):  # contract deployed from source, e.g. pyevm mocks
+        # Same post-processing as VyperContract.marshal_to_python
+        vyper_type = function.func_t.return_type
+        if vyper_type is None:
+            return None
+        values = abi_decode(calculate_type_for_external_return(vyper_type).abi_type.selector_name(), data)
+        if not isinstance(vyper_type, TupleT):
+            (values,) = values
+        return vyper_object(values, vyper_type)
+
+    # Same post-processing as ABIFunction.__call__
+    values = abi_decode(_format_abi_type(function.return_type), data)
+    outputs = function._abi["outputs"]
+    match values:
+        case ():
+            return None
+        case (single,):
+            return _parse_complex(outputs[0], single, name=function.name)
+        case multiple:
+            return tuple(
+                _parse_complex(abi, item, name=function.name)
+                for (abi, item) in zip(outputs, multiple)
+            )
+
+
+class Multicall:
+    """
+    Collect read-only contract calls and send them as one Multicall3 `aggregate3`.
+
+    Usage:
+        batch = Multicall()
+        batch.add("usdc", usdc.balanceOf, boa.env.eoa)
+        batch.add("eth_usd", eth_usd.latestAnswer)
+        results = batch.execute()  # {"usdc": int, "eth_usd": int}
+
+    Falls back to one call per entry when the network has no Multicall3.
+    """
+
+    def __init__(self, multicall3: ABIContract | None = None):
+        self._multicall3 = multicall3
+        self._calls = {}  # key -> (function, args, allow_failure)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def add(self, key: str, function, *args, allow_failure: bool = False) -> "Multicall":
+        """
+        Args:
+            key: Name of the result in the dict returned by `execute`
+            function: Contract function, e.g. `usdc.balanceOf`
+            args: Arguments of the function
+            allow_failure: If True a reverting call gives None instead of raising
+        """
+        if key in self._calls:
+            raise ValueError(f"Duplicate multicall key: {key}")
+        if isinstance(function, ABIOverload):
+            function = function._pick_overload(*args)
+        self._calls[key] = (function, args, allow_failure)
+        return self
+
+    def execute(self) -> dict[str, Any]:
+        """Run every collected call and return {key: decoded value}."""
+        if not self._calls:
+            return {}
+
+        multicall3 = self._multicall3 or get_multicall3()
+        if multicall3 is None:
+            return self._execute_sequential()
+
+        results = {}
+        items = list(self._calls.items())
+        for start in range(0, len(items), MAX_CALLS_PER_BATCH):
+            chunk = items[start : start + MAX_CALLS_PER_BATCH]
+            calls = [
+                (function.contract.address, allow_failure, function.prepare_calldata(*args))
+                for _, (function, args, allow_failure) in chunk
+            ]
+            for (key, (function, _, _)), (success, data) in zip(
+                chunk, multicall3.aggregate3(calls)
+            ):
+                results[key] = _decode_return(function, data) if success else None
+        return results
+
+    def _execute_sequential(self) -> dict[str, Any]:
+        results = {}
+        for key, (function, args, allow_failure) in self._calls.items():
+            try:
+                results[key] = function(*args)
+            except Exception:
+                if not allow_failure:
+                    raise
+                results[key] = None
+        return results
@@ -0,0 +1,165 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from moccasin.config import get_active_network
+from script._contract_registry import get_contract
+from script._multicall import Multicall
+from script._reserve_registry import get_chain_id
+from typing import NamedTuple
+import boa
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+BLOCK_TIME = 12                            # seconds, a round cannot move faster on a live network
+DEFAULT_MAX_STALENESS = 25 * 60 * 60       # seconds, longest Chainlink heartbeat (USDC/USD, 24h) plus margin
+
+# chain_id -> PriceService, lives for the whole process
+_SERVICES: dict[int, "PriceService"] = {}
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class StalePriceError(ValueError):
+    pass
+
+
+class PriceQuote(NamedTuple):
+    round_id: int
+    answer: int        # raw feed answer
+    decimals: int
+    updated_at: int    # timestamp of the round
+
+    @property
+    def price(self) -> float:
+        return self.answer / 10 ** self.decimals
+
+
+class PriceService:
+    """
+    Chainlink prices for hot loops.
+
+    Usage:
+        prices = get_price_service()
+        prices.get_prices("usdc_usd", "eth_usd")  # {"usdc_usd": 1.0, "eth_usd": 3000.0}
+
+    - feed contracts and decimals are read once per process
+    - quotes are kept by round id, rounds never change once written
+    - the latest round of every requested feed is checked with one
+      latestRoundData multicall, at most once per `ttl` seconds
+    - a round older than `max_staleness` raises StalePriceError
+    """
+
+    def __init__(self, max_staleness: int | None = DEFAULT_MAX_STALENESS, ttl: float | None = None, env=None):
+        """
+        Args:
+            max_staleness: Largest accepted age of a round in seconds, None to accept any
+            ttl: Seconds a checked round is trusted without a read, BLOCK_TIME on
+                live networks and 0 on pyevm and forks (answers move without blocks)
+        """
+        self.env = env or boa.env
+        self.max_staleness = max_staleness
+        self.ttl = ttl if ttl is not None else (BLOCK_TIME if hasattr(self.env, "get_chain_id") else 0)
+        self._feeds: dict[str, ABIContract] = {}
+        # Keyed by feed address
+        self._decimals: dict[str, int] = {}
+        self._rounds: dict[tuple[str, int], PriceQuote] = {}   # (address, round_id) -> quote
+        self._latest: dict[str, tuple[int, float]] = {}         # address -> (round_id, checked at)
+
+    def feed(self, feed_name: str) -> ABIContract:
+        if feed_name not in self._feeds or self._feeds[feed_name].env is not boa.env:  # e.g. a local fork of a live network
+            self._feeds[feed_name] = get_contract(feed_name)
+        return self._feeds[feed_name]
+
+    # ---- batching with other reads ----
+    def add_calls(self, batch: Multicall, feed_names) -> list[str]:
+        """
+        Add the reads needed by `feed_names` to a batch, e.g. a pre-trade snapshot.
+
+        Returns:
+            Feed names whose latest round is read by the batch
+        """
+        now = time.monotonic()
+        stale = []
+        for feed_name in feed_names:
+            feed = self.feed(feed_name)
+            address = str(feed.address)
+            if address in self._latest and now - self._latest[address][1] < self.ttl:
+                continue
+            batch.add(f"{feed_name}/round_data", feed.latestRoundData)
+            if address not in self._decimals:
+                batch.add(f"{feed_name}/decimals", feed.decimals)
+            stale.append(feed_name)
+        return stale
+
+    def from_results(self, results: dict, feed_names) -> dict[str, PriceQuote]:
+        """Store the reads of add_calls and return the quotes of `feed_names`."""
+        now = time.monotonic()
+        quotes = {}
+        for feed_name in feed_names:
+            address = str(self._feeds[feed_name].address)
+            if f"{feed_name}/round_data" in results:
+                if f"{feed_name}/decimals" in results:
+                    self._decimals[address] = results[f"{feed_name}/decimals"]
+                round_id, answer, _, updated_at, _ = results[f"{feed_name}/round_data"]
+                if (address, round_id) not in self._rounds:
+                    self._rounds[(address, round_id)] = PriceQuote(round_id, answer, self._decimals[address], updated_at)
+                self._latest[address] = (round_id, now)
+            quotes[feed_name] = self._rounds[(address, self._latest[address][0])]
+        self._check_staleness(quotes)
+        return quotes
+
+    def _check_staleness(self, quotes: dict[str, PriceQuote]):
+        if self.max_staleness is None:
+            return
+        now = self.env.evm.patch.timestamp
+        for feed_name, quote in quotes.items():
+            if now - quote.updated_at > self.max_staleness:
+                raise StalePriceError(f"{feed_name} round {quote.round_id} is {now - quote.updated_at}s old")
+
+    # ---- lookups ----
+    def get_quotes(self, *feed_names: str) -> dict[str, PriceQuote]:
+        """Latest quotes, no read at all if every round was checked within ttl."""
+        batch = Multicall()
+        self.add_calls(batch, feed_names)
+        return self.from_results(batch.execute(), feed_names)
+
+    def get_prices(self, *feed_names: str) -> dict[str, float]:
+        return {name: quote.price for name, quote in self.get_quotes(*feed_names).items()}
+
+    def get_round(self, feed_name: str, round_id: int) -> PriceQuote:
+        """Quote of a past round, read once."""
+        feed = self.feed(feed_name)
+        address = str(feed.address)
+        if (address, round_id) not in self._rounds:
+            if address not in self._decimals:
+                self._decimals[address] = feed.decimals()
+            _, answer, _, updated_at, _ = feed.getRoundData(round_id)
+            self._rounds[(address, round_id)] = PriceQuote(round_id, answer, self._decimals[address], updated_at)
+        return self._rounds[(address, round_id)]
+
+    def invalidate(self):
+        """Check every latest round again on the next lookup, e.g. after moving a feed."""
+        self._latest.clear()
+
+    def clear(self):
+        """Forget every round, e.g. after reverting a snapshot that wrote rounds."""
+        self._latest.clear()
+        self._rounds.clear()
+
+
+def get_price_service() -> PriceService:
+    """Shared PriceService of the active chain."""
+    active_network = get_active_network()
+    if not active_network.is_fork and active_network.is_local_or_forked_network():
+        # Local mocks are redeployed between runs and reverted between tests,
+        # possibly at the same address, so never reuse their feeds
+        return PriceService()
+    chain_id = get_chain_id()
+    if chain_id not in _SERVICES:
+        _SERVICES[chain_id] = PriceService()
+    return _SERVICES[chain_id]
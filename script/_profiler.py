@@ -0,0 +1,314 @@
+"""
+Gas of every transaction broken down along its call tree, per stage.
+
+    with profile() as gas:
+        run_script(quiet=True)           # or deposit(pool, usdc, amount), any boa transactions
+    print(gas.summary())                 # stage > call > inner calls: calls, gas, self gas, time, fetches
+    gas.to_json("gas.json")
+    Path("gas.folded").write_text(gas.folded())   # flamegraph.pl, inferno or speedscope
+
+    python -m script._profiler diff before.json after.json    # exit 1 if any call costs more gas
+    python -m script._profiler folded gas.json > gas.folded
+
+Or for a whole run: MOX_REBALANCE_PROFILE=gas.json mox run rebalance_portfolio
+
+The tree is titanoboa's call trace of each transaction (computation.call_trace),
+executed locally on every network, so live runs are profiled without a
+tracing node. A call is keyed by its path from the transaction down, e.g.
+"rebalancer.rebalance;pool.withdraw", so the same function reached from two
+places is reported twice. Gas is as executed, before the refunds settled at
+the end of the transaction, inclusive of the calls below; self gas is what
+the frame spent itself. Top level calls also carry the wall time of the
+transaction and, within it, the time spent on RPC requests: fork state
+fetched on cache misses, or the broadcast on a live network.
+
+Stages come from the active instrumentation (script._instrumentation), one is
+opened if none is, so stage() spans of the run name the stages either way.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABITraceSource
+from boa.contracts.call_trace import TraceFrame
+from boa.contracts.vyper.vyper_contract import VyperTraceSource
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from script._hooks import EnvListener, attach, detach
+from script._instrumentation import UNATTRIBUTED, current_stage, instrument
+from typing import Iterator, NamedTuple
+import argparse
+import boa
+import json
+import os
+import sys
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# "1" prints the gas tree at the end of the run, a path ending in .json also writes the
+# report there and its folded stacks next to it (.folded)
+PROFILE_ENV_VAR = "MOX_REBALANCE_PROFILE"
+DEFAULT_TOLERANCE = 0   # gas a call may grow before diff reports it
+SEPARATOR = ";"         # between the frames of a path, as in folded stacks
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+@dataclass
+class CallStats:
+    calls: int = 0
+    gas: int = 0                 # before refunds, calls below included
+    self_gas: int = 0            # spent in the frame itself
+    seconds: float = 0.0         # wall time, top level calls only
+    fetch_seconds: float = 0.0   # of which RPC requests, top level calls only
+    rpc_requests: int = 0
+
+
+@dataclass
+class StageGas:
+    name: str
+    transactions: int = 0
+    gas_used: int = 0            # of the transactions, as counted by Instrumentation
+    fetch_seconds: float = 0.0   # all RPC requests of the stage, reads included
+    rpc_requests: int = 0
+
+
+class GasChange(NamedTuple):
+    stage: str
+    path: str
+    before: int                  # gas, 0 if the call is new
+    after: int                   # gas, 0 if the call is gone
+
+    @property
+    def change(self) -> int:
+        return self.after - self.before
+
+
+def frame_label(frame: TraceFrame) -> str:
+    """contract_name.function of a frame, address.0xselector if the contract is unknown."""
+    source = frame.source
+    try:
+        if isinstance(source, ABITraceSource):
+            return f"{source.contract.contract_name}.{source.function.pretty_name}"
+        if isinstance(source, VyperTraceSource):
+            return f"{source.contract.contract_name}.{source.func_t.name}"
+    except TypeError:  # selector of no exposed function, e.g. the fallback
+        pass
+    contract = boa.env.lookup_contract(frame.address)
+    name = getattr(contract, "contract_name", None) or str(frame.address)
+    if frame.computation.msg.is_create:
+        return f"{name}.__init__"
+    return f"{name}.0x{frame.selector.hex()}" if frame.selector else f"{name}.__default__"
+
+
+class GasProfile(EnvListener):
+    """
+    Gas per (stage, call path) of the transactions sent between enable() and
+    disable(), see profile().
+    """
+
+    def __init__(self):
+        self.stages: dict[str, StageGas] = {}
+        self.calls: dict[tuple[str, str], CallStats] = {}
+        self._fetch_seconds = 0.0   # running totals, top level calls keep the difference
+        self._rpc_requests = 0
+
+    def _stage(self, name: str) -> StageGas:
+        if name not in self.stages:
+            self.stages[name] = StageGas(name)
+        return self.stages[name]
+
+    def _call(self, stage: str, path: str) -> CallStats:
+        if (stage, path) not in self.calls:
+            self.calls[stage, path] = CallStats()
+        return self.calls[stage, path]
+
+    def _walk(self, stage: str, frame: TraceFrame, path: str = "", label: str | None = None) -> CallStats:
+        label = label or frame_label(frame)
+        path = f"{path}{SEPARATOR}{label}" if path else label
+        stats = self._call(stage, path)
+        gas = frame.computation.get_gas_used()  # a child's gas is charged to its parent too
+        stats.calls += 1
+        stats.gas += gas
+        stats.self_gas += gas - sum(child.computation.get_gas_used() for child in frame.children)
+        for child in frame.children:
+            self._walk(stage, child, path)
+        return stats
+
+    def _record(self, computation, start: float, fetch_seconds: float, rpc_requests: int, label: str | None = None):
+        stage = self._stage(current_stage() or UNATTRIBUTED)
+        stage.transactions += 1
+        stage.gas_used += computation.get_gas_used()
+        top = self._walk(stage.name, computation.call_trace, label=label)
+        top.seconds += time.perf_counter() - start
+        top.fetch_seconds += self._fetch_seconds - fetch_seconds
+        top.rpc_requests += self._rpc_requests - rpc_requests
+
+    # ---- hooks ----
+    def on_call_start(self) -> tuple[float, float, int]:
+        return time.perf_counter(), self._fetch_seconds, self._rpc_requests
+
+    def on_execute_code(self, computation, kwargs: dict, token: tuple[float, float, int]):
+        if kwargs.get("is_modifying", True) and not kwargs.get("simulate", False):
+            self._record(computation, *token)
+
+    def on_deploy(self, computation, kwargs: dict, token: tuple[float, float, int]):
+        name = getattr(kwargs.get("contract"), "contract_name", None)  # not registered at its address yet
+        self._record(computation, *token, f"{name}.__init__" if name else None)
+
+    def on_http(self, response, seconds: float):
+        stage = self._stage(current_stage() or UNATTRIBUTED)
+        stage.fetch_seconds += seconds
+        stage.rpc_requests += 1
+        self._fetch_seconds += seconds
+        self._rpc_requests += 1
+
+    def enable(self, env=None):
+        attach(self, env)
+
+    def disable(self):
+        detach(self)
+
+    # ---- reporting ----
+    def by_call(self) -> dict[str, CallStats]:
+        """Stats per called function, wherever it was called from."""
+        totals: dict[str, CallStats] = {}
+        for (_, path), stats in self.calls.items():
+            *callers, label = path.split(SEPARATOR)
+            total = totals.setdefault(label, CallStats())
+            total.calls += stats.calls
+            total.self_gas += stats.self_gas
+            if label not in callers:  # the gas of a recursive call is in its outermost one already
+                total.gas += stats.gas
+            if not callers:  # times are top level only
+                total.seconds += stats.seconds
+                total.fetch_seconds += stats.fetch_seconds
+                total.rpc_requests += stats.rpc_requests
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": [asdict(stats) for stats in self.stages.values()],
+            "calls": [{"stage": stage, "path": path, **asdict(stats)} for (stage, path), stats in self.calls.items()],
+        }
+
+    def to_json(self, path: str | Path | None = None) -> str:
+        data = json.dumps(self.to_dict(), indent=4)
+        if path is not None:
+            Path(path).write_text(data)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GasProfile":
+        profile = cls()
+        for stats in data["stages"]:
+            profile.stages[stats["name"]] = StageGas(**stats)
+        for call in data["calls"]:
+            call = dict(call)
+            key = call.pop("stage"), call.pop("path")
+            profile.calls[key] = CallStats(**call)
+        return profile
+
+    @classmethod
+    def load(cls, path: str | Path) -> "GasProfile":
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    def folded(self) -> str:
+        """Folded stacks, stage;call;inner call self_gas per line, for flamegraph tools."""
+        return "\n".join(
+            f"{stage}{SEPARATOR}{path} {stats.self_gas}"
+            for (stage, path), stats in self.calls.items()
+            if stats.self_gas > 0
+        ) + "\n"
+
+    def summary(self) -> str:
+        header = f"{'stage / call':<64}{'calls':>7}{'gas':>12}{'self gas':>12}{'seconds':>10}{'fetch s':>10}{'rpc_reqs':>10}"
+        rows = [header, "-" * len(header)]
+        for stage in self.stages.values():
+            rows.append(
+                f"{stage.name:<64}{stage.transactions:>7}{stage.gas_used:>12}{'':>12}{'':>10}"
+                f"{stage.fetch_seconds:>10.3f}{stage.rpc_requests:>10}"
+            )
+            paths = sorted((path for name, path in self.calls if name == stage.name), key=lambda p: p.split(SEPARATOR))
+            for path in paths:
+                stats = self.calls[stage.name, path]
+                depth = path.count(SEPARATOR) + 1
+                label = f"{'  ' * depth}{path.rsplit(SEPARATOR, 1)[-1]}"
+                timing = f"{stats.seconds:>10.3f}{stats.fetch_seconds:>10.3f}{stats.rpc_requests:>10}" if depth == 1 else ""
+                rows.append(f"{label:<64}{stats.calls:>7}{stats.gas:>12}{stats.self_gas:>12}{timing}")
+        return "\n".join(rows)
+
+
+def diff(before: GasProfile, after: GasProfile, tolerance: int = DEFAULT_TOLERANCE) -> list[GasChange]:
+    """Calls whose gas moved by more than `tolerance`, in tree order, new and removed ones included."""
+    changes = []
+    for stage, path in dict.fromkeys([*before.calls, *after.calls]):
+        old = before.calls.get((stage, path), CallStats()).gas
+        new = after.calls.get((stage, path), CallStats()).gas
+        if abs(new - old) > tolerance:
+            changes.append(GasChange(stage, path, old, new))
+    return sorted(changes, key=lambda c: (c.stage, c.path.split(SEPARATOR)))
+
+
+def format_diff(changes: list[GasChange]) -> str:
+    if not changes:
+        return "No gas change"
+    header = f"{'stage / call':<72}{'before':>12}{'after':>12}{'change':>10}"
+    lines = [header, "-" * len(header)]
+    for c in changes:
+        lines.append(f"{c.stage + ': ' + c.path.replace(SEPARATOR, ' > '):<72}{c.before:>12}{c.after:>12}{c.change:>+10}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def profile(env=None) -> Iterator[GasProfile]:
+    gas = GasProfile()
+    with instrument(env) if current_stage() is None else nullcontext():  # stages need an instrumentation
+        gas.enable(env)
+        try:
+            yield gas
+        finally:
+            gas.disable()
+
+
+@contextmanager
+def profile_from_env() -> Iterator[GasProfile | None]:
+    """Profile the block if $MOX_REBALANCE_PROFILE is set, then print/export the report."""
+    setting = os.environ.get(PROFILE_ENV_VAR)
+    if not setting:
+        yield None
+        return
+    with profile() as gas:
+        yield gas
+    print(gas.summary())
+    if setting.endswith(".json"):
+        gas.to_json(setting)
+        Path(setting).with_suffix(".folded").write_text(gas.folded())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m script._profiler", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    compare = subparsers.add_parser("diff", help="gas changes between two reports, exit 1 if any call costs more")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE, help="gas a call may move unreported")
+    folded = subparsers.add_parser("folded", help="folded stacks of a report, for flamegraph tools")
+    folded.add_argument("report")
+    args = parser.parse_args(argv)
+
+    if args.mode == "folded":
+        sys.stdout.write(GasProfile.load(args.report).folded())
+        return 0
+    changes = diff(GasProfile.load(args.before), GasProfile.load(args.after), args.tolerance)
+    print(format_diff(changes))
+    return 1 if any(change.change > 0 for change in changes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from typing import NamedTuple
+import numpy as np
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+DEFAULT_BUFFER = 0.1  # allowed drift from target allocation, 0.1 = 10 percentage points
+TARGET_PRECISION = 10 ** 18  # targets as integer parts per 1e18 for exact planning
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class RebalancePlan(NamedTuple):
+    """
+    Result of planning P portfolios of A assets. Trades are + to buy, - to sell.
+    """
+    values: np.ndarray             # (P, A) USD value of each position
+    total_values: np.ndarray       # (P,)   USD value of each portfolio
+    allocations: np.ndarray        # (P, A) current allocation, rows sum to 1
+    drift: np.ndarray              # (P,)   largest |allocation - target| of each portfolio
+    needs_rebalancing: np.ndarray  # (P,)   drift > buffer
+    trades_usd: np.ndarray         # (P, A) USD to buy/sell of each asset
+    trades: np.ndarray             # (P, A) token amount to buy/sell of each asset
+
+
+def _check_targets(targets: np.ndarray):
+    if not np.allclose(targets.sum(axis=-1), 1.0):
+        raise ValueError("Target allocations must sum to 1")
+
+
+def _check_answers(answers: np.ndarray):
+    if (answers <= 0).any():
+        raise ValueError("Chainlink answers must be positive, the feed is broken or stale")
+
+
+def plan_rebalance(balances, prices, targets, buffer: float = DEFAULT_BUFFER) -> RebalancePlan:
+    """
+    Plan the trades of many portfolios in one vectorized pass.
+
+    Args:
+        balances: (P, A) token balances, in whole tokens (not wei)
+        prices: (A,) or (P, A) USD price of each asset
+        targets: (A,) or (P, A) target allocations, each row must sum to 1
+        buffer: Drift above which a portfolio needs rebalancing
+
+    Returns:
+        RebalancePlan, all arrays in float64
+    """
+    balances = np.atleast_2d(np.asarray(balances, dtype=np.float64))
+    prices = np.asarray(prices, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    _check_targets(targets)
+
+    values = balances * prices
+    total_values = values.sum(axis=1)
+
+    # Empty portfolios have no allocation and need no trades
+    allocations = np.divide(
+        values,
+        total_values[:, None],
+        out=np.zeros_like(values),
+        where=total_values[:, None] > 0,
+    )
+    drift = np.where(total_values > 0, np.abs(allocations - targets).max(axis=1), 0.0)
+    needs_rebalancing = drift > buffer
+
+    trades_usd = total_values[:, None] * targets - values
+    trades = trades_usd / prices
+
+    return RebalancePlan(values, total_values, allocations, drift, needs_rebalancing, trades_usd, trades)
+
+
+def to_base_units(amounts, decimals) -> np.ndarray:
+    """
+    Convert token amounts to integer base units (wei), truncating toward zero.
+
+    Args:
+        amounts: (P, A) token amounts, e.g. RebalancePlan.trades
+        decimals: (A,) decimals of each asset, e.g. [6, 18]
+
+    Returns:
+        (P, A) array of Python ints (dtype=object), no int64 overflow
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    scale = np.power(10.0, np.asarray(decimals, dtype=np.float64))
+    return np.vectorize(int, otypes=[object])(np.trunc(amounts * scale))
+
+
+def plan_rebalance_exact(balances, answers, answer_decimals, token_decimals, targets) -> np.ndarray:
+    """
+    Wei-exact version of RebalancePlan.trades, computed only with integers.
+
+    Args:
+        balances: (P, A) balances in base units (wei)
+        answers: (A,) or (P, A) raw Chainlink answers, ValueError unless all positive
+        answer_decimals: (A,) decimals of each price feed
+        token_decimals: (A,) decimals of each token
+        targets: (A,) or (P, A) target allocations, each row must sum to 1
+
+    Returns:
+        (P, A) trades in base units as Python ints (dtype=object), truncated toward zero
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    _check_targets(targets)
+
+    balances = np.atleast_2d(np.array(balances, dtype=object))
+    answers = np.array(answers, dtype=object)
+    _check_answers(answers)
+    shifts = np.asarray(answer_decimals) + np.asarray(token_decimals)
+
+    # Price of one base unit, scaled so every asset shares 10**max(shifts)
+    unit_values = answers * np.array([10 ** int(s) for s in shifts.max() - shifts], dtype=object)
+    targets_int = np.vectorize(lambda t: round(t * TARGET_PRECISION), otypes=[object])(targets)
+
+    values = balances * unit_values
+    total_values = values.sum(axis=1)
+    trades_value = total_values[:, None] * targets_int // TARGET_PRECISION - values
+
+    magnitudes = np.abs(trades_value) // unit_values
+    return np.where(trades_value < 0, -magnitudes, magnitudes)
+
+
+class SwapLeg(NamedTuple):
+    """
+    Single swap that rebalances a two-asset portfolio, indices into the asset axis.
+    """
+    sell: int          # overweight asset, withdrawn from Aave and sold
+    buy: int           # underweight asset, bought and supplied to Aave
+    amount_in: int     # base units of `sell` to withdraw and swap
+    expected_out: int  # base units of `buy` at oracle prices, before fees and slippage
+
+
+def plan_swap_leg(trades) -> SwapLeg | None:
+    """
+    Reduce one row of plan_rebalance_exact trades to the swap that closes the drift.
+
+    Only the delta moves: the sell amount is withdrawn and swapped, and only the
+    swap output is supplied, so the cost scales with drift instead of position size.
+
+    Args:
+        trades: (2,) trades in base units, + to buy, - to sell
+
+    Returns:
+        SwapLeg, or None if there is nothing to sell
+    """
+    if len(trades) != 2:
+        raise ValueError("A single swap only rebalances two assets")
+    sell = int(np.argmin(trades))
+    buy = 1 - sell
+    amount_in = -int(trades[sell])
+    if amount_in <= 0:
+        return None
+    return SwapLeg(sell, buy, amount_in, max(int(trades[buy]), 0))
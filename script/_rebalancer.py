@@ -0,0 +1,67 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from moccasin.config import get_active_network
+from script._allowances import AllowanceManager
+from script._contract_registry import get_contract
+from script._routing import Route
+import boa
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+REBALANCER_SOURCE = "contracts/rebalancer.vy"
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+def get_rebalancer():
+    """
+    Rebalancer contract of the active network: at its moccasin.toml address if
+    it has one, deployed on first use on pyevm and forks, None otherwise (a
+    live network never deploys behind the user's back).
+    """
+    active_network = get_active_network()
+    address = getattr(active_network.named_contracts.get("rebalancer"), "address", None)
+    if address:
+        return boa.load_partial(REBALANCER_SOURCE).at(address)
+    if not active_network.is_local_or_forked_network():
+        return None
+    return get_contract("rebalancer")
+
+
+def rebalance_atomic(
+    rebalancer,
+    a_token_in: ABIContract,
+    token_in: ABIContract,
+    token_out: ABIContract,
+    route: Route,
+    allowances: AllowanceManager | None = None,
+    min_amount_out: int | None = None,
+) -> tuple[int, int]:
+    """
+    Withdraw route.amount_in of token_in from Aave, swap it along the route and
+    supply the output, in one transaction of the rebalancer.
+
+    Args:
+        a_token_in: aToken of token_in, approved to the rebalancer if needed
+        allowances: Shared allowance cache of the run, approves the exact amount if None
+        min_amount_out: Smallest total output, the sum of the legs' minimums if None
+
+    Returns:
+        (amount withdrawn and swapped, amount supplied)
+    """
+    allowances = allowances or AllowanceManager(approve_max=False)
+    allowances.ensure(a_token_in, rebalancer, route.amount_in)
+    amount_in, amount_out = rebalancer.rebalance(
+        a_token_in.address,
+        token_in.address,
+        token_out.address,
+        [(leg.fee, leg.amount_in, leg.min_out) for leg in route.legs],
+        route.min_out if min_amount_out is None else min_amount_out,
+    )
+    allowances.spend(a_token_in, rebalancer, route.amount_in)
+    return amount_in, amount_out
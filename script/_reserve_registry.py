@@ -0,0 +1,147 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from boa.util.abi import Address
+from moccasin.config import get_active_network
+from script._cache import get_cache_dir
+from script._contract_registry import get_contract
+from script._multicall import Multicall
+from pathlib import Path
+import boa
+import json
+import os
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+# (chain_id, data provider address) -> ReserveRegistry, lives for the whole process
+_REGISTRIES: dict[tuple[int, str], "ReserveRegistry"] = {}
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+def get_chain_id() -> int:
+    if hasattr(boa.env, "get_chain_id"):  # NetworkEnv
+        return boa.env.get_chain_id()
+    return boa.env.evm.patch.chain_id  # pyevm and forks
+
+
+class ReserveRegistry:
+    """
+    Aave reserves indexed by underlying token address:
+        {underlying: {"symbol": str, "a_token": str, "variable_debt_token": str, "decimals": int}}
+
+    Loaded from disk, refreshed from the data provider only when an unknown
+    reserve is requested or the pool reserves count differs from the last one
+    seen. The count includes dropped reserves, so it is compared with the
+    stored count rather than with the number of known reserves.
+    """
+
+    def __init__(
+        self,
+        data_provider: ABIContract,
+        chain_id: int,
+        cache_dir: Path | None = None,
+        persist: bool = True,
+    ):
+        """
+        Args:
+            data_provider: AaveProtocolDataProvider contract
+            chain_id: Chain the data provider lives on
+            cache_dir: Where to store the registry, defaults to get_cache_dir()
+            persist: Keep the registry in memory only if False (e.g. local pyevm mocks)
+        """
+        self.data_provider = data_provider
+        self.chain_id = chain_id
+        self.persist = persist
+        cache_dir = cache_dir or get_cache_dir()
+        self.path = cache_dir / f"reserves_chainid_{hex(chain_id)}_{data_provider.address.lower()}.json"
+        self.reserves: dict[str, dict] = {}
+        self.reserves_count: int | None = None  # Pool.getReservesCount at the last sync, None if never synced
+        self._load()
+
+    def _load(self):
+        if self.persist and self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.reserves = data["reserves"]
+            self.reserves_count = data.get("reserves_count")
+
+    def _save(self):
+        if not self.persist:
+            return
+        data = {
+            "chain_id": self.chain_id,
+            "data_provider": str(self.data_provider.address),
+            "reserves_count": self.reserves_count,
+            "reserves": self.reserves,
+        }
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")  # parallel test workers save at the same time
+        tmp_path.write_text(json.dumps(data, indent=4))
+        tmp_path.replace(self.path)  # atomic, a crash never leaves half a file
+
+    def is_stale(self, reserves_count: int) -> bool:
+        """True if the pool reserves count (Pool.getReservesCount) changed since the last sync."""
+        return reserves_count != self.reserves_count
+
+    def refresh(self):
+        """Fetch the reserves we do not know yet, in one multicall."""
+        reserve_tokens = self.data_provider.getAllReservesTokens() # [(symbol, address), ...]
+        new_reserves = [
+            (symbol, str(Address(underlying)))
+            for symbol, underlying in reserve_tokens
+            if str(Address(underlying)) not in self.reserves
+        ]
+        if not new_reserves:
+            return
+
+        batch = Multicall()
+        for _, underlying in new_reserves:
+            batch.add(f"{underlying}_tokens", self.data_provider.getReserveTokensAddresses, underlying)
+            batch.add(f"{underlying}_config", self.data_provider.getReserveConfigurationData, underlying)
+        results = batch.execute()
+
+        for symbol, underlying in new_reserves:
+            a_token, _, variable_debt_token = results[f"{underlying}_tokens"]
+            self.reserves[underlying] = {
+                "symbol": symbol,
+                "a_token": str(a_token),
+                "variable_debt_token": str(variable_debt_token),
+                "decimals": results[f"{underlying}_config"][0],
+            }
+        self._save()
+
+    def sync(self, reserves_count: int):
+        """Refresh only if the pool reserves count changed, e.g. read with a snapshot multicall."""
+        if self.is_stale(reserves_count):
+            self.refresh()
+            self.reserves_count = reserves_count
+            self._save()
+
+    def get(self, underlying: str) -> dict:
+        """Reserve data of an underlying token, no RPC call once the registry is warm."""
+        underlying = str(Address(underlying))
+        if underlying not in self.reserves:
+            self.refresh()
+        if underlying not in self.reserves:
+            raise KeyError(f"{underlying} is not an Aave reserve of {self.data_provider.address}")
+        return self.reserves[underlying]
+
+
+# Registry of the active network, one instance per (chain_id, data provider)
+def get_reserve_registry(data_provider: ABIContract | None = None) -> ReserveRegistry:
+    active_network = get_active_network()
+    if data_provider is None:
+        data_provider = get_contract("aave_protocol_data_provider")
+    key = (get_chain_id(), str(data_provider.address))
+    if not active_network.is_fork and active_network.is_local_or_forked_network():
+        # Local mocks are redeployed between runs and reverted between tests,
+        # possibly at the same address, so never reuse their registry
+        return ReserveRegistry(data_provider, key[0], persist=False)
+    if key not in _REGISTRIES:
+        _REGISTRIES[key] = ReserveRegistry(data_provider, key[0])
+    registry = _REGISTRIES[key]
+    registry.data_provider = data_provider  # bound to the current boa env
+    return registry
@@ -0,0 +1,146 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.abi.abi_contract import ABIContract
+from itertools import combinations
+from script._multicall import Multicall
+from typing import NamedTuple
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+FEE_TIERS = (100, 500, 3000, 10000)  # Uniswap v3 WETH/USDC pools, in hundredths of a bip
+SPLIT_STEPS = 4                      # splits are tried in quarters of the amount
+DEFAULT_SLIPPAGE = 0.005             # amountOutMinimum is the quote less 0.5%
+MIN_SPLIT_GAIN = 0.0005              # a split must beat the best single pool by 5 bps, it pays a second swap
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class RouteLeg(NamedTuple):
+    fee: int
+    amount_in: int
+    quoted_out: int
+    min_out: int
+
+
+class Route(NamedTuple):
+    legs: tuple[RouteLeg, ...]  # one leg per pool, a single pool route has one
+
+    @property
+    def amount_in(self) -> int:
+        return sum(leg.amount_in for leg in self.legs)
+
+    @property
+    def quoted_out(self) -> int:
+        return sum(leg.quoted_out for leg in self.legs)
+
+    @property
+    def min_out(self) -> int:
+        return sum(leg.min_out for leg in self.legs)
+
+
+def _split_amounts(amount_in: int, steps: int) -> list[tuple[int, int]]:
+    """(first, second) amounts of every split, first leg k/steps of the amount."""
+    return [(amount_in * k // steps, amount_in - amount_in * k // steps) for k in range(1, steps)]
+
+
+def quote_amounts(amount_in: int, steps: int = SPLIT_STEPS) -> set[int]:
+    """Input amounts to quote in every pool to evaluate all singles and splits."""
+    return {amount_in, *(amount for split in _split_amounts(amount_in, steps) for amount in split)}
+
+
+def quote_tiers(
+    quoter: ABIContract,
+    token_in,
+    token_out,
+    amount_in: int,
+    fee_tiers=FEE_TIERS,
+    steps: int = SPLIT_STEPS,
+    extra_amounts=(),
+) -> dict[tuple[int, int], int | None]:
+    """
+    Quote every fee tier at every amount of quote_amounts in one multicall.
+
+    Args:
+        extra_amounts: More amounts to quote in the same call, e.g. for an impact curve
+
+    Returns:
+        {(fee, amount_in): amount_out}, None where the pool does not exist or the quote reverts
+    """
+    batch = Multicall()
+    for fee in fee_tiers:
+        for amount in sorted(quote_amounts(amount_in, steps) | set(extra_amounts)):
+            params = (str(token_in.address), str(token_out.address), amount, fee, 0)
+            batch.add(f"{fee}/{amount}", quoter.quoteExactInputSingle, params, allow_failure=True)
+    return {
+        tuple(map(int, key.split("/"))): (result[0] if result is not None else None)
+        for key, result in batch.execute().items()
+    }
+
+
+def best_route(
+    quotes: dict[tuple[int, int], int | None],
+    amount_in: int,
+    fee_tiers=FEE_TIERS,
+    steps: int = SPLIT_STEPS,
+    slippage: float = DEFAULT_SLIPPAGE,
+    min_split_gain: float = MIN_SPLIT_GAIN,
+) -> Route | None:
+    """
+    Cheapest single pool, or a split over two pools if it gives min_split_gain more.
+
+    Args:
+        quotes: Result of quote_tiers
+        slippage: Each leg's amountOutMinimum is its quote times (1 - slippage)
+
+    Returns:
+        Route, None if no pool can take the amount
+    """
+    def leg(fee: int, amount: int) -> RouteLeg:
+        quoted_out = quotes[(fee, amount)]
+        return RouteLeg(fee, amount, quoted_out, int(quoted_out * (1 - slippage)))
+
+    singles = [(quotes.get((fee, amount_in)), fee) for fee in fee_tiers]
+    singles = [(out, fee) for out, fee in singles if out]
+    best = Route((leg(max(singles)[1], amount_in),)) if singles else None
+
+    best_split = None
+    for fee_a, fee_b in combinations(fee_tiers, 2):
+        for amount_a, amount_b in _split_amounts(amount_in, steps):
+            out_a, out_b = quotes.get((fee_a, amount_a)), quotes.get((fee_b, amount_b))
+            if out_a and out_b and (best_split is None or out_a + out_b > best_split.quoted_out):
+                best_split = Route((leg(fee_a, amount_a), leg(fee_b, amount_b)))
+
+    if best_split is not None and (best is None or best_split.quoted_out > best.quoted_out * (1 + min_split_gain)):
+        return best_split
+    return best
+
+
+def plan_route(quoter: ABIContract, token_in, token_out, amount_in: int, slippage: float = DEFAULT_SLIPPAGE, fee_tiers=FEE_TIERS) -> Route | None:
+    """Quote all fee tiers and splits in one round trip and pick the best route."""
+    quotes = quote_tiers(quoter, token_in, token_out, amount_in, fee_tiers)
+    return best_route(quotes, amount_in, fee_tiers, slippage=slippage)
+
+
+def execute_route(router: ABIContract, route: Route, token_in, token_out, recipient) -> list[int]:
+    """
+    Swap every leg with exactInputSingle, token_in must be approved for route.amount_in.
+
+    Returns:
+        Amount received by each leg
+    """
+    return [
+        router.exactInputSingle((
+            token_in.address,   # what are we selling
+            token_out.address,  # what are we buying
+            leg.fee,            # pool fee tier
+            recipient,
+            leg.amount_in,
+            leg.min_out,        # from the quote, not the oracle
+            0,                  # no price limit
+        ))
+        for leg in route.legs
+    ]
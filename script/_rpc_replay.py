@@ -0,0 +1,254 @@
+"""
+Record/replay of JSON-RPC responses for forked-network runs.
+
+Record once, with network access, against a pinned block:
+
+    python -m script._rpc_replay record --block 21000000 -- mox test
+
+Every later run is served from the local store only, e.g. in an air-gapped CI:
+
+    python -m script._rpc_replay replay --block 21000000 -- mox test
+
+The command after `--` runs with $MAINNET_RPC_URL pointed at a local JSON-RPC
+server backed by the store, so moccasin forks from it without any change.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.rpc import RPC, EthereumRPC, RPCError, to_hex
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from script._cache import get_cache_dir
+from typing import Any
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import zlib
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+RECORD = "record"
+REPLAY = "replay"
+BLOCK_TAGS = {"latest", "safe", "finalized", "pending"}
+DEFAULT_RPC_ENV_VAR = "MAINNET_RPC_URL"
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class ReplayMissError(RPCError):
+    def __init__(self, method: str, params: Any):
+        super().__init__(f"{method} {params} was not recorded", code=-32001)
+
+
+class ReplayStore:
+    """
+    JSON-RPC responses in SQLite, indexed by (method, params).
+    Results are stored as zlib compressed JSON.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()  # the HTTP server answers from several threads
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " method TEXT NOT NULL, params TEXT NOT NULL, result BLOB NOT NULL,"
+            " PRIMARY KEY (method, params)) WITHOUT ROWID"
+        )
+
+    @classmethod
+    def for_block(cls, block_number: int, cache_dir: Path | None = None) -> "ReplayStore":
+        cache_dir = cache_dir or get_cache_dir()
+        return cls(cache_dir / "rpc_replay" / f"block_{block_number}.sqlite")
+
+    @staticmethod
+    def _key(method: str, params: Any) -> tuple[str, str]:
+        return method, json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    def get(self, method: str, params: Any) -> tuple[bool, Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM responses WHERE method = ? AND params = ?",
+                self._key(method, params),
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(zlib.decompress(row[0]))
+
+    def put(self, method: str, params: Any, result: Any):
+        blob = zlib.compress(json.dumps(result, separators=(",", ":")).encode())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (*self._key(method, params), blob),
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ReplayRPC(RPC):
+    """
+    RPC which records every response of `upstream` into a ReplayStore (mode "record")
+    or answers only from the store (mode "replay"), raising ReplayMissError on a miss.
+
+    In record mode, block tags ("latest", "safe", ...) are sent upstream as the
+    pinned block number, so a replay always sees the same chain state.
+    """
+
+    def __init__(self, store: ReplayStore, mode: str, upstream: RPC | None = None, block_number: int | None = None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode == RECORD and upstream is None:
+            raise ValueError("Recording needs an upstream RPC")
+        self._store = store
+        self._mode = mode
+        self._upstream = upstream
+        self._block_number = block_number
+
+    @property
+    def identifier(self) -> str:
+        return f"replay:{self._store.path}"
+
+    @property
+    def name(self) -> str:
+        return self.identifier
+
+    def _pin(self, params: Any) -> Any:
+        if self._block_number is None or not isinstance(params, list):
+            return params
+        return [to_hex(self._block_number) if p in BLOCK_TAGS else p for p in params]
+
+    def fetch(self, method: str, params: Any) -> Any:
+        found, result = self._store.get(method, params)
+        if found:
+            return result
+        if self._mode == REPLAY:
+            raise ReplayMissError(method, params)
+        result = self._upstream.fetch(method, self._pin(params))
+        self._store.put(method, params, result)
+        return result
+
+    def fetch_uncached(self, method: str, params: Any) -> Any:
+        return self.fetch(method, params)
+
+    def fetch_multi(self, payloads: list[tuple[str, Any]]) -> list[Any]:
+        results = {}
+        missing = []
+        for ix, (method, params) in enumerate(payloads):
+            found, result = self._store.get(method, params)
+            if found:
+                results[ix] = result
+            elif self._mode == REPLAY:
+                raise ReplayMissError(method, params)
+            else:
+                missing.append(ix)
+
+        if missing:
+            batch = [(payloads[ix][0], self._pin(payloads[ix][1])) for ix in missing]
+            for ix, result in zip(missing, self._upstream.fetch_multi(batch)):
+                self._store.put(*payloads[ix], result)
+                results[ix] = result
+
+        return [results[ix] for ix in range(len(payloads))]
+
+
+def _answer(rpc: RPC, request: dict) -> dict:
+    response = {"jsonrpc": "2.0", "id": request.get("id")}
+    try:
+        response["result"] = rpc.fetch(request["method"], request.get("params", []))
+    except RPCError as e:
+        response["error"] = {"code": e.code, "message": str(e)}
+    return response
+
+
+def serve(rpc: RPC, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve `rpc` as a JSON-RPC HTTP endpoint from a daemon thread, port 0 picks a free port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if isinstance(request, list):
+                response = [_answer(rpc, item) for item in request]
+            else:
+                response = _answer(rpc, request)
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # keep test output clean
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def resolve_block(url: str, block_identifier: int | str = "safe") -> int:
+    """Block number of `block_identifier` (a number or a tag such as "safe") at `url`."""
+    if isinstance(block_identifier, int) or str(block_identifier).isdigit():
+        return int(block_identifier)
+    block = EthereumRPC(url).fetch("eth_getBlockByNumber", [block_identifier, False])
+    return int(block["number"], 16)
+
+
+def serve_block(block_number: int, upstream: RPC | None = None, cache_dir: Path | None = None) -> ThreadingHTTPServer:
+    """
+    Serve the store of `block_number`, recording what it misses from `upstream`,
+    replaying only without one.
+
+    The server is the only writer of the store, any number of processes can
+    fork from it: a response fetched for one of them is served from disk to
+    all the others.
+    """
+    store = ReplayStore.for_block(block_number, cache_dir)
+    return serve(ReplayRPC(store, RECORD if upstream else REPLAY, upstream, block_number))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m script._rpc_replay", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=[RECORD, REPLAY])
+    parser.add_argument("--block", type=int, required=True, help="block number the fork is pinned to")
+    parser.add_argument("--env-var", default=DEFAULT_RPC_ENV_VAR, help="RPC url variable used in moccasin.toml")
+    parser.add_argument("--upstream", help="RPC url to record from, defaults to $<env-var>")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="command to run, after --")
+    args = parser.parse_args(argv)
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("missing command to run, e.g. -- mox test")
+
+    upstream = None
+    if args.mode == RECORD:
+        url = args.upstream or os.environ.get(args.env_var)
+        if not url:
+            parser.error(f"recording needs --upstream or ${args.env_var}")
+        upstream = EthereumRPC(url)
+
+    store = ReplayStore.for_block(args.block)
+    server = serve(ReplayRPC(store, args.mode, upstream, args.block))
+    host, port = server.server_address[:2]
+    env = {**os.environ, args.env_var: f"http://{host}:{port}"}
+    try:
+        return subprocess.call(command, env=env)
+    finally:
+        server.shutdown()
+        print(f"{args.mode}: {len(store)} responses in {store.path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 from boa.contracts.abi.abi_contract import ABIContract
 from typing import Tuple
 from moccasin.config import get_active_network, Network
+from script._contract_registry import get_contract
 import boa
 
 
@@ -38,8 +39,8 @@ def setup_script() -> Tuple[ABIContract, ABIContract]:
 
     active_network = get_active_network()
 
-    usdc = active_network.manifest_named("usdc")
-    weth = active_network.manifest_named("weth")
+    usdc = get_contract("usdc")
+    weth = get_contract("weth")
     
     if active_network.is_local_or_forked_network():
         _add_eth_balance()
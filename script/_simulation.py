@@ -0,0 +1,209 @@
+"""
+What-if runs of the full rebalance (deposit, withdraw, approve,
+exactInputSingle, supply) that never leave a trace on chain.
+
+    report = simulate(Scenario("eth -20%", price_shocks=(("eth_usd", 0.8),)))
+    reports = run_scenarios(scenario_matrix(price_shocks=(0.8, 1.0, 1.2), trade_scales=(0.5, 1.0)))
+
+Each scenario runs inside an EVM snapshot that is reverted afterwards. On a
+live network the chain is first forked into the process, so the transactions
+are only ever executed locally. Scenarios fan out across worker processes
+forked from this one: every worker starts from a copy of the same state and
+nothing but the reports is sent back.
+
+Price shocks move the Chainlink answer only, the pools keep their price, so
+a shock shows what the plan and the oracle floor of the route would do.
+"""
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from itertools import product
+from moccasin.config import get_active_network
+from script._contract_registry import get_contract
+from script._instrumentation import UNATTRIBUTED, instrument
+from script._multicall import get_multicall3
+from script._price_service import get_price_service
+from script._rebalancer import get_rebalancer
+from script._routing import FEE_TIERS
+from script.rebalance_portfolio import _run_rebalance
+from typing import Iterator, NamedTuple
+import boa
+import io
+import multiprocessing
+import os
+import time
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+MOCK_FEED = "contracts/mocks/mock_v3_aggregator.vy"
+PIPELINE_CONTRACTS = (
+    "usdc", "weth", "aavev3_pool_address_provider", "aave_protocol_data_provider",
+    "uniswap_swap_router", "uniswap_quoter", "usdc_usd", "eth_usd",
+)
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class Scenario(NamedTuple):
+    name: str
+    price_shocks: tuple[tuple[str, float], ...] = ()  # (feed name, multiplier of its answer)
+    fee_tiers: tuple[int, ...] = FEE_TIERS            # pools the route may use
+    trade_scale: float = 1.0                          # multiplier of the planned swap
+
+
+class SimulationReport(NamedTuple):
+    scenario: Scenario
+    error: str | None          # exception of a failed run, e.g. the oracle floor
+    gas_used: dict[str, int]   # per stage
+    result: dict | None        # JSON result of the run, see run_script
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def total_gas(self) -> int:
+        return sum(self.gas_used.values())
+
+
+def scenario_matrix(
+    price_shocks=(1.0,),
+    fee_tier_sets=(FEE_TIERS,),
+    trade_scales=(1.0,),
+    feed_name: str = "eth_usd",
+) -> list[Scenario]:
+    """Every combination of ETH price shock, allowed fee tiers and trade scale."""
+    return [
+        Scenario(
+            f"{feed_name} x{shock:g} / {','.join(map(str, tiers))} / trade x{scale:g}",
+            ((feed_name, shock),) if shock != 1.0 else (),
+            tuple(tiers),
+            scale,
+        )
+        for shock, tiers, scale in product(price_shocks, fee_tier_sets, trade_scales)
+    ]
+
+
+@contextmanager
+def local_fork() -> Iterator:
+    """
+    Swap a live network env for an in-process fork of its latest block, so
+    nothing can be broadcast. No-op on pyevm and forks, already in-process.
+    """
+    if not hasattr(boa.env, "get_chain_id"):
+        yield boa.env
+        return
+    eoa = boa.env.eoa
+    with boa.swap_env(boa.Env()):
+        boa.env.fork(url=get_active_network().url, block_identifier="latest", deprecated=False)
+        boa.env.eoa = eoa  # impersonated, the fork accepts any sender
+        yield boa.env
+
+
+def prepare():
+    """Resolve every contract of the pipeline, so pyevm mocks are deployed outside the snapshots."""
+    for name in PIPELINE_CONTRACTS:
+        get_contract(name)
+    get_multicall3()
+    get_rebalancer()
+
+
+def shock_price(feed_name: str, factor: float) -> int:
+    """
+    Open a new round of a feed at `factor` times its answer, on any network.
+
+    The feed is etched with the mock feed code, keeping its decimals, so a
+    mainnet aggregator proxy can be moved like a pyevm mock. Nothing is
+    deployed: a deployment would become the pyevm mock of the feed name.
+
+    Returns:
+        Shocked answer
+    """
+    feed = get_contract(feed_name)
+    round_id, answer, _, _, _ = feed.latestRoundData()
+    shocked = int(answer * factor)
+    decimals = feed.decimals()
+    mock_feed = boa.load_partial(MOCK_FEED)
+    layout = mock_feed.compiler_data.storage_layout["storage_layout"]
+    boa.env.set_code(feed.address, mock_feed.compiler_data.bytecode_runtime)
+    for slot in range(layout["getAnswer"]["slot"]):  # scalars of the mock, over whatever the proxy kept there
+        boa.env.set_storage(feed.address, slot, 0)
+    boa.env.set_storage(feed.address, layout["decimals"]["slot"], decimals)
+    now = boa.env.evm.patch.timestamp
+    registered = boa.env.lookup_contract(feed.address)
+    mock_feed.at(feed.address).updateRoundData(round_id + 1, shocked, now, now)
+    if registered is not None:  # manifest_named only trusts the contract it deployed at an address
+        boa.env.register_contract(feed.address, registered)
+    return shocked
+
+
+def simulate(scenario: Scenario = Scenario("base")) -> SimulationReport:
+    """
+    Run the whole rebalance for a scenario in a reverted snapshot.
+
+    Returns:
+        SimulationReport, with the error instead of a result if the run reverted
+    """
+    start = time.perf_counter()
+    result, error = None, None
+    prices = get_price_service()
+    with local_fork():
+        prepare()
+        with boa.env.anchor():
+            for feed_name, factor in scenario.price_shocks:
+                shock_price(feed_name, factor)
+            prices.clear()
+            with instrument() as instrumentation, redirect_stdout(io.StringIO()):
+                try:
+                    _, result = _run_rebalance(quiet=True, fee_tiers=scenario.fee_tiers, trade_scale=scenario.trade_scale)
+                except Exception as exc:  # a failed what-if is a result too
+                    error = f"{type(exc).__name__}: {exc}"
+    prices.clear()  # the rounds read in the snapshot were reverted with it
+    gas_used = {name: stats.gas_used for name, stats in instrumentation.stages.items() if name != UNATTRIBUTED}
+    return SimulationReport(scenario, error, gas_used, result, time.perf_counter() - start)
+
+
+def run_scenarios(scenarios: list[Scenario], workers: int | None = None) -> list[SimulationReport]:
+    """
+    Simulate every scenario, across forked worker processes.
+
+    Workers are forked after the contracts are resolved (and a live network
+    forked), so each one starts from a copy of the same state without any
+    setup of its own.
+
+    Args:
+        workers: Processes, os.cpu_count() if None, 1 runs in this process
+
+    Returns:
+        Reports in the order of the scenarios
+    """
+    workers = min(workers or os.cpu_count() or 1, len(scenarios))
+    with local_fork():
+        prepare()
+        if workers <= 1:
+            return [simulate(scenario) for scenario in scenarios]
+        context = multiprocessing.get_context("fork")  # workers inherit the EVM, pyevm state included
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            return list(pool.map(simulate, scenarios))
+
+
+def format_table(reports: list[SimulationReport]) -> str:
+    """Reports as a fixed width table."""
+    header = f"{'scenario':<48}{'sold':>6}{'amount_in':>22}{'amount_out':>22}{'weth %':>8}{'gas':>10}  error"
+    lines = [header, "-" * len(header)]
+    for report in reports:
+        if report.ok:
+            trades = report.result["trades"]
+            lines.append(
+                f"{report.scenario.name:<48}{trades['sold'] or '-':>6}{trades['amount_in']:>22}{trades['amount_out']:>22}"
+                f"{report.result['allocations_after']['weth'] * 100:>8.2f}{report.total_gas:>10}"
+            )
+        else:
+            lines.append(f"{report.scenario.name:<48}{'':>6}{'':>22}{'':>22}{'':>8}{report.total_gas:>10}  {report.error}")
+    return "\n".join(lines)
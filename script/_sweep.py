@@ -0,0 +1,198 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import replace
+from itertools import product
+from multiprocessing import shared_memory
+from script._backtest import CostModel, run_backtest
+from script._execution import estimate_impact, impact_amounts
+from script._routing import FEE_TIERS, quote_tiers
+from typing import Iterator, NamedTuple
+import math
+import numpy as np
+import os
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+FEE_DENOMINATOR = 1_000_000
+PROBE_USD = 100_000                  # trade quoted to measure the depth of every pool
+TASKS_PER_WORKER = 4                 # chunks per worker, evens out slow parameter sets
+
+_history: dict[str, np.ndarray] | None = None  # arrays of the worker, attached once per process
+_segments: list[shared_memory.SharedMemory] = []
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+class SweepParams(NamedTuple):
+    buffer: float
+    usdc_target: float  # WETH gets the rest
+    fee_tier: int       # 3000 = 0.3% pool
+    min_out: float      # amountOutMinimum over the oracle value, 0.9 in run_script
+
+    @property
+    def targets(self) -> tuple[float, float]:
+        return self.usdc_target, 1.0 - self.usdc_target
+
+
+def grid(buffers, usdc_targets, fee_tiers=(3000,), min_outs=(0.9,)) -> list[SweepParams]:
+    """Every combination of the given values."""
+    return [SweepParams(*values) for values in product(buffers, usdc_targets, fee_tiers, min_outs)]
+
+
+def random_samples(
+    count: int,
+    buffer_range=(0.01, 0.3),
+    usdc_target_range=(0.1, 0.9),
+    fee_tiers=FEE_TIERS,
+    min_out_range=(0.9, 1.0),
+    seed: int | None = None,
+) -> list[SweepParams]:
+    """`count` parameter sets drawn uniformly, fee tiers drawn from the list."""
+    rng = np.random.default_rng(seed)
+    return [
+        SweepParams(float(buffer), float(usdc_target), int(fee_tier), float(min_out))
+        for buffer, usdc_target, fee_tier, min_out in zip(
+            rng.uniform(*buffer_range, count),
+            rng.uniform(*usdc_target_range, count),
+            rng.choice(fee_tiers, count),
+            rng.uniform(*min_out_range, count),
+        )
+    ]
+
+
+def pool_liquidity_usd(quoter, token_in, token_out, price_in: float, fee_tiers=FEE_TIERS, probe_usd: float = PROBE_USD) -> dict[int, float]:
+    """
+    Liquidity per side of every pool, as CostModel.liquidity_usd, measured
+    through the quoter: the impact of the fitted curve, amount / (depth + amount),
+    is trade_usd / liquidity_usd to first order. One multicall.
+
+    Returns:
+        {fee: liquidity_usd} of the pools that quoted, inf where no impact showed
+    """
+    decimals = token_in.decimals()
+    amount_in = int(probe_usd / price_in * 10 ** decimals)
+    quotes = quote_tiers(quoter, token_in, token_out, amount_in, fee_tiers, extra_amounts=impact_amounts(amount_in))
+    return {fee: curve.depth / 10 ** decimals * price_in for fee, curve in sorted(estimate_impact(quotes, fee_tiers).items())}
+
+
+@contextmanager
+def shared_history(**arrays: np.ndarray) -> Iterator[dict]:
+    """
+    Copy arrays once into shared memory for the lifetime of the block.
+
+    Yields:
+        Picklable {name: (segment name, shape, dtype)} to pass to the workers
+    """
+    segments, spec = [], {}
+    try:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(segment)
+            np.ndarray(array.shape, array.dtype, buffer=segment.buf)[...] = array
+            spec[name] = (segment.name, array.shape, array.dtype.str)
+        yield spec
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def _attach(spec: dict):
+    """Pool initializer: map the shared arrays read-only, without copying them."""
+    global _history
+    _history = {}
+    for name, (segment_name, shape, dtype) in spec.items():
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _segments.append(segment)  # the arrays are only valid while the segment is open
+        array = np.ndarray(shape, np.dtype(dtype), buffer=segment.buf)
+        array.flags.writeable = False
+        _history[name] = array
+
+
+def _evaluate(params: SweepParams, history: dict, costs: CostModel, liquidity_usd: dict | None) -> dict:
+    fee_costs = replace(
+        costs,
+        fee=params.fee_tier / FEE_DENOMINATOR,
+        liquidity_usd=(liquidity_usd or {}).get(params.fee_tier, costs.liquidity_usd),
+    )
+    result = run_backtest(
+        history["timestamps"],
+        history["prices"],
+        targets=params.targets,
+        buffer=params.buffer,
+        rates=history.get("rates"),
+        costs=fee_costs,
+        min_out=params.min_out,
+    )
+    return {**params._asdict(), **result.summary()}
+
+
+def _evaluate_chunk(chunk: list[SweepParams], costs: CostModel, liquidity_usd: dict | None) -> list[dict]:
+    return [_evaluate(params, _history, costs, liquidity_usd) for params in chunk]
+
+
+def run_sweep(
+    timestamps,
+    prices,
+    params: list[SweepParams],
+    rates=None,
+    costs: CostModel = CostModel(),
+    liquidity_usd: dict[int, float] | None = None,
+    workers: int | None = None,
+    rank_by: str = "pnl",
+) -> list[dict]:
+    """
+    Backtest every parameter set over one history, across a process pool.
+
+    The history is written once to shared memory and mapped by each worker, so
+    memory and start-up cost do not grow with the number of workers. Parameter
+    sets are sent in a few chunks per worker.
+
+    Args:
+        timestamps, prices, rates: History, see run_backtest
+        params: Parameter sets, e.g. from grid() or random_samples()
+        costs: Slippage, liquidity and gas of the swap, the fee comes from the fee tier
+        liquidity_usd: Pool liquidity per fee tier, costs.liquidity_usd if missing
+        workers: Processes, os.cpu_count() if None, 1 runs in this process
+        rank_by: Key of BacktestResult.summary() to sort by, best (largest) first
+
+    Returns:
+        One row per parameter set: the parameters and the backtest summary
+    """
+    history = {"timestamps": np.asarray(timestamps, dtype=np.int64), "prices": np.asarray(prices, dtype=np.float64)}
+    if rates is not None:
+        history["rates"] = np.asarray(rates, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(params) <= 1:
+        rows = [_evaluate(p, history, costs, liquidity_usd) for p in params]
+    else:
+        chunk_size = math.ceil(len(params) / (workers * TASKS_PER_WORKER))
+        chunks = [params[i : i + chunk_size] for i in range(0, len(params), chunk_size)]
+        with shared_history(**history) as spec:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(spec,)) as pool:
+                rows = [
+                    row
+                    for chunk_rows in pool.map(_evaluate_chunk, chunks, [costs] * len(chunks), [liquidity_usd] * len(chunks))
+                    for row in chunk_rows
+                ]
+    return sorted(rows, key=lambda row: row[rank_by], reverse=True)
+
+
+def format_table(rows: list[dict], limit: int | None = 20) -> str:
+    """Ranked rows as a fixed width table."""
+    header = f"{'rank':>4}{'buffer':>8}{'usdc':>7}{'fee':>7}{'min_out':>9}{'pnl':>12}{'excess':>11}{'turnover':>10}{'rebal':>7}{'failed':>8}"
+    lines = [header, "-" * len(header)]
+    for rank, row in enumerate(rows[:limit], start=1):
+        lines.append(
+            f"{rank:>4}{row['buffer']:>8.3f}{row['usdc_target']:>7.2f}{row['fee_tier']:>7}{row['min_out']:>9.3f}"
+            f"{row['pnl']:>12.2f}{row['excess_pnl']:>11.2f}{row['turnover']:>10.3f}{row['rebalance_count']:>7}{row['failed_count']:>8}"
+        )
+    return "\n".join(lines)
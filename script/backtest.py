@@ -0,0 +1,40 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from script._backtest import CostModel, load_history, run_backtest
+from script.rebalance_portfolio import BUFFER, TARGET_ALLOCATIONS
+import json
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+BACKTEST_ROUNDS = 10_000  # Chainlink rounds of each feed, around a year of ETH / USD
+SWAP_FEE = 0.003          # fee tier of the swap in run_script
+
+
+# ------------------------------------------------------------------
+#                       RUN SCRIPT FUNCTION
+# ------------------------------------------------------------------
+def run_script(rounds: int = BACKTEST_ROUNDS) -> dict:
+    """
+    Backtest the drift rule of rebalance_portfolio over the Chainlink history
+    of the active network, e.g. `mox run backtest --network eth-forked`.
+    Rounds and supply rates are cached locally, later runs do not hit the RPC.
+    """
+    timestamps, prices, rates = load_history(rounds=rounds)
+    result = run_backtest(
+        timestamps,
+        prices,
+        targets=[TARGET_ALLOCATIONS["usdc"], TARGET_ALLOCATIONS["weth"]],
+        buffer=BUFFER,
+        rates=rates,
+        costs=CostModel(fee=SWAP_FEE),
+    )
+    summary = result.summary()
+    print(json.dumps(summary, indent=4))
+    return summary
+
+
+def moccasin_main():
+    run_script()
@@ -0,0 +1,46 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from moccasin.config import get_active_network, get_config
+from script._benchmark import BENCHMARK_DIR, compare, format_regressions, load, run_benchmarks, save, without_timings
+import os
+import sys
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+UPDATE_ENV_VAR = "MOX_REBALANCE_BENCH_UPDATE"  # set to write the run as the new baseline
+
+
+# ------------------------------------------------------------------
+#                       RUN SCRIPT FUNCTION
+# ------------------------------------------------------------------
+def run_script() -> dict:
+    """
+    Benchmark the trade math and every stage of the rebalance on the active
+    network, e.g. `mox run benchmark --network pyevm`. The result is written to
+    benchmarks/latest_<network>.json and checked against
+    benchmarks/baseline_<network>.json when there is one, exiting with status 1
+    on any regression. The baseline keeps the counts only, timings are
+    compared between results of one machine.
+    """
+    network = get_active_network().name
+    directory = get_config().project_root / BENCHMARK_DIR
+    baseline_path = directory / f"baseline_{network}.json"
+    result = run_benchmarks()
+    save(result, directory / f"latest_{network}.json")
+
+    if os.environ.get(UPDATE_ENV_VAR) or not baseline_path.exists():
+        save(without_timings(result), baseline_path)
+        print(f"Baseline written to {baseline_path}")
+    else:
+        regressions = compare(result, load(baseline_path))
+        print(format_regressions(regressions))
+        if regressions:
+            sys.exit(1)  # fails `mox run benchmark` in CI
+    return result
+
+
+def moccasin_main():
+    run_script()
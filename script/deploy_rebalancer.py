@@ -0,0 +1,20 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from boa.contracts.vyper.vyper_contract import VyperContract
+from contracts import rebalancer
+from script._contract_registry import get_contract
+
+
+# ------------------------------------------------------------------
+#                            FUNCTIONS
+# ------------------------------------------------------------------
+def deploy_rebalancer() -> VyperContract:
+    """Deploy the atomic rebalancer against the Aave pool and Uniswap router of the active network."""
+    pool_addresses_provider = get_contract("aavev3_pool_address_provider")
+    swap_router = get_contract("uniswap_swap_router")
+    return rebalancer.deploy(pool_addresses_provider.address, swap_router.address)
+
+
+def moccasin_main():
+    return deploy_rebalancer()
@@ -0,0 +1,5 @@
+from script._deploy_mocks import deploy_price_feed
+
+
+def moccasin_main():
+    return deploy_price_feed("eth_usd")
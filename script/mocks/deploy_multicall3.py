@@ -0,0 +1,5 @@
+from script._deploy_mocks import deploy_multicall3
+
+
+def moccasin_main():
+    return deploy_multicall3()
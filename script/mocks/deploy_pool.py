@@ -0,0 +1,5 @@
+from script._deploy_mocks import deploy_pool
+
+
+def moccasin_main():
+    return deploy_pool()
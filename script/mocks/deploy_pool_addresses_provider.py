@@ -0,0 +1,5 @@
+from script._deploy_mocks import deploy_pool_addresses_provider
+
+
+def moccasin_main():
+    return deploy_pool_addresses_provider()
@@ -0,0 +1,5 @@
+from script._deploy_mocks import deploy_protocol_data_provider
+
+
+def moccasin_main():
+    return deploy_protocol_data_provider()
@@ -0,0 +1,5 @@
+from script._deploy_mocks import deploy_swap_router
+
+
+def moccasin_main():
+    return deploy_swap_router()
@@ -0,0 +1,50 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from moccasin.config import get_active_network
+from script._monitor import DEFAULT_POLL_INTERVAL, DriftMonitor
+from script._multi_account import get_transactor
+from script.rebalance_accounts import ACCOUNTS_ENV_VAR, load_signers_from_env
+from script.rebalance_portfolio import BUFFER, TARGET_ALLOCATIONS
+import boa
+import os
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+POLL_INTERVAL_ENV_VAR = "MOX_REBALANCE_POLL_INTERVAL"  # seconds
+
+
+# ------------------------------------------------------------------
+#                       RUN SCRIPT FUNCTION
+# ------------------------------------------------------------------
+def run_script(max_polls: int | None = None) -> DriftMonitor:
+    """
+    Watch the default account and $MOX_REBALANCE_ACCOUNTS, rebalance any of
+    them drifting more than BUFFER from TARGET_ALLOCATIONS. Live networks watch
+    and sign for the keystores of $MOX_REBALANCE_KEYSTORES instead.
+    """
+    if get_active_network().is_local_or_forked_network():
+        accounts = [str(boa.env.eoa)]
+        accounts += [a.strip() for a in os.environ.get(ACCOUNTS_ENV_VAR, "").split(",") if a.strip()]
+        transactor = get_transactor()
+    else:
+        signers = load_signers_from_env()
+        accounts = [str(signer.address) for signer in signers]
+        transactor = get_transactor(signers)
+    poll_interval = float(os.environ.get(POLL_INTERVAL_ENV_VAR, DEFAULT_POLL_INTERVAL))
+
+    targets = [TARGET_ALLOCATIONS["usdc"], TARGET_ALLOCATIONS["weth"]]
+    with DriftMonitor(accounts, targets, BUFFER, transactor=transactor) as monitor:
+        print(f"Watching {len(accounts)} account(s), drift: {', '.join(f'{d:.2%}' for d in monitor.drift)}")
+        try:
+            monitor.run(poll_interval, max_polls)
+        except KeyboardInterrupt:
+            pass
+    print(monitor.stats)
+    return monitor
+
+
+def moccasin_main():
+    run_script()
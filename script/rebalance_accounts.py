@@ -0,0 +1,58 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from moccasin.config import get_active_network
+from script._multi_account import FAILED, get_transactor, load_signers, rebalance_accounts
+from script.rebalance_portfolio import BUFFER, TARGET_ALLOCATIONS
+import os
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+ACCOUNTS_ENV_VAR = "MOX_REBALANCE_ACCOUNTS"                    # comma separated addresses, impersonated on forks
+KEYSTORES_ENV_VAR = "MOX_REBALANCE_KEYSTORES"                  # comma separated keystore files, live networks
+KEYSTORE_PASSWORD_ENV_VAR = "MOX_REBALANCE_KEYSTORE_PASSWORD"
+
+
+# ------------------------------------------------------------------
+#                       RUN SCRIPT FUNCTION
+# ------------------------------------------------------------------
+def load_signers_from_env() -> list:
+    """Signers of the keystores of $MOX_REBALANCE_KEYSTORES, for live networks."""
+    return load_signers(
+        [path.strip() for path in os.environ[KEYSTORES_ENV_VAR].split(",")],
+        os.environ[KEYSTORE_PASSWORD_ENV_VAR],
+    )
+
+
+def run_script() -> list:
+    """
+    Rebalance every managed account of the active network to TARGET_ALLOCATIONS.
+    Forks impersonate $MOX_REBALANCE_ACCOUNTS, live networks sign with the
+    keystores of $MOX_REBALANCE_KEYSTORES.
+    """
+    active_network = get_active_network()
+    transactor = None
+    if active_network.is_local_or_forked_network():
+        accounts = [a.strip() for a in os.environ.get(ACCOUNTS_ENV_VAR, "").split(",") if a.strip()]
+    else:
+        signers = load_signers_from_env()
+        accounts = [signer.address for signer in signers]
+        transactor = get_transactor(signers)
+
+    results = rebalance_accounts(
+        accounts,
+        targets=[TARGET_ALLOCATIONS["usdc"], TARGET_ALLOCATIONS["weth"]],
+        buffer=BUFFER,
+        transactor=transactor,
+    )
+    for result in results:
+        print(f"{result.account} {result.status:<10} in={result.amount_in} out={result.amount_out} {result.seconds:.2f}s")
+        if result.status == FAILED:
+            print(f"    {result.error}")
+    return results
+
+
+def moccasin_main():
+    run_script()
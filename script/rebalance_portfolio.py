@@ -2,9 +2,26 @@
 #                         IMPORT LIBRARIES
 # ------------------------------------------------------------------
 from boa.contracts.abi.abi_contract import ABIContract
+from contextlib import redirect_stdout
 from typing import Tuple
 from moccasin.config import get_active_network
+from script._allowances import AllowanceManager, approve_max_from_env
+from script._contract_registry import get_contract
+from script._execution import MAX_SLICES, SLICE_INTERVAL, estimate_impact, execute_slices, gas_cost_out, impact_amounts, plan_slices
+from script._instrumentation import instrument_from_env, stage
+from script._journal import RunJournal, get_journal, journal_entry, record_activity
+from script._ledger import PositionLedger, swap_amounts
+from script._multicall import Multicall
+from script._profiler import profile_from_env
+from script._price_service import get_price_service
+from script._rebalancer import get_rebalancer, rebalance_atomic
+from script._rebalance_engine import plan_rebalance, plan_rebalance_exact, plan_swap_leg
+from script._reserve_registry import get_reserve_registry
+from script._routing import DEFAULT_SLIPPAGE, FEE_TIERS, best_route, execute_route, quote_tiers
 import boa
+import io
+import json
+import os
 
 
 # ------------------------------------------------------------------
@@ -14,6 +31,14 @@ STARTING_ETH_BALANCE = int(1000e18)
 STARTING_WETH_BALANCE = int(1e18)
 STARTING_USDC_BALANCE = int(100e6) # usdc 6 decimals not 18
 REFERRAL_CODE = 0
+BUFFER = 0.1 # rebalance once an allocation drifts more than 10 percentage points from its target
+TARGET_ALLOCATIONS = {"usdc": 0.3, "weth": 0.7}
+QUIET_ENV_VAR = "MOX_REBALANCE_QUIET" # set to run without prints and diagnostic reads, one JSON result
+SLIPPAGE_ENV_VAR = "MOX_REBALANCE_SLIPPAGE" # max slippage below the route quote, 0.005 = 0.5%
+ORACLE_FLOOR = 0.90 # never accept a route quoting less than 90% of the oracle value
+SLICE_INTERVAL_ENV_VAR = "MOX_REBALANCE_SLICE_INTERVAL" # seconds between the slices of a large swap
+ATOMIC_ENV_VAR = "MOX_REBALANCE_ATOMIC" # set to 0 to withdraw, swap and supply in separate transactions
+JOURNAL_ASSETS = {"usdc": ("usdc_usd", 6), "weth": ("eth_usd", 18)} # feed and decimals of each asset, to value the journal rows
 
 
 # ------------------------------------------------------------------
@@ -24,18 +49,21 @@ def _add_eth_balance():
     boa.env.set_balance(boa.env.eoa, STARTING_ETH_BALANCE)
 
 
-# Add 100 usdc and 1 weth
-def _add_token_balance(usdc: ABIContract, weth: ABIContract):
+# Add 100 usdc and 1 weth, quiet=True skips the balance reads only used for printing
+def _add_token_balance(usdc: ABIContract, weth: ABIContract, quiet: bool = False):
 
     # Add 1 weth to balance
-    print()
-    print("Add tokens")
-    print(f"Starting balance of WETH: {weth.balanceOf(boa.env.eoa)}")
+    if not quiet:
+        print()
+        print("Add tokens")
+        print(f"Starting balance of WETH: {weth.balanceOf(boa.env.eoa)}")
     weth.deposit(value=STARTING_WETH_BALANCE)
-    print(f"Ending balance of WETH: {weth.balanceOf(boa.env.eoa)}")
+    if not quiet:
+        print(f"Ending balance of WETH: {weth.balanceOf(boa.env.eoa)}")
 
     # Add 100 usdc to balance (usdc contract is centralized)
-    print(f"Starting balance USDC: {usdc.balanceOf(boa.env.eoa)}")
+    if not quiet:
+        print(f"Starting balance USDC: {usdc.balanceOf(boa.env.eoa)}")
     our_address = boa.env.eoa
     # Pretend to be the owner
     with boa.env.prank(usdc.owner()):
@@ -45,39 +73,58 @@ def _add_token_balance(usdc: ABIContract, weth: ABIContract):
     # Configure ourself to be a regular minter
     usdc.configureMinter(our_address, STARTING_USDC_BALANCE)
     usdc.mint(our_address, STARTING_USDC_BALANCE)        
-    print(f"Ending balance USDC: {usdc.balanceOf(boa.env.eoa)}")
-    print()
+    if not quiet:
+        print(f"Ending balance USDC: {usdc.balanceOf(boa.env.eoa)}")
+        print()
 
 
-# Depositing into Aave 
-def deposit(pool_contract, token, amount):
-    allowed_amount = token.allowance(boa.env.eoa, pool_contract.address)
-    if allowed_amount < amount:
-        token.approve(pool_contract.address, amount)
-    print(f"Depositing {token.name()} into Aave contract {pool_contract.address}")
+# Depositing into Aave, quiet=True skips the token name read only used for printing
+def deposit(pool_contract, token, amount, quiet: bool = False, allowances: AllowanceManager | None = None):
+    """
+    Args:
+        allowances: Shared allowance cache of the run, approves the exact amount if None
+    """
+    allowances = allowances or AllowanceManager(approve_max=False)
+    allowances.ensure(token, pool_contract, amount)
+    if not quiet:
+        print(f"Depositing {token.name()} into Aave contract {pool_contract.address}")
     pool_contract.supply(token.address, amount, boa.env.eoa, REFERRAL_CODE) # verify on aave doc
+    allowances.spend(token, pool_contract, amount)
           
 
+# Get Chainlink Pricefeeds on ETHEREUM MAINNET, all in one multicall, none if their rounds were just checked
+def get_prices(*feed_names: str) -> dict[str, float]:
+    return get_price_service().get_prices(*feed_names) # feed_name: usdc_usd or eth_usd
+
+
 # Get Chainlink Pricefeed on ETHEREUM MAINNET
 def get_price(feed_name: str) -> float:
-    active_network = get_active_network()
-    price_feed = active_network.manifest_named(feed_name) # feed_name: usdc_usd or eth_usd
-    price = price_feed.latestAnswer()
-    decimals = price_feed.decimals()
-    decimals_normalized = 10 ** decimals
-    return price / decimals_normalized
+    return get_prices(feed_name)[feed_name]
 
 
-# Print Balances
-def print_usdc_weth_token_balances():
-    active_network = get_active_network()
+# Get balances of several tokens in one multicall: {"usdc": token, ...} -> {"usdc": int, ...}
+def get_token_balances(tokens: dict[str, ABIContract], account=None) -> dict[str, int]:
+    account = account or boa.env.eoa
+    batch = Multicall()
+    for name, token in tokens.items():
+        batch.add(name, token.balanceOf, account)
+    return batch.execute()
 
-    usdc = active_network.manifest_named("usdc")
-    weth = active_network.manifest_named("weth")
+
+# Print Balances
+def print_usdc_weth_token_balances(balances: dict[str, int] | None = None):
+    """
+    Args:
+        balances: Already fetched {"usdc": int, "weth": int}, read from chain if None
+    """
+    if balances is None:
+        usdc = get_contract("usdc")
+        weth = get_contract("weth")
+        balances = get_token_balances({"usdc": usdc, "weth": weth})
 
     print("Balances:")
-    print(f"USDC balance: {usdc.balanceOf(boa.env.eoa)}")
-    print(f"WETH balance: {weth.balanceOf(boa.env.eoa)}")
+    print(f"USDC balance: {balances['usdc']}")
+    print(f"WETH balance: {balances['weth']}")
 
 
 # Calaculate Allocations
@@ -88,6 +135,7 @@ def calculate_rebalancing_trades(
 ) -> dict[str, dict]:
     """
     Calculate the trades needed to rebalance a portfolio of USDC and WETH.
+    Thin wrapper over the vectorized engine, see script/_rebalance_engine.py
 
     Args:
         usdc_data: Dict containing USDC balance, price and contract
@@ -96,31 +144,24 @@ def calculate_rebalancing_trades(
 
     Returns:
         Dict of token symbol to dict containing contract and trade amount:
-            {"usdc": {"contract": Contract, "trade": int},
-             "weth": {"contract": Contract, "trade": int}}
+            {"usdc": {"contract": Contract, "trade": float},
+             "weth": {"contract": Contract, "trade": float}}
     """
-    # Calculate current values
-    usdc_value = usdc_data["balance"] * usdc_data["price"]
-    weth_value = weth_data["balance"] * weth_data["price"]
-    total_value = usdc_value + weth_value
-
-    # Calculate target values
-    target_usdc_value = total_value * target_allocations["usdc"]
-    target_weth_value = total_value * target_allocations["weth"]
-
-    # Calculate trades needed in USD
-    usdc_trade_usd = target_usdc_value - usdc_value
-    weth_trade_usd = target_weth_value - weth_value
+    plan = plan_rebalance(
+        balances=[[usdc_data["balance"], weth_data["balance"]]],
+        prices=[usdc_data["price"], weth_data["price"]],
+        targets=[target_allocations["usdc"], target_allocations["weth"]],
+    )
 
     # Convert to token amounts
     return {
         "usdc": {
             "contract": usdc_data["contract"],
-            "trade": usdc_trade_usd / usdc_data["price"],
+            "trade": float(plan.trades[0, 0]),
         },
         "weth": {
             "contract": weth_data["contract"],
-            "trade": weth_trade_usd / weth_data["price"],
+            "trade": float(plan.trades[0, 1]),
         },
     }
     
@@ -128,38 +169,98 @@ def calculate_rebalancing_trades(
 # ------------------------------------------------------------------
 #                       RUN SCRIPT FUNCTION
 # ------------------------------------------------------------------
-def run_script() -> [ABIContract, ABIContract, ABIContract, ABIContract]:
+def _run_rebalance(quiet: bool = False, fee_tiers=FEE_TIERS, trade_scale: float = 1.0) -> tuple[tuple, dict]:
     """
-    1. Give ourselves some ETH
-    2. Give ourselves some USDC and WETH
+    Full rebalance, see run_script.
+
+    With quiet=True the chain reads only used for printing are skipped:
+    balances after each step are booked from the logs of the transactions, and
+    reconciled with the chain once at the end, as without quiet.
+
+    Args:
+        fee_tiers: Uniswap pools the route may use
+        trade_scale: Multiplies the planned swap, capped at the aToken balance (what-if runs)
+
+    Returns:
+        (usdc, weth, a_usdc, a_weth), result dict for the JSON output
     """
     
     # Setup
     print()
     print( "Starting setup script...")
 
-    active_network = get_active_network()
+    with stage("setup"):
+        active_network = get_active_network()
 
-    usdc = active_network.manifest_named("usdc")
-    weth = active_network.manifest_named("weth")
-    aavev3_pool_address_provider = active_network.manifest_named("aavev3_pool_address_provider")
+        usdc = get_contract("usdc")
+        weth = get_contract("weth")
+        aavev3_pool_address_provider = get_contract("aavev3_pool_address_provider")
 
-    # Where we will put money to it
-    pool_address = aavev3_pool_address_provider.getPool() 
-    pool_contract = active_network.manifest_named("pool", address=pool_address) # address can change
+        # Where we will put money to it
+        pool_address = aavev3_pool_address_provider.getPool() 
+        pool_contract = get_contract("pool", address=pool_address) # address can change
+        rebalancer = get_rebalancer() if os.environ.get(ATOMIC_ENV_VAR, "1") != "0" else None # None on live networks without one
     
-    if active_network.is_local_or_forked_network():
-        _add_eth_balance() # add eth
-        _add_token_balance(usdc, weth) # add usdc and weth
-
-    usdc_balance = usdc.balanceOf(boa.env.eoa)
-    weth_balance = weth.balanceOf(boa.env.eoa)
-
-    if usdc_balance > 0:
-        deposit(pool_contract, usdc, usdc_balance)
+        if active_network.is_local_or_forked_network():
+            _add_eth_balance() # add eth
+            _add_token_balance(usdc, weth, quiet=quiet) # add usdc and weth
+
+    # Every approval of the run up front: one multicall of the allowances, approves only if missing
+    with stage("approvals"):
+        balances = get_token_balances({"usdc": usdc, "weth": weth})
+        usdc_balance = balances["usdc"]
+        weth_balance = balances["weth"]
+
+        uniswap_swap_router = get_contract("uniswap_swap_router")
+        allowances = AllowanceManager(approve_max=approve_max_from_env())
+        allowances.prefetch([(usdc, pool_contract), (weth, pool_contract), (usdc, uniswap_swap_router), (weth, uniswap_swap_router)])
+        requirements = [(usdc, pool_contract, usdc_balance), (weth, pool_contract, weth_balance)]
+        if allowances.approve_max: # swap amount not planned yet, a max approval covers either direction
+            requirements += [(usdc, uniswap_swap_router, 1), (weth, uniswap_swap_router, 1)]
+        allowances.approve_all(requirements)
+
+    with stage("deposit"):
+        if usdc_balance > 0:
+            deposit(pool_contract, usdc, usdc_balance, quiet=quiet, allowances=allowances)
+
+        if weth_balance > 0:
+            deposit(pool_contract, weth, weth_balance, quiet=quiet, allowances=allowances)
+
+    # Look up aTokens for WETH and USDC (cached on disk, no RPC call once warm)
+    with stage("atoken_lookup"):
+        reserve_registry = get_reserve_registry()
+        a_usdc = get_contract("a_token", address=reserve_registry.get(usdc.address)["a_token"])
+        a_weth = get_contract("a_token", address=reserve_registry.get(weth.address)["a_token"])
+    print("Atokens for WETH and USDC ....")
+    print("------------------------------")
+    print("Atoken USDC:", a_usdc)
+    print("Atoken WETH:", a_weth)
+    print()
 
-    if weth_balance > 0:
-        deposit(pool_contract, weth, weth_balance)
+    # Pre-trade snapshot: account data, token and aToken balances, prices and the
+    # pool's reserves count (refreshes the registry once Aave lists a reserve) in one multicall
+    all_tokens = {"usdc": usdc, "weth": weth, "a_usdc": a_usdc, "a_weth": a_weth}
+    with stage("snapshot"):
+        feed_names = ("usdc_usd", "eth_usd")
+        batch = Multicall()
+        batch.add("user_account_data", pool_contract.getUserAccountData, boa.env.eoa)
+        batch.add("reserves_count", pool_contract.getReservesCount)
+        for name, token in all_tokens.items():
+            batch.add(name, token.balanceOf, boa.env.eoa)
+        if rebalancer is not None:
+            for name in ("a_usdc", "a_weth"):
+                batch.add(f"{name}/allowance", all_tokens[name].allowance, boa.env.eoa, rebalancer.address)
+        price_service = get_price_service()
+        price_service.add_calls(batch, feed_names)
+        snapshot = batch.execute()
+        quotes = price_service.from_results(snapshot, feed_names)
+        reserve_registry.sync(snapshot["reserves_count"])
+        if rebalancer is not None:
+            for name in ("a_usdc", "a_weth"):
+                allowances.remember(all_tokens[name], rebalancer, snapshot[f"{name}/allowance"])
+
+    # Positions from here on follow the logs of our transactions, no balanceOf reads
+    ledger = PositionLedger(boa.env.eoa, all_tokens, {name: snapshot[name] for name in all_tokens})
 
     (
         totalCollateralBase,
@@ -168,7 +269,7 @@ def run_script() -> [ABIContract, ABIContract, ABIContract, ABIContract]:
         currentLiquidationThreshold,
         ltv,                       # loan to value of the user
         healthFactor,
-    ) = pool_contract.getUserAccountData(boa.env.eoa)
+    ) = snapshot["user_account_data"]
     print(f"""User account data:
         totalCollateralBase: {totalCollateralBase}
         totalDebtBase: {totalDebtBase}
@@ -179,28 +280,9 @@ def run_script() -> [ABIContract, ABIContract, ABIContract, ABIContract]:
           """)
     print()
 
-    # Get list of Atokens
-    print("Scanning for WETH and USDC, make take a while...\n")
-    aave_protocol_data_provider = active_network.manifest_named("aave_protocol_data_provider")
-    a_tokens = aave_protocol_data_provider.getAllATokens() # give a list of tuples: [(token, address), (token, address)]
-    print()
-    #print("List Atokens:", a_tokens)
-
-    # Scanning for WETH and USDC
-    print("Atokens for WETH and USDC ....")
-    print("------------------------------")
-    for a_token in a_tokens:
-        if"WETH" in a_token[0]:
-            a_weth = active_network.manifest_named("usdc", address=a_token[1])
-        if"USDC" in a_token[0]:
-            a_usdc = active_network.manifest_named("usdc", address=a_token[1])
-    print("Atoken USDC:", a_usdc)
-    print("Atoken WETH:", a_weth)
-    print()
-
     # Check balance a_usdc & a_weth
-    a_usdc_balance = a_usdc.balanceOf(boa.env.eoa) # 6 decimals
-    a_weth_balance = a_weth.balanceOf(boa.env.eoa) # 18 decimals
+    a_usdc_balance = snapshot["a_usdc"] # 6 decimals
+    a_weth_balance = snapshot["a_weth"] # 18 decimals
 
     # Normalized the amounts
     a_usdc_balance_normalized = a_usdc_balance / int(1e6)  # 1000000
@@ -209,29 +291,43 @@ def run_script() -> [ABIContract, ABIContract, ABIContract, ABIContract]:
     print("aWETH balance:", a_weth_balance_normalized) # 1 ETH
 
     # Get Price for usdc and weth
-    usdc_price = get_price("usdc_usd")
-    weth_price = get_price("eth_usd")
+    prices = {feed_name: quote.price for feed_name, quote in quotes.items()}
+    usdc_price = prices["usdc_usd"]
+    weth_price = prices["eth_usd"]
     print("USDC price:", usdc_price) 
     print("WETH price:", weth_price) 
     print()
         
-    # Total value
-    usdc_value = a_usdc_balance_normalized * usdc_price
-    weth_value = a_weth_balance_normalized * weth_price
-    total_value = usdc_value + weth_value
-
     # Check Allocation
-    BUFFER = 0.1
-    target_usdc_value = 0.3
-    target_weth_value = 0.7
-
-    usdc_percent_allocation = usdc_value / total_value
-    weth_percent_allocation = weth_value / total_value
-
-    needs_rebalancing = (
-        abs(usdc_percent_allocation - target_usdc_value) > BUFFER
-        or abs(weth_percent_allocation - target_weth_value) > BUFFER                
-    )
+    with stage("plan"):
+        target_usdc_value = TARGET_ALLOCATIONS["usdc"]
+        target_weth_value = TARGET_ALLOCATIONS["weth"]
+
+        plan = plan_rebalance(
+            balances=[[a_usdc_balance_normalized, a_weth_balance_normalized]],
+            prices=[usdc_price, weth_price],
+            targets=[target_usdc_value, target_weth_value],
+            buffer=BUFFER,
+        )
+        usdc_percent_allocation, weth_percent_allocation = plan.allocations[0]
+        needs_rebalancing = bool(plan.needs_rebalancing[0])
+
+        # Wei-exact trades, only the drift is withdrawn, swapped and supplied
+        exact_trades = plan_rebalance_exact(
+            balances=[[a_usdc_balance, a_weth_balance]],
+            answers=[quotes[feed_name].answer for feed_name in feed_names],
+            answer_decimals=[quotes[feed_name].decimals for feed_name in feed_names],
+            token_decimals=[6, 18],
+            targets=[target_usdc_value, target_weth_value],
+        )
+        swap_leg = plan_swap_leg(exact_trades[0]) if needs_rebalancing else None
+        if swap_leg is not None and trade_scale != 1.0:
+            available = [a_usdc_balance, a_weth_balance][swap_leg.sell]
+            scaled_in = min(int(swap_leg.amount_in * trade_scale), available)
+            swap_leg = swap_leg._replace(
+                amount_in=scaled_in,
+                expected_out=swap_leg.expected_out * scaled_in // swap_leg.amount_in,
+            )
     print("Rebalancing needed:", needs_rebalancing)
     print(f"Current USDC % allocation, {usdc_percent_allocation * 100:.2f}%")
     print(f"Current WETH % allocation, {weth_percent_allocation * 100:.2f}%")
@@ -239,92 +335,113 @@ def run_script() -> [ABIContract, ABIContract, ABIContract, ABIContract]:
     print(f"Target allocation of USDC: {target_usdc_value * 100:.2f}%")
     print(f"Target allocation of WETH: {target_weth_value * 100:.2f}%")
     print()
+    allocations_before = {"usdc": float(usdc_percent_allocation), "weth": float(weth_percent_allocation)}
+
+    # Assets in the order of the plan columns
+    assets = [("usdc", usdc, a_usdc), ("weth", weth, a_weth)]
+    trades = {"sold": None, "amount_in": 0, "bought": None, "amount_out": 0}
+    route = None
+    execution = None
+
+    if swap_leg is None:
+        print("Portfolio within buffer, nothing to trade")
+        print()
+    else:
+        with ledger: # collects the logs of every transaction below
+            sell_name, token_in, a_token_in = assets[swap_leg.sell]
+            buy_name, token_out, _ = assets[swap_leg.buy]
+            print("Rebalancing Trades:")
+            print(f"{sell_name.upper()} to sell: {swap_leg.amount_in}")
+            print(f"{buy_name.upper()} to buy: {swap_leg.expected_out}")
+            print()
+
+            # Quote every fee tier and split, and the sizes of the impact curve, in one multicall, before anything is withdrawn
+            with stage("route"):
+                quoter = get_contract("uniswap_quoter")
+                slippage = float(os.environ.get(SLIPPAGE_ENV_VAR, DEFAULT_SLIPPAGE))
+                quotes = quote_tiers(quoter, token_in, token_out, swap_leg.amount_in, fee_tiers, extra_amounts=impact_amounts(swap_leg.amount_in))
+                route = best_route(quotes, swap_leg.amount_in, fee_tiers, slippage=slippage)
+                if route is None or route.quoted_out < swap_leg.expected_out * ORACLE_FLOOR:
+                    quoted = route.quoted_out if route else 0
+                    raise ValueError(f"Best route quotes {quoted} {buy_name.upper()}, under {ORACLE_FLOOR:.0%} of the oracle value {swap_leg.expected_out}")
+
+                # Large swaps are sliced over blocks when the impact saved pays for the extra swaps. Only arbitrage
+                # of a live network restores the pools between slices, nothing does on pyevm and forks
+                out_price, out_decimals = [(usdc_price, 6), (weth_price, 18)][swap_leg.buy]
+                slices = plan_slices(
+                    estimate_impact(quotes, fee_tiers),
+                    swap_leg.amount_in,
+                    gas_out=gas_cost_out(boa.env.get_gas_price(), weth_price, out_price, out_decimals),
+                    max_slices=1 if active_network.is_local_or_forked_network() else MAX_SLICES,
+                    interval=float(os.environ.get(SLICE_INTERVAL_ENV_VAR, SLICE_INTERVAL)),
+                )
+            for leg in route.legs:
+                print(f"Route: {leg.amount_in} through the {leg.fee / 10_000}% pool, quoted {leg.quoted_out}, min {leg.min_out}")
+            if len(slices.amounts) > 1:
+                print(f"Sliced in {len(slices.amounts)} swaps {slices.interval:g}s apart, expected {slices.expected_out} instead of {slices.single_out}")
+            print()
+
+            if rebalancer is not None and len(slices.amounts) == 1:
+                # Withdraw, swap and supply in one transaction, the rebalancer pulls only the overweight aTokens
+                with stage("rebalance"):
+                    print(f"Rebalancing through {rebalancer.address} in one transaction")
+                    amount_in, amount_out = rebalance_atomic(rebalancer, a_token_in, token_in, token_out, route, allowances)
+                    ledger.sync()
+            else:
+                # Withdraw only the overweight amount from Aave, the pool burns our aTokens without an allowance
+                with stage("withdraw"):
+                    amount_in = pool_contract.withdraw(token_in.address, swap_leg.amount_in, boa.env.eoa)
+                                                     #  asset             delta only          to
+                    ledger.sync()
+
+                # Print token balances, as booked from the withdraw logs
+                if not quiet:
+                    current = ledger.positions
+                    print(f"Withdrawing {sell_name.upper()} from Aave")
+                    print_usdc_weth_token_balances(current)
+                    print(f"aUSDC balance: {current['a_usdc']}")
+                    print(f"aWETH balance: {current['a_weth']}")
+                    print()
+
+                # Swap Tokens: sell the overweight asset & buy the underweight one, along the route
+                with stage("swap"):
+                    allowances.ensure(token_in, uniswap_swap_router, amount_in)
+
+                    print("Swap tokens!")
+                    if len(slices.amounts) == 1:
+                        execute_route(uniswap_swap_router, route, token_in, token_out, boa.env.eoa)
+                    else:
+                        execution = execute_slices(
+                            uniswap_swap_router, quoter, token_in, token_out, slices, boa.env.eoa, slippage, fee_tiers,
+                            oracle_out=swap_leg.expected_out,
+                            min_rate=ORACLE_FLOOR * swap_leg.expected_out / swap_leg.amount_in,
+                        )
+                        print("Execution:", execution.summary())
+                    allowances.spend(token_in, uniswap_swap_router, amount_in)
+                    legs = [swap_amounts(event, token_in, token_out) for event in ledger.sync() if event.kind == "swap"]
+                    amount_in, amount_out = sum(leg[0] for leg in legs), sum(leg[1] for leg in legs)
+
+                # Supply only the swap output back to Aave
+                with stage("redeposit"):
+                    deposit(pool_contract, token_out, amount_out, quiet=quiet, allowances=allowances)
+
+        trades = {"sold": sell_name, "amount_in": amount_in, "bought": buy_name, "amount_out": amount_out}
+
+    # Final snapshot, reconciled with the chain once: interest accrued since the
+    # snapshot is not in the logs
+    with stage("balances"):
+        differences = ledger.reconcile()
+    balances = ledger.positions
+    if not quiet:
+        for name, (booked, chain) in differences.items():
+            print(f"Ledger {name} off by {chain - booked} (booked {booked}, chain {chain})")
+        print_usdc_weth_token_balances(balances)
+        print(f"aUSDC balance: {balances['a_usdc']}")
+        print(f"aWETH balance: {balances['a_weth']}")
+        print()
     
-    # Withdrawing Weth from Aave
-    a_weth.approve(pool_contract.address, a_weth.balanceOf(boa.env.eoa))
-    pool_contract.withdraw(weth.address, a_weth.balanceOf(boa.env.eoa), boa.env.eoa)
-                          #  asset         whole amount                    to
-    
-    # Print token balances
-    print("Redrawing WETH from Aave")
-    print_usdc_weth_token_balances()
-    print(f"aUSDC balance: {a_usdc.balanceOf(boa.env.eoa)}")
-    print(f"aWETH balance: {a_weth.balanceOf(boa.env.eoa)}")
-    print()
-
-    # Rebalance Trades 
-    usdc_data = {"balance": a_usdc_balance_normalized, "price": usdc_price, "contract": usdc}
-    weth_data = {"balance": a_weth_balance_normalized, "price": weth_price, "contract": weth}
-    target_allocations = {"usdc": 0.3, "weth": 0.7}  
-    
-    trades = calculate_rebalancing_trades(usdc_data, weth_data, target_allocations)
-    print("Rebalancing Trades:")
-    #for k, v in trades.items():
-    #    print(f"{k}: {v}")
-    #print()
-
-    usdc_to_buy = trades["usdc"]["trade"]
-    weth_to_sell = trades["weth"]["trade"]
-    print("USDC to buy:", usdc_to_buy)
-    print("WETH to sell:", weth_to_sell)
-    print()
-
-    # Uniswap 
-#    struct ExactInputSingleParams {
-#        address tokenIn;             # what are we selling
-#        address tokenOut;            # what are we buying
-#        uint24 fee;                  # fee structure
-#        address recipient;           # us
-#        uint256 amountIn;            # how much are we sending
-#        uint256 amountOutMinimum;    # minimum % to get
-#        uint160 sqrtPriceLimitX96;   # price optimatisation
-#    }
-
-    # Swap Tokens: sell weth & buy usdc
-    uniswap_swap_router = active_network.manifest_named("uniswap_swap_router")
-
-    amount_weth = abs(int(weth_to_sell * (10 ** 18)))
-    weth.approve(uniswap_swap_router.address, amount_weth)
-    min_out = int((trades["usdc"]["trade"] * (10 ** 6)) * 0.90) # minimum 90% to get
-
-    print("Swap tokens!")
-    uniswap_swap_router.exactInputSingle(
-        (
-            weth.address,  # what are we selling
-            usdc.address,  # what are we buying
-            3000,          # fee structure, 3000 stand for 3% fee pool
-            boa.env.eoa,   # us
-            amount_weth,   # how much are we sending
-            min_out,       # minimum % to getting back
-            0              # price optimatisation         
-        )        
-    )
-
-    # Print token balances    
-    print_usdc_weth_token_balances()
-    print(f"aUSDC balance: {a_usdc.balanceOf(boa.env.eoa)}")
-    print(f"aWETH balance: {a_weth.balanceOf(boa.env.eoa)}")
-    print()
-
-
-    # Finish Rebalance Portfolio back in Aave
-    usdc_balance = usdc.balanceOf(boa.env.eoa)
-    weth_balance = weth.balanceOf(boa.env.eoa)
-
-    if usdc_balance > 0:
-        deposit(pool_contract, usdc, usdc_balance)
-
-    if weth_balance > 0:
-        deposit(pool_contract, weth, weth_balance)
-
-    # Print token balances
-    print_usdc_weth_token_balances()
-    print(f"aUSDC balance: {a_usdc.balanceOf(boa.env.eoa)}")
-    print(f"aWETH balance: {a_weth.balanceOf(boa.env.eoa)}")
-    print()
-    
-    a_usdc_balance = a_usdc.balanceOf(boa.env.eoa)
-    a_weth_balance = a_weth.balanceOf(boa.env.eoa)
+    a_usdc_balance = balances["a_usdc"]
+    a_weth_balance = balances["a_weth"]
 
     a_usdc_balance_normalized = a_usdc_balance / int(1e6)  
     a_weth_balance_normalized = a_weth_balance / int(1e18)
@@ -339,11 +456,48 @@ def run_script() -> [ABIContract, ABIContract, ABIContract, ABIContract]:
     print(f"Current percent allocation of USDC: {usdc_percent_allocation * 100:.2f}%")
     print(f"Current percent allocation of WETH: {weth_percent_allocation * 100:.2f}%")
     print()
-    
-    return usdc, weth, a_usdc, a_weth
+
+    result = {
+        "network": active_network.name,
+        "account": str(boa.env.eoa),
+        "prices": prices,
+        "needs_rebalancing": needs_rebalancing,
+        "balances_before": {name: snapshot[name] for name in all_tokens},
+        "allocations_before": allocations_before,
+        "trades": trades,
+        "route": [leg._asdict() for leg in route.legs] if route else [],
+        "execution": execution.summary() if execution else None,
+        "balances_after": balances,
+        "allocations_after": {"usdc": usdc_percent_allocation, "weth": weth_percent_allocation},
+    }
+    return (usdc, weth, a_usdc, a_weth), result
+
+
+def run_script(quiet: bool = False, journal: RunJournal | None = None) -> [ABIContract, ABIContract, ABIContract, ABIContract]:
+    """
+    1. Give ourselves some ETH
+    2. Give ourselves some USDC and WETH
+    3. Deposit into Aave, withdraw only the overweight delta, swap it, supply the swap output
+
+    Args:
+        quiet: Skip diagnostic chain reads and all prints, emit one JSON result instead
+        journal: Where the run is recorded, get_journal() if None (live networks, or $MOX_REBALANCE_JOURNAL)
+    """
+    journal = journal or get_journal()
+    with record_activity() as activity:
+        if not quiet:
+            contracts, result = _run_rebalance()
+        else:
+            with redirect_stdout(io.StringIO()):
+                contracts, result = _run_rebalance(quiet=True)
+    if journal is not None:
+        journal.record(journal_entry(result, activity, JOURNAL_ASSETS))
+    if quiet:
+        print(json.dumps(result))
+    return contracts
 
     
 def moccasin_main():
-    run_script()
+    with instrument_from_env(), profile_from_env(): # set $MOX_REBALANCE_INSTRUMENT to time each stage, $MOX_REBALANCE_PROFILE for its gas
+        run_script(quiet=bool(os.environ.get(QUIET_ENV_VAR)))
 
-    
\ No newline at end of file
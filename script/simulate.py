@@ -0,0 +1,30 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from script._routing import FEE_TIERS
+from script._simulation import SimulationReport, format_table, run_scenarios, scenario_matrix
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+PRICE_SHOCKS = (0.8, 0.9, 1.0, 1.1, 1.2)  # ETH/USD answer multipliers
+FEE_TIER_SETS = (FEE_TIERS, (500,), (3000,))
+TRADE_SCALES = (0.5, 1.0, 2.0)
+
+
+# ------------------------------------------------------------------
+#                       RUN SCRIPT FUNCTION
+# ------------------------------------------------------------------
+def run_script(workers: int | None = None) -> list[SimulationReport]:
+    """
+    Dry-run the rebalance over every (price shock, fee tiers, trade size) of the
+    matrix, nothing is broadcast, e.g. `mox run simulate --network eth-forked`.
+    """
+    reports = run_scenarios(scenario_matrix(PRICE_SHOCKS, FEE_TIER_SETS, TRADE_SCALES), workers=workers)
+    print(format_table(reports))
+    return reports
+
+
+def moccasin_main():
+    run_script()
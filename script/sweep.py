@@ -0,0 +1,37 @@
+# ------------------------------------------------------------------
+#                         IMPORT LIBRARIES
+# ------------------------------------------------------------------
+from script._backtest import load_history
+from script._contract_registry import get_contract
+from script._sweep import format_table, grid, pool_liquidity_usd, run_sweep
+from script.backtest import BACKTEST_ROUNDS
+
+
+# ------------------------------------------------------------------
+#                            VARIABLES
+# ------------------------------------------------------------------
+BUFFERS = (0.02, 0.05, 0.1, 0.15, 0.2, 0.3)
+USDC_TARGETS = (0.1, 0.2, 0.3, 0.4, 0.5)
+MIN_OUTS = (0.9, 0.95, 0.99)
+
+
+# ------------------------------------------------------------------
+#                       RUN SCRIPT FUNCTION
+# ------------------------------------------------------------------
+def run_script(rounds: int = BACKTEST_ROUNDS, workers: int | None = None) -> list[dict]:
+    """
+    Rank every (buffer, targets, fee tier, min-out) of the grid by backtest PnL
+    over the history of the active network, e.g. `mox run sweep --network eth-forked`.
+    Each fee tier is costed with the liquidity of its WETH/USDC pool, measured
+    through the quoter; tiers without a pool are left out.
+    """
+    timestamps, prices, rates = load_history(rounds=rounds)
+    liquidity_usd = pool_liquidity_usd(get_contract("uniswap_quoter"), get_contract("weth"), get_contract("usdc"), prices[-1, 1])
+    params = grid(BUFFERS, USDC_TARGETS, tuple(liquidity_usd), MIN_OUTS)
+    rows = run_sweep(timestamps, prices, params, rates=rates, liquidity_usd=liquidity_usd, workers=workers)
+    print(format_table(rows))
+    return rows
+
+
+def moccasin_main():
+    run_script()
@@ -1,11 +1,88 @@
+import boa
 import pytest
+from boa.rpc import EthereumRPC
+from script._contract_registry import get_contract
+from script._multi_account import get_market
+from script._rpc_replay import resolve_block, serve_block
 from script._setup_script import setup_script
 from script.rebalance_portfolio import run_script
-from moccasin.config import get_active_network
+from moccasin._sys_path_and_config_setup import _setup_network_and_account_from_config_and_cli
+from moccasin.config import get_active_network, get_or_initialize_config
+import os
 
-@pytest.fixture(scope="function")
+
+# The titanoboa pytest plugin snapshots the EVM state (boa.env.anchor) when a
+# fixture is set up and reverts to it when the fixture is torn down, and it
+# wraps every test in its own anchor. Session-scoped fixtures therefore run
+# the expensive fork setup once, and every test starts from that snapshot.
+#
+# Snapshots stack: a session fixture builds on the state left by the session
+# fixtures created before it. Tests are ordered by the deepest state layer
+# they use, so tests needing only `setup` never see the `rebalance_contracts`
+# state and tests using neither see a clean fork.
+STATE_LAYERS = {
+    "setup": 1,
+    "rebalance_contracts": 2,
+}
+
+
+def pytest_collection_modifyitems(config, items):
+    def state_layer(item):
+        return max((STATE_LAYERS.get(name, 0) for name in item.fixturenames), default=0)
+
+    items.sort(key=state_layer)  # stable sort, keeps file order inside a layer
+
+
+# Parallel runs use pytest-xdist: `mox test -n 4 --network eth-forked`.
+#
+# moccasin activates the network in the controlling process only, so each
+# worker activates the controller's network itself and forks in-process: the
+# EVM state (minted balances, deposits, swaps) is never shared between workers.
+# Every fork is pinned to the same block and reads it through one local
+# JSON-RPC server run by the controller on the on-disk store of that block
+# (script._rpc_replay): the server is its only writer, state fetched for one
+# worker is read from disk by the others, and later runs are served from disk.
+# $MOX_REBALANCE_FORK_BLOCK pins the block, reusing a store already warmed by
+# an earlier run or by `python -m script._rpc_replay record`.
+FORK_BLOCK_ENV_VAR = "MOX_REBALANCE_FORK_BLOCK"
+
+
+def pytest_configure(config):
+    if hasattr(config, "workerinput"):
+        get_or_initialize_config()
+        _setup_network_and_account_from_config_and_cli(
+            network=config.workerinput["mox_network"],
+            url=config.workerinput["mox_fork_url"],
+        )
+    elif config.getoption("dist", "no") != "no":
+        config.mox_workerinput = _share_network(config)
+
+
+def _share_network(config) -> dict:
+    network = get_active_network()
+    shared = {"mox_network": network.name, "mox_fork_url": None}
+    if network.is_fork and network.url:
+        block = resolve_block(network.url, os.environ.get(FORK_BLOCK_ENV_VAR) or network.block_identifier)
+        config.mox_fork_server = serve_block(block, EthereumRPC(network.url))
+        shared["mox_fork_url"] = "http://{}:{}".format(*config.mox_fork_server.server_address[:2])
+    return shared
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    """Hand the controller's network to an xdist worker."""
+    node.workerinput.update(node.config.mox_workerinput)
+
+
+def pytest_unconfigure(config):
+    server = getattr(config, "mox_fork_server", None)
+    if server is not None:
+        server.shutdown()
+
+
+@pytest.fixture(scope="session")
 def setup():
-    """Run setup script and return contracts."""
+    """Run setup script once and return contracts."""
     return setup_script()
 
 @pytest.fixture(scope="session")
@@ -13,28 +90,53 @@ def active_network():
     """Get the active network configuration."""
     return get_active_network()
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def contracts(active_network):
     """Get USDC and WETH contracts."""
-    usdc = active_network.manifest_named("usdc")
-    weth = active_network.manifest_named("weth")
+    usdc = get_contract("usdc")
+    weth = get_contract("weth")
     return usdc, weth
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def aave_contracts(active_network):
     """Get Aave pool and related contracts."""
-    pool_address_provider = active_network.manifest_named("aavev3_pool_address_provider")
+    pool_address_provider = get_contract("aavev3_pool_address_provider")
     pool_address = pool_address_provider.getPool()
-    pool_contract = active_network.manifest_named("pool", address=pool_address)
+    pool_contract = get_contract("pool", address=pool_address)
     return pool_contract, pool_address_provider
 
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def rebalance_contracts(active_network):
-    """Run rebalance script and return all 4 contracts: usdc, weth, a_usdc, a_weth."""
+    """Run rebalance script once and return all 4 contracts: usdc, weth, a_usdc, a_weth."""
     if active_network.is_local_or_forked_network():
         return run_script()
     return None, None, None, None
 
-   
\ No newline at end of file
+
+@pytest.fixture
+def accounts(active_network, setup):
+    """Three Aave positions: WETH heavy, USDC heavy and already at the targets."""
+    if not active_network.is_local_or_forked_network():
+        pytest.skip("accounts are funded and impersonated")
+    usdc, weth = setup
+    market = get_market()
+    eth_price = market.feeds[1].latestAnswer() / 10 ** market.feeds[1].decimals()
+    positions = [(100 * 10 ** 6, 10 ** 18), (3000 * 10 ** 6, 10 ** 16), (300 * 10 ** 6, int(700 / eth_price * 10 ** 18))]
+
+    addresses = []
+    for i, (usdc_amount, weth_amount) in enumerate(positions):
+        account = boa.env.generate_address(f"managed_{i}")
+        with boa.env.prank(usdc.owner()):
+            usdc.updateMasterMinter(account)
+        boa.env.set_balance(account, weth_amount)
+        with boa.env.prank(account):
+            usdc.configureMinter(account, usdc_amount)
+            usdc.mint(account, usdc_amount)
+            weth.deposit(value=weth_amount)
+            for token, amount in ((usdc, usdc_amount), (weth, weth_amount)):
+                token.approve(market.pool.address, amount)
+                market.pool.supply(token.address, amount, account, 0)
+        addresses.append(str(account))
+    return market, addresses
@@ -0,0 +1,63 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+from script._allowances import APPROVE_POLICY_ENV_VAR, MAX_UINT256, AllowanceManager, approve_max_from_env
+from script._instrumentation import instrument
+from script.rebalance_portfolio import run_script
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_approve_max_once_then_no_transaction(setup):
+    """Verify the max policy approves a spender once and then only uses the cache."""
+    usdc, weth = setup
+    spender = boa.env.generate_address("spender")
+    allowances = AllowanceManager(approve_max=True)
+    allowances.prefetch([(weth, spender)])
+
+    with instrument() as instrumentation:
+        assert allowances.ensure(weth, spender, 10 ** 18) is True
+        assert allowances.ensure(weth, spender, 10 ** 18) is False
+        allowances.spend(weth, spender, 10 ** 18)
+        assert allowances.ensure(weth, spender, 10 ** 18) is False
+
+    assert weth.allowance(boa.env.eoa, spender) == MAX_UINT256
+    assert instrumentation.totals().transactions == 1
+    assert instrumentation.totals().eth_calls == 0
+
+
+def test_exact_policy_sums_requirements_of_one_spender(setup):
+    """Verify approve_all approves the total of several transfers and skips covered pairs."""
+    usdc, weth = setup
+    spender = boa.env.generate_address("spender")
+    usdc.approve(spender, 5)
+    allowances = AllowanceManager(approve_max=False)
+
+    sent = allowances.approve_all([(weth, spender, 2), (weth, spender, 3), (usdc, spender, 5), (usdc, spender, 0)])
+
+    assert sent == 1
+    assert weth.allowance(boa.env.eoa, spender) == 5
+    allowances.spend(weth, spender, 2)
+    assert allowances.allowance(weth, spender) == 3
+
+
+def test_approvals_are_exact_unless_max_is_opted_in(monkeypatch):
+    """Verify the default policy is exact and only MOX_REBALANCE_APPROVE=max approves max_value(uint256)."""
+    monkeypatch.delenv(APPROVE_POLICY_ENV_VAR, raising=False)
+    assert approve_max_from_env() is False and AllowanceManager().approve_max is False
+    monkeypatch.setenv(APPROVE_POLICY_ENV_VAR, "MAX")
+    assert approve_max_from_env() is True
+
+
+def test_steady_state_rebalance_sends_no_approve(active_network, monkeypatch):
+    """Verify with max approvals a second run finds them on chain and approves nothing."""
+    monkeypatch.setenv(APPROVE_POLICY_ENV_VAR, "max")
+    if active_network.is_local_or_forked_network():
+        run_script(quiet=True)
+        with instrument() as instrumentation:
+            run_script(quiet=True)
+
+        assert instrumentation.stages["approvals"].transactions == 0
+        assert instrumentation.stages["rebalance"].transactions == 1  # withdraw, swap and supply, aToken already approved
@@ -0,0 +1,133 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import numpy as np
+import pytest
+from script._backtest import CostModel, growth_factors, run_backtest
+from script._history import HistoryStore, align, iter_rounds, price_series
+from script._instrumentation import instrument
+from script._rebalance_engine import plan_rebalance
+from script import backtest
+
+DAY = 24 * 60 * 60
+
+
+def _reference_backtest(prices, targets, buffer, costs, initial_value):
+    """Tick by tick loop of the same rule, to check the vectorized evaluation."""
+    holdings = initial_value * targets / prices[0]
+    values, count = [], 0
+    for price in prices:
+        plan = plan_rebalance([holdings], price, targets, buffer)
+        if plan.needs_rebalancing[0] and values:
+            trades_usd = plan.trades_usd[0]
+            cost = float(costs.cost(-trades_usd[trades_usd < 0].sum()))
+            bought = np.clip(trades_usd, 0, None)
+            holdings = (plan.values[0] + trades_usd - cost * bought / bought.sum()) / price
+            count += 1
+        values.append((holdings * price).sum())
+    return np.asarray(values), count
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_constant_prices_never_rebalance():
+    """Verify a flat history has no trade and no PnL."""
+    timestamps = np.arange(100) * DAY
+    prices = np.tile([1.0, 3500.0], (100, 1))
+    result = run_backtest(timestamps, prices, targets=[0.3, 0.7], buffer=0.1)
+
+    assert result.rebalance_count == 0
+    assert result.pnl == pytest.approx(0)
+    assert result.turnover == 0
+
+
+def test_price_jump_rebalances_once_and_pays_costs():
+    """Verify a jump past the buffer triggers one rebalance back to the targets, minus costs."""
+    timestamps = np.arange(4) * DAY
+    prices = np.array([[1.0, 1000.0], [1.0, 1000.0], [1.0, 3000.0], [1.0, 3000.0]])
+    costs = CostModel(fee=0.01, slippage=0, liquidity_usd=np.inf)
+    result = run_backtest(timestamps, prices, targets=[0.5, 0.5], buffer=0.1, costs=costs, initial_value=1000)
+
+    # 500 USDC + 0.5 WETH worth 1500 -> sell 500 USD of WETH, pay 5
+    assert list(result.rebalance_ticks) == [2]
+    assert result.traded_usd[0] == pytest.approx(500)
+    assert result.costs_usd[0] == pytest.approx(5)
+    assert result.values[-1] == pytest.approx(1995)
+    assert result.hold_values[-1] == pytest.approx(2000)
+    assert result.turnover == pytest.approx(0.5)
+
+
+def test_vectorized_backtest_matches_tick_by_tick_loop():
+    """Verify the segment evaluation gives the same path as a per tick loop."""
+    rng = np.random.default_rng(0)
+    eth = 3000 * np.exp(np.cumsum(rng.normal(0, 0.03, 2000)))
+    prices = np.column_stack([np.ones_like(eth), eth])
+    targets = np.array([0.3, 0.7])
+    costs = CostModel()
+
+    result = run_backtest(np.arange(2000) * DAY, prices, targets, buffer=0.05, costs=costs, initial_value=10_000)
+    values, count = _reference_backtest(prices, targets, 0.05, costs, 10_000)
+
+    assert result.rebalance_count == count > 0
+    np.testing.assert_allclose(result.values, values)
+
+
+def test_growth_factors_accrue_supply_rate():
+    """Verify a 3% rate held for a year grows aTokens by 3% with linear accrual per tick."""
+    timestamps = np.array([0, 365 * DAY])
+    growth = growth_factors(timestamps, np.array([[0.03, 0.0], [0.05, 0.0]]))
+
+    np.testing.assert_allclose(growth, [[1, 1], [1.03, 1]])
+
+
+def test_align_forward_fills():
+    """Verify a series is sampled as its last value at or before each timestamp."""
+    values = align(np.array([0, 5, 10, 15]), np.array([5, 10]), np.array([1.0, 2.0]))
+
+    np.testing.assert_allclose(values, [1.0, 1.0, 2.0, 2.0])
+
+
+def test_iter_rounds_caches_rounds(active_network, tmp_path):
+    """Verify rounds stream oldest first and are served from the store on the second pass."""
+    if active_network.name != "pyevm":
+        pytest.skip("writes rounds to the mock price feed")
+    eth_usd = active_network.manifest_named("eth_usd")
+    start = eth_usd.latestRoundData()[3]
+    for round_id, answer in ((2, 3000), (3, 0), (4, 3100)):  # round 3 is invalid, dropped
+        eth_usd.updateRoundData(round_id, answer * 10 ** 8, start + round_id * DAY, start + round_id * DAY)
+    store = HistoryStore(tmp_path / "history.sqlite")
+
+    rounds = list(iter_rounds(eth_usd, first_round=1, store=store, batch_size=2))
+    with instrument() as instrumentation:
+        cached = list(iter_rounds(eth_usd, first_round=1, last_round=4, store=store))
+
+    assert [r.round_id for r in rounds] == [1, 2, 3, 4]
+    assert cached == rounds
+    assert instrumentation.totals().eth_calls == 0
+    timestamps, prices = price_series(rounds, decimals=8)
+    assert list(prices) == [3500, 3000, 3100]
+    assert list(np.diff(timestamps)) == [2 * DAY, 2 * DAY]
+
+
+def test_backtest_script_runs_on_active_network(active_network):
+    """Verify the backtest script loads the history of the network and reports."""
+    if active_network.name != "pyevm":
+        pytest.skip("reads thousands of rounds on forks")
+    summary = backtest.run_script(rounds=10)
+
+    assert summary["rebalance_count"] == 0
+    assert summary["initial_value"] == pytest.approx(10_000)
+
+
+def test_min_out_tolerance_blocks_costly_swaps():
+    """Verify swaps losing more than the min-out tolerance revert and are retried on later ticks."""
+    timestamps = np.arange(4) * DAY
+    prices = np.array([[1.0, 1000.0], [1.0, 3000.0], [1.0, 3000.0], [1.0, 3000.0]])
+    costs = CostModel(fee=0.05, slippage=0, liquidity_usd=np.inf)
+
+    blocked = run_backtest(timestamps, prices, targets=[0.5, 0.5], buffer=0.1, costs=costs, min_out=0.97)
+    allowed = run_backtest(timestamps, prices, targets=[0.5, 0.5], buffer=0.1, costs=costs, min_out=0.9)
+
+    assert (blocked.rebalance_count, list(blocked.failed_ticks)) == (0, [1, 2, 3])
+    assert (allowed.rebalance_count, len(allowed.failed_ticks)) == (1, 0)
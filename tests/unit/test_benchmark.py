@@ -0,0 +1,69 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import pytest
+from script._benchmark import bench_pipeline, bench_trade_math, compare, main, save, without_timings
+from script.rebalance_portfolio import get_token_balances
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def _result(**metrics):
+    return {"meta": {}, "metrics": metrics}
+
+
+def test_compare_flags_counts_exactly_and_timings_past_both_limits(tmp_path):
+    """Verify any count increase is a regression, timings only past both limits and never against a counts-only baseline."""
+    baseline = _result(**{"macro/rebalance/transactions": 1, "macro/rebalance/seconds": 0.010, "macro/run/seconds": 0.5})
+    noisy = _result(**{"macro/rebalance/transactions": 1, "macro/rebalance/seconds": 0.014, "macro/run/seconds": 0.6, "macro/new/seconds": 9})
+    slower = _result(**{"macro/rebalance/transactions": 2, "macro/rebalance/seconds": 0.010, "macro/run/seconds": 1.0})
+
+    assert compare(noisy, baseline) == []
+    assert [r.metric for r in compare(slower, baseline)] == ["macro/rebalance/transactions", "macro/run/seconds"]
+    assert compare(slower, baseline)[0].change == 1.0
+
+    save(baseline, tmp_path / "baseline.json")
+    save(slower, tmp_path / "latest.json")
+    assert main(["check", str(tmp_path / "latest.json"), str(tmp_path / "baseline.json")]) == 1
+    assert main(["check", str(tmp_path / "baseline.json"), str(tmp_path / "baseline.json")]) == 0
+    assert [r.metric for r in compare(slower, without_timings(baseline))] == ["macro/rebalance/transactions"]
+
+
+def test_bench_trade_math_times_every_size():
+    """Verify the micro-benchmarks cover both engines per size, and the per-portfolio wrapper up to its cap."""
+    metrics = bench_trade_math(sizes=(1, 10), repeats=2)
+
+    assert set(metrics) == {
+        f"micro/{name}/{size}/seconds"
+        for name in ("plan_rebalance", "plan_rebalance_exact", "calculate_rebalancing_trades")
+        for size in (1, 10)
+    }
+    assert all(seconds > 0 for seconds in metrics.values())
+
+
+def test_bench_pipeline_counts_stages_without_changing_state(active_network, setup):
+    """Verify the macro-benchmark reports counts per stage and reverts every run."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    usdc, weth = setup
+    before = get_token_balances({"usdc": usdc, "weth": weth})
+
+    metrics = bench_pipeline(repeats=1)
+
+    assert metrics["macro/rebalance/transactions"] == 2  # aToken approval, reverted after every run, and the rebalance
+    assert metrics["macro/total/transactions"] >= metrics["macro/rebalance/transactions"]
+    assert metrics["macro/total/gas_used"] > 0
+    assert metrics["macro/run/seconds"] > 0
+    assert get_token_balances({"usdc": usdc, "weth": weth}) == before
+
+
+def test_bench_pipeline_without_rebalancer_uses_its_own_prefix(active_network, setup):
+    """Verify the separate-transaction pipeline is benchmarked under macro_separate/."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+
+    metrics = bench_pipeline(repeats=1, atomic=False)
+
+    assert all(metric.startswith("macro_separate/") for metric in metrics)
+    assert metrics["macro_separate/total/transactions"] > 2  # withdraw, swap and supply each on their own
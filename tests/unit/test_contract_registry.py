@@ -0,0 +1,48 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import json
+import os
+from script._contract_registry import ContractRegistry
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_registry_hands_out_one_contract_per_name_and_address(active_network, setup, tmp_path):
+    """Verify lookups reuse one ABIContract and fall back to manifest_named without an address."""
+    usdc, _ = setup
+    registry = ContractRegistry(active_network, cache_dir=tmp_path)
+    pool_address = registry.get("aavev3_pool_address_provider").getPool()
+
+    pool = registry.get("pool", address=pool_address)
+    assert registry.get("pool", address=str(pool_address).lower()) is pool
+    assert pool.getReserveData(usdc.address) == active_network.manifest_named("pool", address=pool_address).getReserveData(usdc.address)
+    assert registry.get("usdc").address == usdc.address
+
+
+def test_parsed_abi_is_cached_by_file_stat(active_network, tmp_path):
+    """Verify the parsed ABI is written once and read back by a new registry."""
+    ContractRegistry(active_network, cache_dir=tmp_path).abi("abis/weth.json")
+    (cache,) = (tmp_path / "abis").iterdir()
+
+    with open("abis/weth.json") as f:
+        expected = json.load(f)
+    assert cache.name.startswith("weth_")
+    assert ContractRegistry(active_network, cache_dir=tmp_path).abi("abis/weth.json") == expected
+    assert ContractRegistry(active_network, cache_dir=tmp_path, persist=False).abi("abis/weth.json") == expected
+
+
+def test_warm_abi_cache_skips_reading_the_json(active_network, tmp_path):
+    """Verify a cached ABI is found from the file's mtime and size, and a changed file is parsed again."""
+    abi_file = tmp_path / "token.json"
+    abi_file.write_text(json.dumps([{"type": "fallback"}]))
+    ContractRegistry(active_network, cache_dir=tmp_path).abi(str(abi_file))
+    stat = abi_file.stat()
+
+    abi_file.write_text(json.dumps([{"type": "fallbacc"}]))  # same size and mtime: not read again
+    os.utime(abi_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert ContractRegistry(active_network, cache_dir=tmp_path).abi(str(abi_file)) == [{"type": "fallback"}]
+
+    os.utime(abi_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert ContractRegistry(active_network, cache_dir=tmp_path).abi(str(abi_file)) == [{"type": "fallbacc"}]
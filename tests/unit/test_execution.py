@@ -0,0 +1,79 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import math
+import pytest
+from script._contract_registry import get_contract
+from script._execution import ImpactCurve, estimate_impact, execute_slices, impact_amounts, plan_slices
+from script._routing import quote_amounts, quote_tiers
+
+RESERVE_IN, RESERVE_OUT, FEE = 1_000 * 10 ** 18, 3_500_000 * 10 ** 6, 0.003
+
+
+def _constant_product(amount_in: int) -> int:
+    after_fee = amount_in * (1 - FEE)
+    return int(RESERVE_OUT * after_fee / (RESERVE_IN + after_fee))
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_estimate_impact_recovers_pool_depth():
+    """Verify the fitted curve is the constant-product pool that produced the quotes."""
+    amount = 100 * 10 ** 18
+    quotes = {(3000, x): _constant_product(x) for x in quote_amounts(amount) | impact_amounts(amount)}
+    quotes[(500, amount)] = None  # missing pool
+
+    curves = estimate_impact(quotes)
+    curve = curves[3000]
+
+    assert list(curves) == [3000]
+    assert curve.depth == pytest.approx(RESERVE_IN / (1 - FEE), rel=1e-6)
+    assert curve.spot_rate == pytest.approx(RESERVE_OUT * (1 - FEE) / RESERVE_IN, rel=1e-6)
+    assert curve.amount_out(amount) == pytest.approx(_constant_product(amount), rel=1e-6)
+    assert math.isinf(estimate_impact({(500, 1): 2, (500, 10): 20})[500].depth)
+    assert estimate_impact({(500, 10): None}) == {}
+
+
+def test_plan_slices_grow_with_trade_size_and_shrink_with_gas():
+    """Verify large trades are sliced when it pays, small trades and expensive swaps are not."""
+    deep = ImpactCurve(spot_rate=3.5e-9 * 0.997, depth=10_000e18)
+    shallow = ImpactCurve(spot_rate=3.5e-9 * 0.9999, depth=10e18)  # cheaper fee, no depth
+    curves = {3000: deep, 100: shallow}
+
+    large = plan_slices(curves, 200 * 10 ** 18)
+    small = plan_slices(curves, 10 ** 18)
+    costly = plan_slices(curves, 200 * 10 ** 18, gas_out=1e12)  # a million USDC per swap
+
+    assert len(large.amounts) > 1 and sum(large.amounts) == 200 * 10 ** 18
+    assert large.expected_out > large.single_out
+    assert len(small.amounts) == 1 and small.expected_out == small.single_out
+    assert len(costly.amounts) == 1
+
+
+def test_execute_slices_quotes_each_slice_and_reports(active_network, setup):
+    """Verify every slice is re-routed and filled at least at its min-out, waiting between slices."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock pools only")
+    usdc, weth = setup
+    quoter, router = get_contract("uniswap_quoter"), get_contract("uniswap_swap_router")
+    amount = 40 * 10 ** 18
+    weth.deposit(value=amount)
+    weth.approve(router.address, amount)
+    curves = estimate_impact(quote_tiers(quoter, weth, usdc, amount, extra_amounts=impact_amounts(amount)))
+    plan = plan_slices(curves, amount, max_slices=4, min_gain=0)
+    waits = []
+
+    with boa.env.anchor():
+        report = execute_slices(router, quoter, weth, usdc, plan, boa.env.eoa, oracle_out=amount * 3500 // 10 ** 12, wait=waits.append)
+
+    assert len(report.fills) == 4 and report.amount_in == amount
+    assert waits == [plan.interval] * 3
+    assert all(fill.amount_out == fill.quoted_out >= fill.min_out for fill in report.fills)
+    summary = report.summary()
+    assert summary["amount_out"] == report.amount_out
+    assert summary["realized_cost_bps"] > summary["expected_cost_bps"]  # mock pools are not restored by arbitrage
+
+    with boa.env.anchor(), pytest.raises(ValueError, match="under the floor"):
+        execute_slices(router, quoter, weth, usdc, plan, boa.env.eoa, min_rate=curves[500].spot_rate * 2, wait=waits.append)
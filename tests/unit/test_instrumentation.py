@@ -0,0 +1,91 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import json
+import time
+import boa
+from script import _instrumentation
+from script._events import LocalLogSource
+from script._instrumentation import instrument, stage
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_stage_is_shared_no_op_when_disabled():
+    """Verify spans cost nothing and record nothing without instrument()."""
+    assert stage("swap") is stage("withdraw")
+    with stage("swap"):
+        pass
+    assert _instrumentation._active is None
+
+
+def test_instrument_counts_calls_and_transactions_per_stage(setup):
+    """Verify reads and transactions are attributed to the innermost open stage."""
+    usdc, weth = setup
+    with instrument() as instrumentation:
+        with stage("reads"):
+            usdc.balanceOf(boa.env.eoa)
+            weth.balanceOf(boa.env.eoa)
+        with stage("writes"):
+            weth.approve(usdc.address, 1)
+
+    reads, writes = instrumentation.stages["reads"], instrumentation.stages["writes"]
+    assert (reads.eth_calls, reads.transactions, reads.gas_used) == (2, 0, 0)
+    assert (writes.eth_calls, writes.transactions) == (0, 1)
+    assert writes.gas_used > 0
+    assert instrumentation.totals().eth_calls == 2
+
+
+def test_instrument_restores_environment(setup):
+    """Verify hooks are removed once the block exits."""
+    execute_code = boa.env.execute_code
+    with instrument():
+        assert boa.env.execute_code != execute_code
+    assert boa.env.execute_code == execute_code
+    assert _instrumentation._active is None
+
+
+
+def test_hooks_closed_out_of_order_leave_environment_clean(setup):
+    """Verify listeners closed out of order keep dispatching and leave no stale wrapper."""
+    usdc, weth = setup
+    execute_code = boa.env.execute_code
+    logs = LocalLogSource()
+    with instrument() as instrumentation:
+        logs.start()
+    weth.approve(usdc.address, 1)
+    assert len(logs.poll()[1]) == 1  # still collected once instrument() unhooked
+    assert instrumentation.totals().transactions == 0
+    logs.stop()
+    assert boa.env.execute_code == execute_code
+    assert "execute_code" not in vars(boa.env)
+
+def test_instrument_exports_json_and_summary(tmp_path):
+    """Verify stats export as JSON and as a table with a total row."""
+    with instrument() as instrumentation:
+        with stage("plan"):
+            pass
+
+    path = tmp_path / "stats.json"
+    instrumentation.to_json(path)
+    data = json.loads(path.read_text())
+
+    assert [s["name"] for s in data["stages"]] == ["plan"]
+    assert data["total"]["transactions"] == 0
+    assert "plan" in instrumentation.summary()
+    assert instrumentation.summary().splitlines()[-1].startswith("total")
+
+
+def test_totals_count_nested_seconds_once():
+    """Verify the total time is that of the top level spans, nested spans being inside them."""
+    with instrument() as instrumentation:
+        with stage("run"):
+            with stage("swap"):
+                time.sleep(0.02)
+        with stage("report"):
+            pass
+
+    stages = instrumentation.stages
+    assert stages["swap"].seconds >= 0.02
+    assert instrumentation.totals().seconds == stages["run"].seconds + stages["report"].seconds
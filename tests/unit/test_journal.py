@@ -0,0 +1,91 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import csv
+import pytest
+from script._journal import SECONDS_PER_DAY, JournalEntry, RunJournal
+from script.rebalance_portfolio import run_script
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+Q1_2025 = 1_735_689_600  # 2025-01-01 00:00 UTC
+
+
+def _entry(account="0xAA", timestamp=Q1_2025, block=100, sold="weth", gas_used=200_000, cost=1.5):
+    return JournalEntry(
+        chain_id=1, network="mainnet", account=account, block=block, timestamp=timestamp,
+        needs_rebalancing=sold is not None, sold=sold, bought="usdc" if sold else None,
+        amount_in=10 ** 17 if sold else 0, amount_out=350 * 10 ** 6 if sold else 0,
+        value_in_usd=351.5 if sold else 0.0, value_out_usd=351.5 - cost if sold else 0.0,
+        value_before_usd=1000.0, value_after_usd=1000.0 - cost,
+        transactions=2, gas_used=gas_used, gas_cost_usd=gas_used * 1e-5,
+        prices={"usdc_usd": 1.0, "eth_usd": 3515.0},
+        balances_before={"a_weth": 10 ** 30, "a_usdc": 0},  # past int64, kept exact
+        balances_after={"a_weth": 10 ** 30 - 10 ** 17, "a_usdc": 350 * 10 ** 6},
+        route=[{"fee": 500}], tx_hashes=("0x01", "0x02"),
+    )
+
+
+def test_aggregates_from_the_rollup_match_the_runs(tmp_path):
+    """Verify whole-day aggregates (rollup) and block or intra-day ranges (runs) agree, per group and filter."""
+    journal = RunJournal(tmp_path / "journal.sqlite")
+    journal.record_many([
+        _entry(timestamp=Q1_2025 + 3600),
+        _entry(timestamp=Q1_2025 + 7200, block=101, sold=None),
+        _entry(account="0xbb", timestamp=Q1_2025 + 40 * SECONDS_PER_DAY, block=200, cost=3.0),
+        _entry(timestamp=Q1_2025 + 100 * SECONDS_PER_DAY, block=300),  # second quarter
+    ])
+
+    (total,) = journal.aggregate()
+    assert (total.key, total.runs, total.trades, total.gas_used) == (None, 4, 3, 800_000)
+    assert total.trade_cost_usd == pytest.approx(6.0)
+    assert total.total_cost_usd == pytest.approx(6.0 + 8.0)
+
+    by_quarter = journal.aggregate(group_by="quarter")
+    assert [(a.key, a.runs, a.trades) for a in by_quarter] == [("2025-Q1", 3, 2), ("2025-Q2", 1, 1)]
+    assert journal.aggregate(to_block=250, group_by="quarter") == by_quarter[:1]  # read from the runs table
+    assert journal.aggregate(since=Q1_2025 + 1, until=Q1_2025 + 90 * SECONDS_PER_DAY) == [by_quarter[0]._replace(key=None)]
+    assert [(a.key, a.runs) for a in journal.aggregate(account="0xAA", group_by="month")] == [("2025-01", 2), ("2025-04", 1)]
+    assert journal.aggregate(network="sepolia")[0].runs == 0
+    with pytest.raises(ValueError):
+        journal.aggregate(group_by="week")
+
+
+def test_rows_and_export_stream_exact_runs(tmp_path):
+    """Verify rows come back exact and in order, reopened from disk, and export writes one CSV line per run."""
+    path = tmp_path / "journal.sqlite"
+    RunJournal(path).record_many([_entry(timestamp=Q1_2025 + 10, block=2), _entry(timestamp=Q1_2025, block=1)])
+
+    journal = RunJournal(path)
+    rows = list(journal.rows(account="0xaa"))
+    assert [row.block for row in rows] == [1, 2]
+    assert rows[0] == _entry(account="0xaa", timestamp=Q1_2025, block=1)
+    assert list(journal.rows(from_block=2, to_block=2)) == rows[1:]
+
+    assert journal.export(tmp_path / "runs.csv", since=Q1_2025 + 5) == 1
+    with open(tmp_path / "runs.csv", newline="") as file:
+        (row,) = csv.DictReader(file)
+    assert (row["block"], row["amount_in"], row["trade_cost_usd"]) == ("2", str(10 ** 17), "1.5")
+
+
+def test_run_script_records_the_run(active_network, capsys, tmp_path):
+    """Verify a run is journaled with its balances, prices, trade and gas, nothing broadcast locally."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    journal = RunJournal(tmp_path / "journal.sqlite")
+
+    usdc, weth, a_usdc, a_weth = run_script(quiet=True, journal=journal)
+
+    (entry,) = journal.rows()
+    assert entry.account == str(boa.env.eoa).lower()
+    assert entry.sold == "weth" and entry.amount_in > 0
+    assert entry.balances_before["a_weth"] - entry.balances_after["a_weth"] == entry.amount_in
+    assert entry.balances_after["a_usdc"] == a_usdc.balanceOf(boa.env.eoa)
+    assert entry.prices["eth_usd"] > 0
+    assert entry.value_after_usd == pytest.approx(entry.value_before_usd - entry.trade_cost_usd, rel=1e-3)
+    assert entry.transactions > 0 and entry.gas_used > 0
+    assert entry.tx_hashes == ()
+    assert journal.aggregate()[0].runs == 1
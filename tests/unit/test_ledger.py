@@ -0,0 +1,72 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+from script._events import TRANSFER, LogEntry, address_topic
+from script._instrumentation import instrument
+from script._ledger import PositionLedger, swap_amounts
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_ledger_books_withdraw_swap_supply_without_reads(accounts):
+    """Verify positions follow the logs of a full rebalance and match the chain."""
+    market, addresses = accounts
+    account = addresses[0]
+    (usdc, weth), (a_usdc, a_weth) = market.tokens, market.a_tokens
+    ledger = PositionLedger(account, {"usdc": usdc, "weth": weth, "a_usdc": a_usdc, "a_weth": a_weth})
+
+    with instrument() as instrumentation, ledger, boa.env.prank(account):
+        market.pool.withdraw(weth.address, 10 ** 17, account)
+        weth.approve(market.router.address, 10 ** 17)
+        market.router.exactInputSingle((weth.address, usdc.address, 3000, account, 10 ** 17, 0, 0))
+        ledger.sync()
+        amount_in, amount_out = swap_amounts(ledger.last("swap"), weth, usdc)
+        usdc.approve(market.pool.address, amount_out)
+        market.pool.supply(usdc.address, amount_out, account, 0)
+
+    assert instrumentation.totals().eth_calls == 0
+    assert amount_in == 10 ** 17 and amount_out > 0
+    assert [e.kind for e in ledger.events if e.kind != "transfer"] == ["withdraw", "swap", "supply"]
+    assert ledger.last("supply").amounts == (amount_out,)
+    assert ledger.positions["weth"] == 0 and ledger.positions["usdc"] == 0
+    assert ledger.reconcile() == {}
+
+
+def test_ledger_ignores_other_accounts_and_reports_differences(setup):
+    """Verify transfers between others are ignored and reconcile reports a missed change."""
+    usdc, weth = setup
+    account, other = boa.env.eoa, boa.env.generate_address("other")
+    ledger = PositionLedger(account, {"weth": weth})
+    start = ledger.positions["weth"]
+
+    ledger.apply([
+        LogEntry(str(weth.address), (TRANSFER, address_topic(other), address_topic(account)), (7).to_bytes(32, "big"), 1),
+        LogEntry(str(weth.address), (TRANSFER, address_topic(other), 0), (9).to_bytes(32, "big"), 1),
+        LogEntry(str(usdc.address), (TRANSFER, 0, address_topic(account)), (5).to_bytes(32, "big"), 1),
+    ])
+
+    assert ledger.positions["weth"] == start + 7
+    assert ledger.reconcile() == {"weth": (start + 7, start)}
+    assert ledger.positions["weth"] == start
+
+
+def test_ledger_takes_interest_accrued_before_it_opened_out_of_mints_and_burns(accounts):
+    """Verify the balanceIncrease folded into aToken Mint/Burn transfers is not booked twice."""
+    market, addresses = accounts
+    account = addresses[1]
+    usdc, a_usdc = market.tokens[0], market.a_tokens[0]
+    boa.env.time_travel(seconds=30 * 24 * 60 * 60)  # interest accrued since the account supplied
+    ledger = PositionLedger(account, {"usdc": usdc, "a_usdc": a_usdc})
+    assert ledger.positions["a_usdc"] > 3000 * 10 ** 6
+
+    with ledger, boa.env.prank(account):
+        market.pool.withdraw(usdc.address, 10 ** 6, account)  # Burn with a balanceIncrease
+        usdc.approve(market.pool.address, 10 ** 6)
+        boa.env.time_travel(seconds=24 * 60 * 60)
+        market.pool.supply(usdc.address, 10 ** 6, account, 0)  # Mint with a balanceIncrease
+
+    booked = ledger.positions["a_usdc"]
+    (booked_after, chain) = ledger.reconcile()["a_usdc"]  # only the day accrued after it opened is missed
+    assert booked_after == booked and 0 < chain - booked < (chain - 3000 * 10 ** 6) // 10
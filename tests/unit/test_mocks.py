@@ -0,0 +1,64 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._deploy_mocks import get_mock_config
+
+
+@pytest.fixture
+def mocks(active_network):
+    """Mock market of the pyevm network, other networks use the real protocols."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock contracts are only deployed on pyevm")
+    return active_network
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_mock_price_feeds_use_configured_prices(mocks):
+    """Verify the feeds answer the prices of moccasin.toml extra_data."""
+    config = get_mock_config()
+    eth_usd = mocks.manifest_named("eth_usd")
+
+    assert eth_usd.latestAnswer() == config["eth_usd_price"] * 10 ** eth_usd.decimals()
+    eth_usd.updateAnswer(4000 * 10 ** 8)
+    assert eth_usd.latestRoundData()[1] == 4000 * 10 ** 8
+    assert eth_usd.getRoundData(1)[1] == config["eth_usd_price"] * 10 ** 8
+
+
+def test_mock_pool_accrues_interest(mocks, setup):
+    """Verify aToken balances grow with the supply rate and can be withdrawn."""
+    usdc, _ = setup
+    pool = mocks.manifest_named("pool")
+    usdc.approve(pool.address, 100 * 10 ** 6)
+    pool.supply(usdc.address, 100 * 10 ** 6, boa.env.eoa, 0)
+    a_usdc = mocks.manifest_named("a_token", address=pool.getReserveAToken(usdc.address))
+
+    boa.env.time_travel(seconds=365 * 24 * 60 * 60)
+
+    supply_rate = get_mock_config()["supply_rate"]
+    assert a_usdc.balanceOf(boa.env.eoa) == pytest.approx(100 * 10 ** 6 * (1 + supply_rate), rel=1e-6)
+    pool.withdraw(usdc.address, 2 ** 256 - 1, boa.env.eoa)
+    assert a_usdc.balanceOf(boa.env.eoa) == 0
+    assert usdc.balanceOf(boa.env.eoa) > 100 * 10 ** 6
+
+
+def test_mock_swap_router_is_constant_product(mocks, setup):
+    """Verify swaps follow x * y = k after fee and enforce amountOutMinimum."""
+    usdc, weth = setup
+    router = mocks.manifest_named("uniswap_swap_router")
+    amount_in = 10 ** 17
+    reserve_in = router.reserves(weth.address, usdc.address, 3000)
+    reserve_out = router.reserves(usdc.address, weth.address, 3000)
+    in_after_fee = amount_in * 997_000 // 1_000_000
+    expected = reserve_out * in_after_fee // (reserve_in + in_after_fee)
+
+    weth.approve(router.address, amount_in)
+    with boa.reverts("Too little received"):
+        router.exactInputSingle((weth.address, usdc.address, 3000, boa.env.eoa, amount_in, expected + 1, 0))
+    usdc_before = usdc.balanceOf(boa.env.eoa)
+    router.exactInputSingle((weth.address, usdc.address, 3000, boa.env.eoa, amount_in, expected, 0))
+
+    assert usdc.balanceOf(boa.env.eoa) - usdc_before == expected
@@ -0,0 +1,133 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from eth_account import Account
+from script._events import TRANSFER, RPCLogSource, address_topic
+from script._monitor import DriftMonitor
+from script._multi_account import InProcessTransactor, RawTransactor, get_transactor
+
+TARGETS = [0.3, 0.7]
+
+
+@pytest.fixture
+def monitor(accounts):
+    """Monitor of the three accounts recording its triggers instead of trading."""
+    market, addresses = accounts
+    triggered = []
+    with DriftMonitor(addresses, TARGETS, 0.1, market=market, on_drift=triggered.extend) as monitor:
+        monitor.triggered = triggered
+        yield monitor
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_monitor_triggers_drifting_accounts_once(monitor):
+    """Verify drifting accounts are handed over once and quiet polls read nothing."""
+    assert monitor.poll() == monitor.accounts[:2]
+    assert monitor.poll() == []
+
+    assert monitor.triggered == monitor.accounts[:2]
+    assert (monitor.stats.idle_polls, monitor.stats.price_reads, monitor.stats.balance_reads) == (2, 0, 0)
+
+
+def test_monitor_rereads_only_touched_accounts(monitor):
+    """Verify a withdraw re-reads the balances of its account only."""
+    market, account = monitor.market, monitor.accounts[2]
+    monitor.poll()
+    with boa.env.prank(account):
+        market.pool.withdraw(market.tokens[1].address, market.a_tokens[1].balanceOf(account) // 2, account)
+
+    assert monitor.poll() == [account]
+    assert (monitor.stats.price_reads, monitor.stats.balance_reads) == (0, 1)
+    assert monitor.drift[2] > 0.1
+
+
+def test_monitor_rereads_prices_on_new_round(monitor, active_network):
+    """Verify a new price round re-reads that feed only and updates every drift."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock feeds only")
+    eth_usd = monitor.market.feeds[1]
+    monitor.poll()
+    drift = monitor.drift.copy()
+    eth_usd.updateAnswer(eth_usd.latestAnswer() * 2)
+
+    assert monitor.poll() == [monitor.accounts[2]]
+    assert (monitor.stats.price_reads, monitor.stats.balance_reads) == (1, 0)
+    assert (monitor.drift != drift).all()
+
+
+
+def test_monitor_reads_everything_on_first_poll_without_with(accounts):
+    """Verify a monitor polled outside `with` refreshes on its first poll."""
+    market, addresses = accounts
+    monitor = DriftMonitor(addresses, TARGETS, 0.1, market=market, on_drift=[].extend)
+    assert monitor.poll() == monitor.accounts[:2]
+    assert monitor.poll() == []
+
+def test_monitor_rebalances_with_default_pipeline(accounts):
+    """Verify the default trigger trades the drift away and its events are picked up."""
+    market, addresses = accounts
+    with DriftMonitor(addresses, TARGETS, 0.1, market=market) as monitor:
+        assert monitor.poll() == addresses[:2]
+        assert monitor.poll() == []
+
+    assert monitor.stats.balance_reads == 2
+    assert not monitor.needs_rebalancing.any()
+    assert monitor.drift.max() < 0.01
+
+
+class FakeNetworkEnv:
+    """Live network stand-in: a NetworkEnv has get_chain_id, pyevm and forks do not."""
+    _rpc = None
+
+    def get_chain_id(self):
+        return 1
+
+    def get_eip1559_fee(self):
+        return 0, 10 ** 9, 3 * 10 ** 10, 1
+
+
+def test_monitor_trades_with_the_transactor_of_the_network(accounts):
+    """Verify drift is traded in-process on pyevm and forks, and live networks sign or refuse to run."""
+    market, addresses = accounts
+    assert isinstance(DriftMonitor(addresses, TARGETS, market=market).transactor, InProcessTransactor)
+    assert DriftMonitor(addresses, TARGETS, market=market, on_drift=print).transactor is None
+
+    signer = Account.create()
+    live = get_transactor([signer], env=FakeNetworkEnv())
+    assert isinstance(live, RawTransactor) and live._chain_id == 1
+    assert DriftMonitor(addresses, TARGETS, market=market, transactor=live).transactor is live
+    with pytest.raises(ValueError):
+        get_transactor(env=FakeNetworkEnv())  # impersonation would simulate, nothing broadcast
+
+
+class FakeRPC:
+    def __init__(self, heads, logs):
+        self.heads, self.logs, self.calls = iter(heads), logs, []
+
+    def fetch(self, method, params):
+        self.calls.append(method)
+        return next(self.heads) if method == "eth_blockNumber" else self.logs
+
+
+def test_rpc_log_source_fetches_new_blocks_only():
+    """Verify logs are only fetched once the head moves, and decoded."""
+    account = "0x" + "ab" * 20
+    log = {
+        "address": account,
+        "topics": [hex(TRANSFER), hex(0), hex(address_topic(account))],
+        "data": "0x" + "00" * 31 + "05",
+        "blockNumber": "0xb",
+    }
+    rpc = FakeRPC(["0xa", "0xa", "0xb"], [log])
+    source = RPCLogSource([account], rpc)
+
+    assert source.poll() == (10, [])
+    block, (entry,) = source.poll()
+    assert block == 11
+    assert entry.topics == (TRANSFER, 0, address_topic(account))
+    assert int.from_bytes(entry.data, "big") == 5
+    assert rpc.calls == ["eth_blockNumber"] * 3 + ["eth_getLogs"]
@@ -0,0 +1,124 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._multi_account import (
+    FAILED,
+    REBALANCED,
+    SKIPPED,
+    TRANSFER_TOPIC,
+    InProcessTransactor,
+    NonceManager,
+    _transferred_to,
+    execute_plans,
+    plan_accounts,
+    rebalance_accounts,
+    snapshot_accounts,
+)
+
+TARGETS = [0.3, 0.7]
+
+
+def _weth_allocation(market, account) -> float:
+    plan = plan_accounts(market, [account], snapshot_accounts(market, [account]), TARGETS)[0]
+    prices = [f.latestAnswer() / 10 ** f.decimals() for f in market.feeds]
+    values = [b / 10 ** d * p for b, d, p in zip(plan.a_balances, market.token_decimals, prices)]
+    return values[1] / sum(values)
+
+
+def _open_checkpoints() -> int:
+    return len(boa.env.evm.vm.state._account_db._journaldb._journal._checkpoint_stack)
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_rebalance_accounts_plans_each_account(accounts):
+    """Verify both directions are traded, the balanced account is skipped and no snapshot is left open."""
+    market, addresses = accounts
+    checkpoints = _open_checkpoints()
+    results = rebalance_accounts(addresses, TARGETS, buffer=0.1)
+
+    assert [r.status for r in results] == [REBALANCED, REBALANCED, SKIPPED]
+    assert _open_checkpoints() == checkpoints  # committed, not left open per account
+    for account in addresses[:2]:
+        assert _weth_allocation(market, account) == pytest.approx(0.7, abs=0.01)
+
+
+def test_failing_account_is_isolated_and_reverted(accounts):
+    """Verify one failing account is reported, reverted and does not stop the others."""
+    market, addresses = accounts
+    snapshot = snapshot_accounts(market, addresses)
+    plans = plan_accounts(market, addresses, snapshot, TARGETS)
+
+    # The first account moves its aWETH away after the snapshot, its withdraw reverts
+    a_weth = market.a_tokens[1]
+    with boa.env.prank(addresses[0]):
+        a_weth.transfer(boa.env.generate_address("elsewhere"), a_weth.balanceOf(addresses[0]))
+    usdc_allowance = market.tokens[0].allowance(addresses[0], market.router.address)
+
+    results = execute_plans(InProcessTransactor(), market, plans, snapshot)
+
+    assert [r.status for r in results] == [FAILED, REBALANCED, SKIPPED]
+    assert results[0].error
+    assert market.tokens[0].allowance(addresses[0], market.router.address) == usdc_allowance
+
+
+def test_failed_swap_reverts_the_withdraw(accounts):
+    """Verify an account failing mid-way keeps its aTokens, nothing is left half done."""
+    market, addresses = accounts
+    snapshot = snapshot_accounts(market, addresses[:1])
+    plans = plan_accounts(market, addresses[:1], snapshot, TARGETS)
+
+    (result,) = execute_plans(InProcessTransactor(), market, plans, snapshot, min_out=2.0)  # swap reverts
+
+    assert result.status == FAILED
+    assert "Too little received" in result.error
+    assert market.a_tokens[1].balanceOf(addresses[0]) >= plans[0].a_balances[1]
+    assert market.tokens[1].balanceOf(addresses[0]) == 0
+
+
+
+def test_accounts_trade_only_through_given_fee_tiers(accounts):
+    """Verify the route is quoted over the given fee tiers, an account without any pool fails untouched."""
+    market, addresses = accounts
+    snapshot = snapshot_accounts(market, addresses[:1])
+    plans = plan_accounts(market, addresses[:1], snapshot, TARGETS)
+
+    (result,) = execute_plans(InProcessTransactor(), market, plans, snapshot, fee_tiers=(1234,))
+
+    assert result.status == FAILED
+    assert "No pool" in result.error
+    assert market.a_tokens[1].balanceOf(addresses[0]) == plans[0].a_balances[1]
+
+class FakeRPC:
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, method, params):
+        self.calls += 1
+        return "0x5"
+
+
+def test_nonce_manager_counts_locally():
+    """Verify nonces are read once per account and re-read after a reset."""
+    rpc = FakeRPC()
+    nonces = NonceManager(rpc)
+
+    assert [nonces.next("0xa"), nonces.next("0xa"), nonces.next("0xb")] == [5, 6, 5]
+    assert rpc.calls == 2
+    nonces.reset("0xa")
+    assert nonces.next("0xa") == 5
+    assert rpc.calls == 3
+
+
+def test_transferred_to_sums_transfers_from_receipt(setup):
+    """Verify the swap output is decoded from the Transfer logs of the receipt."""
+    usdc, _ = setup
+    account = "0x" + "ab" * 20
+    topic = "0x" + "00" * 12 + "ab" * 20
+    log = {"address": str(usdc.address), "topics": [TRANSFER_TOPIC, "0x" + "00" * 32, topic], "data": hex(250)}
+    other = {**log, "address": "0x" + "00" * 20}
+
+    assert _transferred_to({"logs": [log, log, other]}, usdc, account) == 500
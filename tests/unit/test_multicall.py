@@ -0,0 +1,61 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import pytest
+from script._multicall import Multicall, get_multicall3
+import boa
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_empty_multicall_returns_empty_dict():
+    """Verify executing an empty batch does not touch the chain."""
+    assert Multicall().execute() == {}
+
+
+def test_multicall_rejects_duplicate_keys(contracts):
+    """Verify the same result key cannot be added twice."""
+    usdc, weth = contracts
+    batch = Multicall()
+    batch.add("balance", usdc.balanceOf, boa.env.eoa)
+    with pytest.raises(ValueError):
+        batch.add("balance", weth.balanceOf, boa.env.eoa)
+
+
+def test_multicall3_is_deployed_on_fork(active_network):
+    """Verify the Multicall3 contract is found on the forked network."""
+    if active_network.is_local_or_forked_network():
+        assert get_multicall3() is not None
+
+
+def test_multicall_matches_direct_calls(setup, active_network):
+    """Verify batched results are decoded to the same values as direct calls."""
+    usdc, weth = setup
+    eth_usd = active_network.manifest_named("eth_usd")
+
+    batch = Multicall()
+    batch.add("usdc", usdc.balanceOf, boa.env.eoa)
+    batch.add("weth", weth.balanceOf, boa.env.eoa)
+    batch.add("decimals", eth_usd.decimals)
+    batch.add("round_data", eth_usd.latestRoundData)
+    results = batch.execute()
+
+    assert results["usdc"] == usdc.balanceOf(boa.env.eoa)
+    assert results["weth"] == weth.balanceOf(boa.env.eoa)
+    assert results["decimals"] == eth_usd.decimals()
+    assert results["round_data"] == eth_usd.latestRoundData()
+
+
+def test_multicall_allow_failure_returns_none(contracts, active_network):
+    """Verify a reverting call with allow_failure=True gives None."""
+    usdc, _ = contracts
+    eth_usd = active_network.manifest_named("eth_usd")
+
+    batch = Multicall()
+    batch.add("missing_round", eth_usd.getRoundData, 0, allow_failure=True)  # round 0 never exists, reverts
+    batch.add("usdc_owner", usdc.owner)
+    results = batch.execute()
+
+    assert results["missing_round"] is None
+    assert results["usdc_owner"] == usdc.owner()
@@ -0,0 +1,46 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._instrumentation import instrument
+from script._price_service import PriceService, StalePriceError
+from script.rebalance_portfolio import get_prices
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_price_service_reads_nothing_until_ttl_or_new_round(active_network):
+    """Verify cached rounds cost no call, a new round is read without decimals again."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock feeds only")
+    prices = PriceService(ttl=60)
+    first = prices.get_prices("usdc_usd", "eth_usd")
+    assert first == get_prices("usdc_usd", "eth_usd")
+
+    eth_usd = prices.feed("eth_usd")
+    with instrument() as instrumentation:
+        assert prices.get_prices("usdc_usd", "eth_usd") == first
+    assert instrumentation.totals().eth_calls == 0
+
+    eth_usd.updateAnswer(eth_usd.latestAnswer() * 2)
+    prices.invalidate()
+    with instrument() as instrumentation:
+        quotes = prices.get_quotes("usdc_usd", "eth_usd")
+    assert instrumentation.totals().eth_calls == 1  # one multicall of latestRoundData
+    assert quotes["eth_usd"].price == 2 * first["eth_usd"]
+    assert prices.get_round("eth_usd", quotes["eth_usd"].round_id - 1).price == first["eth_usd"]
+
+
+def test_price_service_rejects_stale_rounds(active_network):
+    """Verify a round older than max_staleness raises unless the bound is off."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock feeds only")
+    prices = PriceService(max_staleness=60 * 60)
+    prices.feed("eth_usd")  # deployed now, last round updated now
+    boa.env.time_travel(seconds=2 * 60 * 60)
+
+    with pytest.raises(StalePriceError):
+        prices.get_prices("eth_usd")
+    assert PriceService(max_staleness=None).get_prices("eth_usd")["eth_usd"] > 0
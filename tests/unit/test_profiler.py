@@ -0,0 +1,79 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._contract_registry import get_contract
+from script._instrumentation import instrument, stage
+from script._profiler import GasProfile, diff, main, profile
+from script.rebalance_portfolio import deposit, run_script
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_profile_deposit_breaks_gas_down_per_call(active_network, setup):
+    """Verify a profiled deposit reports its call tree under its stage, gas matching the instrumentation."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    usdc, weth = setup
+    pool = get_contract("pool", address=get_contract("aavev3_pool_address_provider").getPool())
+
+    with instrument() as instrumentation, profile() as gas:
+        with stage("deposit"):
+            deposit(pool, usdc, usdc.balanceOf(boa.env.eoa), quiet=True)
+
+    assert gas.stages["deposit"].gas_used == instrumentation.stages["deposit"].gas_used > 0
+    paths = [path for name, path in gas.calls if name == "deposit"]
+    supply = next(path for path in paths if path.endswith(".supply"))
+    children = [path for path in paths if path.startswith(supply + ";")]
+    assert children  # the pool pulls the tokens and mints the aTokens
+    top = gas.calls["deposit", supply]
+    assert top.gas == top.self_gas + sum(gas.calls["deposit", path].gas for path in children if path.count(";") == 1)
+    assert f"deposit;{supply} {top.self_gas}" in gas.folded().splitlines()
+
+
+def test_profile_run_script_reaches_the_rebalancer_calls(active_network):
+    """Verify the rebalance stage shows the withdraw, swap and supply made inside the rebalancer."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    with profile() as gas:
+        run_script(quiet=True)
+
+    leaves = {path.split(";")[-1].split(".")[-1] for name, path in gas.calls if name == "rebalance" and path.count(";") == 1}
+    assert {"withdraw", "exactInputSingle", "supply"} <= leaves
+    assert sum(stats.transactions for stats in gas.stages.values()) > 0
+    rebalance = gas.by_call()["rebalancer.rebalance"]
+    assert rebalance.calls == 1
+    assert rebalance.gas == sum(stats.gas for (name, path), stats in gas.calls.items() if path == "rebalancer.rebalance") > 0
+
+
+def test_diff_flags_gas_increases_between_reports(tmp_path):
+    """Verify reports survive JSON, diff flags changed, new and removed calls, and by_call counts recursion once."""
+    before = GasProfile()
+    before._call("swap", "router.exactInputSingle").gas = 100_000
+    before._call("swap", "router.exactInputSingle;pool.swap").gas = 80_000
+    before._call("swap", "router.multicall").gas = 5_000
+    before._stage("swap").gas_used = 100_000
+    before.to_json(tmp_path / "before.json")
+    after = GasProfile.load(tmp_path / "before.json")
+    assert after.to_dict() == before.to_dict()
+
+    after.calls["swap", "router.exactInputSingle;pool.swap"].gas = 80_500
+    del after.calls["swap", "router.multicall"]
+    after._call("swap", "router.exactInputSingle;pool.flash").gas = 300
+    after.to_json(tmp_path / "after.json")
+
+    assert [(c.path, c.change) for c in diff(before, after)] == [
+        ("router.exactInputSingle;pool.flash", 300),
+        ("router.exactInputSingle;pool.swap", 500),
+        ("router.multicall", -5_000),
+    ]
+    assert [c.path for c in diff(before, after, tolerance=400)] == ["router.exactInputSingle;pool.swap", "router.multicall"]
+    assert main(["diff", str(tmp_path / "before.json"), str(tmp_path / "after.json")]) == 1
+    assert main(["diff", str(tmp_path / "after.json"), str(tmp_path / "before.json"), "--tolerance", "1000"]) == 1  # multicall came back
+    assert main(["diff", str(tmp_path / "before.json"), str(tmp_path / "before.json")]) == 0
+
+    assert before.by_call()["pool.swap"].gas == 80_000
+    before._call("swap", "router.exactInputSingle;pool.swap;pool.swap").gas = 30_000  # recursive, inside the 80k
+    assert before.by_call()["pool.swap"].gas == 80_000
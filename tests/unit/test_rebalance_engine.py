@@ -0,0 +1,113 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import numpy as np
+import pytest
+from script._rebalance_engine import SwapLeg, plan_rebalance, plan_rebalance_exact, plan_swap_leg, to_base_units
+from script.rebalance_portfolio import calculate_rebalancing_trades
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_plan_rebalance_many_portfolios_in_one_pass():
+    """Verify every portfolio row gets its own trades, drift and mask."""
+    balances = [
+        [1000, 0],    # 100% USDC
+        [300, 0.2],   # already 30/70 at $3500
+        [0, 1],       # 100% WETH
+    ]
+    plan = plan_rebalance(balances, prices=[1.0, 3500], targets=[0.3, 0.7], buffer=0.1)
+
+    assert plan.trades.shape == (3, 2)
+    np.testing.assert_allclose(plan.trades[0], [-700, 0.2])
+    np.testing.assert_allclose(plan.trades[1], [0, 0], atol=1e-9)
+    np.testing.assert_allclose(plan.drift, [0.7, 0, 0.3], atol=1e-9)
+    assert plan.needs_rebalancing.tolist() == [True, False, True]
+
+
+def test_plan_rebalance_preserves_portfolio_values():
+    """Verify trades only move value between assets."""
+    rng = np.random.default_rng(0)
+    balances = rng.random((1000, 3)) * 100
+    prices = [1.0, 3500.0, 60000.0]
+    plan = plan_rebalance(balances, prices, targets=[0.2, 0.5, 0.3])
+
+    np.testing.assert_allclose(plan.trades_usd.sum(axis=1), 0, atol=1e-6)
+    new_values = (balances + plan.trades) * prices
+    np.testing.assert_allclose(new_values / new_values.sum(axis=1)[:, None], np.tile([0.2, 0.5, 0.3], (1000, 1)))
+
+
+def test_plan_rebalance_per_portfolio_targets():
+    """Verify targets can differ for every portfolio."""
+    plan = plan_rebalance([[100, 0], [100, 0]], prices=[1, 1], targets=[[0.5, 0.5], [0.9, 0.1]])
+
+    np.testing.assert_allclose(plan.trades, [[-50, 50], [-10, 10]])
+
+
+def test_plan_rebalance_empty_portfolio_needs_no_trade():
+    """Verify a zero value portfolio does not divide by zero."""
+    plan = plan_rebalance([[0, 0]], prices=[1, 3500], targets=[0.3, 0.7])
+
+    assert not plan.needs_rebalancing[0]
+    np.testing.assert_array_equal(plan.trades, [[0, 0]])
+
+
+def test_plan_rebalance_rejects_targets_not_summing_to_one():
+    """Verify target allocations must sum to 1."""
+    with pytest.raises(ValueError):
+        plan_rebalance([[1, 1]], prices=[1, 1], targets=[0.5, 0.6])
+
+
+def test_to_base_units_truncates_toward_zero_without_overflow():
+    """Verify conversion to wei gives Python ints for big 18 decimals amounts."""
+    base_units = to_base_units([[-1.5, 2.5], [0.1234567, 1e5]], decimals=[6, 18])
+
+    assert base_units[0, 0] == -1_500_000
+    assert base_units[0, 1] == 25 * 10 ** 17
+    assert base_units[1, 0] == 123456
+    assert base_units[1, 1] > np.iinfo(np.int64).max
+    assert isinstance(base_units[1, 1], int)
+
+
+def test_plan_rebalance_exact_is_wei_exact():
+    """Verify the integer planner keeps portfolio value exactly."""
+    # 1000 USDC and 0 WETH, USDC at $1.00000000 and ETH at $3500.00000000
+    trades = plan_rebalance_exact(
+        balances=[[1000 * 10 ** 6, 0]],
+        answers=[10 ** 8, 3500 * 10 ** 8],
+        answer_decimals=[8, 8],
+        token_decimals=[6, 18],
+        targets=[0.3, 0.7],
+    )
+
+    assert trades[0, 0] == -700 * 10 ** 6
+    assert trades[0, 1] == 2 * 10 ** 17
+
+
+def test_plan_rebalance_exact_rejects_broken_feeds():
+    """Verify a zero or negative Chainlink answer raises instead of dividing by zero or inverting trades."""
+    for answer in (0, -3500 * 10 ** 8):
+        with pytest.raises(ValueError, match="must be positive"):
+            plan_rebalance_exact([[1000 * 10 ** 6, 0]], [10 ** 8, answer], [8, 8], [6, 18], [0.3, 0.7])
+
+
+def test_plan_swap_leg_moves_only_the_delta():
+    """Verify the swap sells exactly the overweight amount, in either direction."""
+    assert plan_swap_leg([-700 * 10 ** 6, 2 * 10 ** 17]) == SwapLeg(0, 1, 700 * 10 ** 6, 2 * 10 ** 17)
+    assert plan_swap_leg([300 * 10 ** 6, -10 ** 17]) == SwapLeg(1, 0, 10 ** 17, 300 * 10 ** 6)
+    assert plan_swap_leg([0, 0]) is None
+    with pytest.raises(ValueError):
+        plan_swap_leg([1, -1, 0])
+
+
+def test_calculate_rebalancing_trades_wraps_engine():
+    """Verify the two asset dict API returns the engine trades."""
+    usdc_data = {"balance": 600, "price": 1.0, "contract": "usdc"}
+    weth_data = {"balance": 0.1, "price": 4000, "contract": "weth"}
+    trades = calculate_rebalancing_trades(usdc_data, weth_data, {"usdc": 0.3, "weth": 0.7})
+    plan = plan_rebalance([[600, 0.1]], prices=[1.0, 4000], targets=[0.3, 0.7])
+
+    assert trades["usdc"]["contract"] == "usdc"
+    assert trades["usdc"]["trade"] == plan.trades[0, 0]
+    assert trades["weth"]["trade"] == plan.trades[0, 1]
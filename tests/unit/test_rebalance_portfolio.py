@@ -1,12 +1,15 @@
 # ------------------------------------------------------------------
 #                             IMPORTS
 # ------------------------------------------------------------------
+import json
 import pytest
 from script.rebalance_portfolio import (
     run_script,
     moccasin_main,
     deposit,
     get_price,
+    get_prices,
+    get_token_balances,
     print_usdc_weth_token_balances,
     calculate_rebalancing_trades,
     STARTING_ETH_BALANCE,
@@ -29,6 +32,32 @@ def test_run_script_returns_contracts(active_network):
         assert a_weth is not None
 
 
+def test_run_script_quiet_emits_one_json_result(active_network, capsys):
+    """Verify quiet mode prints only a JSON result whose derived balances match the chain."""
+    if active_network.is_local_or_forked_network():
+        usdc, weth, a_usdc, a_weth = run_script(quiet=True)
+
+        output = capsys.readouterr().out.strip()
+        assert len(output.splitlines()) == 1
+        result = json.loads(output)
+        assert result["balances_after"]["a_usdc"] == a_usdc.balanceOf(boa.env.eoa)
+        assert result["balances_after"]["a_weth"] == a_weth.balanceOf(boa.env.eoa)
+        assert result["allocations_after"]["weth"] == pytest.approx(0.7, abs=0.01)
+
+
+def test_run_script_withdraws_only_the_drift(active_network, capsys):
+    """Verify only the overweight delta leaves Aave and nothing is left in the wallet."""
+    if active_network.is_local_or_forked_network():
+        usdc, weth, a_usdc, a_weth = run_script(quiet=True)
+        trades = json.loads(capsys.readouterr().out)["trades"]
+
+        assert (trades["sold"], trades["bought"]) == ("weth", "usdc")
+        assert 0 < trades["amount_in"] < STARTING_WETH_BALANCE
+        assert usdc.balanceOf(boa.env.eoa) == 0
+        assert weth.balanceOf(boa.env.eoa) == 0
+        assert a_weth.balanceOf(boa.env.eoa) > 0
+
+
 def test_moccasin_main_executes(active_network):
     """Verify moccasin_main executes without errors."""
     if active_network.is_local_or_forked_network():
@@ -71,6 +100,32 @@ def test_get_price_returns_positive_value(active_network):
     assert eth_price > 100
 
 
+def test_get_prices_matches_get_price(active_network):
+    """Verify the batched get_prices returns the same prices as get_price."""
+    prices = get_prices("usdc_usd", "eth_usd")
+
+    assert prices["usdc_usd"] == get_price("usdc_usd")
+    assert prices["eth_usd"] == get_price("eth_usd")
+
+
+def test_get_token_balances_matches_balance_of(setup):
+    """Verify get_token_balances reads the same balances as balanceOf."""
+    usdc, weth = setup
+    balances = get_token_balances({"usdc": usdc, "weth": weth})
+
+    assert balances["usdc"] == usdc.balanceOf(boa.env.eoa)
+    assert balances["weth"] == weth.balanceOf(boa.env.eoa)
+
+
+def test_print_usdc_weth_token_balances_uses_given_balances(capsys):
+    """Verify print_usdc_weth_token_balances prints already fetched balances."""
+    print_usdc_weth_token_balances({"usdc": 123, "weth": 456})
+
+    captured = capsys.readouterr()
+    assert "USDC balance: 123" in captured.out
+    assert "WETH balance: 456" in captured.out
+
+
 def test_print_usdc_weth_token_balances_executes(active_network, capsys):
     """Verify print_usdc_weth_token_balances prints balances."""
     print_usdc_weth_token_balances()
@@ -0,0 +1,80 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._contract_registry import get_contract
+from script._instrumentation import instrument, stage
+from script._rebalancer import get_rebalancer, rebalance_atomic
+from script._reserve_registry import get_reserve_registry
+from script._routing import plan_route
+from script._simulation import prepare
+from script.rebalance_portfolio import ATOMIC_ENV_VAR, run_script
+
+
+def _supply_weth(weth, amount: int):
+    pool = get_contract("pool", address=get_contract("aavev3_pool_address_provider").getPool())
+    weth.deposit(value=amount)
+    weth.approve(pool.address, amount)
+    pool.supply(weth.address, amount, boa.env.eoa, 0)
+    return get_contract("a_token", address=get_reserve_registry().get(weth.address)["a_token"])
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_rebalance_atomic_withdraws_swaps_and_supplies_in_one_transaction(active_network, setup):
+    """Verify one call moves aWETH into aUSDC along a split route, the contract keeps nothing."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    usdc, weth = setup
+    rebalancer = get_rebalancer()
+    a_usdc = get_contract("a_token", address=get_reserve_registry().get(usdc.address)["a_token"])
+    with boa.env.anchor():
+        a_weth = _supply_weth(weth, 10 ** 18)
+        before = (a_weth.balanceOf(boa.env.eoa), a_usdc.balanceOf(boa.env.eoa))
+        route = plan_route(get_contract("uniswap_quoter"), weth, usdc, 3 * 10 ** 17, fee_tiers=(500, 3000))
+        a_weth.approve(rebalancer.address, 2 ** 256 - 1)
+
+        with instrument() as instrumentation, stage("rebalance"):
+            amount_in, amount_out = rebalance_atomic(rebalancer, a_weth, weth, usdc, route)
+
+        assert instrumentation.stages["rebalance"].transactions == 1
+        assert amount_in == route.amount_in and amount_out >= route.min_out
+        assert a_weth.balanceOf(boa.env.eoa) == before[0] - amount_in
+        assert a_usdc.balanceOf(boa.env.eoa) == before[1] + amount_out
+        assert [token.balanceOf(rebalancer.address) for token in (weth, usdc, a_weth, a_usdc)] == [0, 0, 0, 0]
+
+
+def test_rebalance_atomic_reverts_as_a_whole(active_network, setup):
+    """Verify an unreachable minimum reverts the withdraw and the swap with it."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    usdc, weth = setup
+    rebalancer = get_rebalancer()
+    with boa.env.anchor():
+        a_weth = _supply_weth(weth, 10 ** 18)
+        route = plan_route(get_contract("uniswap_quoter"), weth, usdc, 3 * 10 ** 17)
+        before = a_weth.balanceOf(boa.env.eoa)
+
+        with boa.reverts("Rebalancer: too little received"):
+            rebalance_atomic(rebalancer, a_weth, weth, usdc, route, min_amount_out=route.quoted_out + 1)
+        assert a_weth.balanceOf(boa.env.eoa) == before
+
+
+def test_run_script_atomic_matches_separate_transactions(active_network, setup, monkeypatch):
+    """Verify the atomic run reaches the same allocation as withdraw, swap and supply sent one by one, in fewer transactions."""
+    if not active_network.is_local_or_forked_network():
+        pytest.skip("mints tokens")
+    prepare()  # contracts deployed outside the snapshots
+    results = {}
+    for atomic in ("1", "0"):
+        monkeypatch.setenv(ATOMIC_ENV_VAR, atomic)
+        with boa.env.anchor(), instrument() as instrumentation:
+            _, _, a_usdc, a_weth = run_script(quiet=True)
+            trade_stages = [instrumentation.stages.get(name) for name in ("rebalance", "withdraw", "swap", "redeposit")]
+            results[atomic] = (sum(s.transactions for s in trade_stages if s), a_weth.balanceOf(boa.env.eoa))
+
+    assert results["1"][0] == 2  # aToken approve, rebalance
+    assert results["0"][0] == 5  # withdraw, swap and supply, router and pool approved the exact amounts
+    assert results["1"][1] == pytest.approx(results["0"][1], rel=1e-12)
@@ -0,0 +1,90 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import json
+import pytest
+from script._reserve_registry import ReserveRegistry, get_reserve_registry
+import boa
+
+
+USDC_ADDRESS = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+A_USDC_ADDRESS = "0x98C23E9d8f34FEFb1B7BD6a91B7FF122F4e16F5c"
+
+
+class OfflineDataProvider:
+    """Data provider stand-in which fails on any chain call."""
+    address = "0x497a1994c46d4f6C864904A9f1fac6328Cb7C8a6"
+
+    def getAllReservesTokens(self):
+        raise AssertionError("registry should not call the chain when warm")
+
+
+def _write_registry(path, reserves):
+    path.write_text(json.dumps({"chain_id": 1, "data_provider": OfflineDataProvider.address, "reserves": reserves}))
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_warm_registry_does_not_call_chain(tmp_path):
+    """Verify a registry loaded from disk serves lookups without RPC calls."""
+    registry = ReserveRegistry(OfflineDataProvider(), 1, cache_dir=tmp_path)
+    _write_registry(registry.path, {
+        USDC_ADDRESS: {"symbol": "USDC", "a_token": A_USDC_ADDRESS, "variable_debt_token": USDC_ADDRESS, "decimals": 6},
+    })
+
+    registry = ReserveRegistry(OfflineDataProvider(), 1, cache_dir=tmp_path)
+
+    assert registry.get(USDC_ADDRESS.lower())["a_token"] == A_USDC_ADDRESS
+    assert registry.get(USDC_ADDRESS)["decimals"] == 6
+
+
+def test_registry_is_stale_only_when_reserves_count_changes(tmp_path):
+    """Verify staleness compares the pool reserves count with the last one seen, and sync refreshes only then."""
+    registry = ReserveRegistry(OfflineDataProvider(), 1, cache_dir=tmp_path)
+    registry.reserves = {USDC_ADDRESS: {}}
+    registry.reserves_count = 3  # dropped reserves still count
+
+    assert not registry.is_stale(3)
+    assert registry.is_stale(4)
+    registry.sync(3)  # warm, no chain call
+    with pytest.raises(AssertionError, match="should not call the chain"):
+        registry.sync(4)
+
+
+def test_registry_persists_reserves_count(tmp_path):
+    """Verify the count seen by sync is saved, so a warm start does not refresh again."""
+    class EmptyDataProvider(OfflineDataProvider):
+        def getAllReservesTokens(self):
+            return []
+
+    registry = ReserveRegistry(EmptyDataProvider(), 1, cache_dir=tmp_path)
+    registry.sync(2)
+
+    assert ReserveRegistry(OfflineDataProvider(), 1, cache_dir=tmp_path).reserves_count == 2
+
+
+def test_registry_is_keyed_by_chain_and_data_provider(tmp_path):
+    """Verify registries of different chains never share a file."""
+    mainnet = ReserveRegistry(OfflineDataProvider(), 1, cache_dir=tmp_path)
+    other_chain = ReserveRegistry(OfflineDataProvider(), 10, cache_dir=tmp_path)
+
+    assert mainnet.path != other_chain.path
+
+
+def test_registry_resolves_usdc_and_weth(contracts, active_network):
+    """Verify the registry finds aTokens and decimals for USDC and WETH."""
+    usdc, weth = contracts
+    registry = get_reserve_registry()
+
+    assert registry.get(usdc.address)["decimals"] == 6
+    assert registry.get(weth.address)["decimals"] == 18
+    a_usdc = active_network.manifest_named("a_token", address=registry.get(usdc.address)["a_token"])
+    assert a_usdc.balanceOf(boa.env.eoa) >= 0
+
+
+def test_registry_raises_for_unknown_reserve(contracts):
+    """Verify looking up a token which is not an Aave reserve raises KeyError."""
+    registry = get_reserve_registry()
+    with pytest.raises(KeyError):
+        registry.get(boa.env.eoa)
@@ -0,0 +1,58 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._contract_registry import get_contract
+from script._instrumentation import instrument
+from script._routing import best_route, execute_route, plan_route, quote_amounts
+
+
+def _quotes(outputs: dict[int, callable], amount_in: int) -> dict:
+    """Quotes of fee -> f(amount) for every amount the optimizer needs."""
+    return {(fee, amount): f(amount) for fee, f in outputs.items() for amount in quote_amounts(amount_in)}
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_best_route_prefers_cheapest_single_pool():
+    """Verify the best single pool wins when splitting gains nothing, missing pools are skipped."""
+    quotes = _quotes({100: lambda a: None, 500: lambda a: a * 2, 3000: lambda a: a * 2 - 10}, 1000)
+
+    route = best_route(quotes, 1000, fee_tiers=(100, 500, 3000), slippage=0.01)
+
+    assert [(leg.fee, leg.amount_in, leg.quoted_out, leg.min_out) for leg in route.legs] == [(500, 1000, 2000, 1980)]
+    assert best_route({(500, 1000): None}, 1000, fee_tiers=(500,)) is None
+
+
+def test_best_route_splits_across_shallow_pools():
+    """Verify two shallow pools share the amount when that beats either alone."""
+    def shallow(amount, reserve=1000):
+        return reserve * amount // (reserve + amount)  # constant product, same depth
+    quotes = _quotes({500: shallow, 3000: shallow}, 1000)
+
+    route = best_route(quotes, 1000, fee_tiers=(500, 3000))
+
+    assert [(leg.fee, leg.amount_in) for leg in route.legs] == [(500, 500), (3000, 500)]
+    assert route.quoted_out == 2 * shallow(500) > shallow(1000)
+    assert route.amount_in == 1000
+
+
+def test_plan_route_quotes_in_one_call_and_fills_min_out(active_network, setup):
+    """Verify all tiers are quoted in one multicall and the swap gets at least min_out."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock pools only")
+    usdc, weth = setup
+    quoter, router = get_contract("uniswap_quoter"), get_contract("uniswap_swap_router")
+    get_contract("multicall3")  # deployed outside the count
+
+    with instrument() as instrumentation:
+        route = plan_route(quoter, weth, usdc, 10 ** 17, slippage=0.01)
+    assert instrumentation.totals().eth_calls == 1
+    outputs = {fee: router.getAmountOut(weth.address, usdc.address, fee, 10 ** 17) for fee in (100, 500, 3000, 10000)}
+    assert [leg.fee for leg in route.legs] == [max(outputs, key=outputs.get)]
+
+    weth.approve(router.address, route.amount_in)
+    assert execute_route(router, route, weth, usdc, boa.env.eoa) == [route.quoted_out]
+    assert route.min_out == int(route.quoted_out * 0.99)
@@ -0,0 +1,107 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import pytest
+from boa.rpc import RPC, EthereumRPC
+from script._rpc_replay import RECORD, REPLAY, ReplayMissError, ReplayRPC, ReplayStore, resolve_block, serve, serve_block
+
+
+class FakeUpstream(RPC):
+    """Upstream RPC stand-in which answers from a dict and records every request."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    @property
+    def identifier(self):
+        return "fake"
+
+    @property
+    def name(self):
+        return "fake"
+
+    def fetch(self, method, params):
+        self.requests.append((method, params))
+        return self.responses[method]
+
+    def fetch_multi(self, payloads):
+        return [self.fetch(method, params) for method, params in payloads]
+
+
+RESPONSES = {"eth_chainId": "0x1", "eth_getBalance": "0x64", "eth_getBlockByNumber": {"number": "0xa"}}
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_replay_serves_recorded_responses_without_upstream(tmp_path):
+    """Verify a recorded session replays with no upstream RPC."""
+    store = ReplayStore(tmp_path / "replay.sqlite")
+    upstream = FakeUpstream(RESPONSES)
+    recorder = ReplayRPC(store, RECORD, upstream)
+    recorder.fetch("eth_chainId", [])
+    recorder.fetch("eth_getBalance", ["0xabc", "0xa"])
+    recorder.fetch("eth_getBalance", ["0xabc", "0xa"])
+
+    assert len(upstream.requests) == 2  # second balance read came from the store
+
+    replayer = ReplayRPC(ReplayStore(tmp_path / "replay.sqlite"), REPLAY)
+    assert replayer.fetch("eth_chainId", []) == "0x1"
+    assert replayer.fetch_multi([("eth_getBalance", ["0xabc", "0xa"])]) == ["0x64"]
+
+
+def test_replay_raises_on_unrecorded_request(tmp_path):
+    """Verify replay mode never falls through to the network."""
+    replayer = ReplayRPC(ReplayStore(tmp_path / "replay.sqlite"), REPLAY)
+    with pytest.raises(ReplayMissError):
+        replayer.fetch("eth_getBalance", ["0xabc", "0xa"])
+
+
+def test_record_pins_block_tags(tmp_path):
+    """Verify block tags are sent upstream as the pinned block but stored under the tag."""
+    store = ReplayStore(tmp_path / "replay.sqlite")
+    upstream = FakeUpstream(RESPONSES)
+    ReplayRPC(store, RECORD, upstream, block_number=10).fetch("eth_getBlockByNumber", ["safe", False])
+
+    assert upstream.requests == [("eth_getBlockByNumber", ["0xa", False])]
+    assert store.get("eth_getBlockByNumber", ["safe", False]) == (True, {"number": "0xa"})
+
+
+def test_replay_server_answers_json_rpc(tmp_path):
+    """Verify the local server answers single and batch JSON-RPC requests."""
+    store = ReplayStore(tmp_path / "replay.sqlite")
+    store.put("eth_chainId", [], "0x1")
+    server = serve(ReplayRPC(store, REPLAY))
+    try:
+        rpc = EthereumRPC("http://{}:{}".format(*server.server_address[:2]))
+        assert rpc.fetch("eth_chainId", []) == "0x1"
+        assert rpc.fetch_multi([("eth_chainId", []), ("eth_chainId", [])]) == ["0x1", "0x1"]
+    finally:
+        server.shutdown()
+
+
+def test_block_server_shares_one_store_between_clients(tmp_path):
+    """Verify a tag resolves to a block whose server records once for every client, then replays offline."""
+    upstream = FakeUpstream(RESPONSES)
+    node = serve(upstream)
+    node_url = "http://{}:{}".format(*node.server_address[:2])
+    try:
+        block = resolve_block(node_url, "safe")
+        assert block == resolve_block(node_url, str(block)) == 10
+        server = serve_block(block, EthereumRPC(node_url), cache_dir=tmp_path)
+        try:
+            workers = [EthereumRPC("http://{}:{}".format(*server.server_address[:2])) for _ in range(3)]
+            assert [rpc.fetch("eth_getBalance", ["0xabc", "safe"]) for rpc in workers] == ["0x64"] * 3
+        finally:
+            server.shutdown()
+    finally:
+        node.shutdown()
+    assert upstream.requests.count(("eth_getBalance", ["0xabc", "0xa"])) == 1  # pinned, fetched once
+
+    server = serve_block(block, cache_dir=tmp_path)
+    try:
+        rpc = EthereumRPC("http://{}:{}".format(*server.server_address[:2]))
+        assert rpc.fetch("eth_getBalance", ["0xabc", "safe"]) == "0x64"
+    finally:
+        server.shutdown()
@@ -0,0 +1,60 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import boa
+import pytest
+from script._simulation import Scenario, format_table, run_scenarios, scenario_matrix, simulate
+from script.rebalance_portfolio import get_price, get_token_balances
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_simulate_reports_without_changing_state(active_network, setup):
+    """Verify a dry run reports trades and gas per stage, and leaves balances and prices untouched."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    usdc, weth = setup
+    before = (get_token_balances({"usdc": usdc, "weth": weth}), boa.env.get_balance(boa.env.eoa), get_price("eth_usd"))
+
+    report = simulate()
+
+    assert report.ok, report.error
+    assert report.result["trades"]["sold"] == "weth"
+    assert report.result["allocations_after"]["weth"] == pytest.approx(0.7, abs=0.01)
+    assert report.gas_used["rebalance"] > 0  # withdraw, swap and supply in one transaction
+    assert report.total_gas == sum(report.gas_used.values())
+    assert (get_token_balances({"usdc": usdc, "weth": weth}), boa.env.get_balance(boa.env.eoa), get_price("eth_usd")) == before
+
+
+def test_scenarios_shock_prices_restrict_tiers_and_scale_trades(active_network, setup):
+    """Verify shocks, fee tiers and trade scales reach the run, and a tripped oracle floor is reported."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    base, cheaper_eth, dearer_eth, single_tier, half = run_scenarios([
+        Scenario("base"),
+        Scenario("eth -20%", price_shocks=(("eth_usd", 0.8),)),
+        Scenario("eth +20%", price_shocks=(("eth_usd", 1.2),)),
+        Scenario("0.3% only", fee_tiers=(3000,)),
+        Scenario("half", trade_scale=0.5),
+    ], workers=1)
+
+    assert cheaper_eth.result["prices"]["eth_usd"] == pytest.approx(0.8 * base.result["prices"]["eth_usd"])
+    assert cheaper_eth.result["trades"]["amount_in"] < base.result["trades"]["amount_in"]
+    assert "under 90%" in dearer_eth.error  # the pools did not move with the oracle
+    assert [leg["fee"] for leg in single_tier.result["route"]] == [3000]
+    assert half.result["trades"]["amount_in"] == base.result["trades"]["amount_in"] // 2
+    assert "eth +20%" in format_table([base, dearer_eth])
+
+
+def test_run_scenarios_in_workers_matches_in_process(active_network, setup):
+    """Verify forked workers report the same as runs in this process, in scenario order."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock protocols only")
+    scenarios = scenario_matrix(price_shocks=(0.9, 1.0), fee_tier_sets=((500,), (3000, 10000)))
+
+    in_workers = run_scenarios(scenarios, workers=2)
+    in_process = run_scenarios(scenarios, workers=1)
+
+    assert [r.scenario for r in in_workers] == scenarios
+    assert [(r.result, r.error, r.gas_used) for r in in_workers] == [(r.result, r.error, r.gas_used) for r in in_process]
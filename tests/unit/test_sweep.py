@@ -0,0 +1,75 @@
+# ------------------------------------------------------------------
+#                             IMPORTS
+# ------------------------------------------------------------------
+import numpy as np
+import pytest
+from script._backtest import CostModel, run_backtest
+from script._contract_registry import get_contract
+from script._sweep import SweepParams, format_table, grid, pool_liquidity_usd, random_samples, run_sweep, shared_history
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture(scope="module")
+def history():
+    rng = np.random.default_rng(0)
+    eth = 3000 * np.exp(np.cumsum(rng.normal(0, 0.03, 1000)))
+    return np.arange(1000) * DAY, np.column_stack([np.ones_like(eth), eth])
+
+
+# ------------------------------------------------------------------
+#                          TEST_FUNCTIONS
+# ------------------------------------------------------------------
+def test_grid_and_random_samples():
+    """Verify grids are full products and samples stay in their ranges."""
+    params = grid([0.05, 0.1], [0.3, 0.5], fee_tiers=(500, 3000))
+    samples = random_samples(50, buffer_range=(0.01, 0.02), fee_tiers=(500,), seed=1)
+
+    assert len(params) == 8
+    assert params[0] == SweepParams(0.05, 0.3, 500, 0.9)
+    assert params[0].targets == (0.3, 0.7)
+    assert all(0.01 <= p.buffer <= 0.02 and p.fee_tier == 500 for p in samples)
+
+
+def test_sweep_ranks_by_pnl_and_matches_backtest(history):
+    """Verify the pool gives the same rows as single backtests, best first."""
+    timestamps, prices = history
+    params = grid([0.05, 0.2], [0.3, 0.6], fee_tiers=(500, 10000))
+
+    rows = run_sweep(timestamps, prices, params, workers=2)
+    in_process = run_sweep(timestamps, prices, params, workers=1)
+
+    assert rows == in_process
+    assert [row["pnl"] for row in rows] == sorted((row["pnl"] for row in rows), reverse=True)
+    best = rows[0]
+    expected = run_backtest(
+        timestamps, prices, (best["usdc_target"], 1 - best["usdc_target"]), best["buffer"],
+        costs=CostModel(fee=best["fee_tier"] / 1_000_000), min_out=best["min_out"],
+    )
+    assert best["pnl"] == expected.pnl
+    assert "rank" in format_table(rows)
+
+
+def test_shared_history_is_released():
+    """Verify the shared segments are unlinked when the block exits."""
+    from multiprocessing import shared_memory
+
+    with shared_history(prices=np.ones((3, 2))) as spec:
+        name = spec["prices"][0]
+        assert spec["prices"][1:] == ((3, 2), "<f8")
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_pool_liquidity_is_measured_per_fee_tier(active_network, contracts):
+    """Verify each fee tier gets the depth of its own pool, as configured for the mock pools."""
+    if active_network.name != "pyevm":
+        pytest.skip("mock pools only")
+    usdc, weth = contracts
+    eth_price = get_contract("eth_usd").latestAnswer() / 10 ** 8
+
+    liquidity_usd = pool_liquidity_usd(get_contract("uniswap_quoter"), weth, usdc, eth_price)
+
+    assert list(liquidity_usd) == [100, 500, 3000, 10000]
+    for fee, configured in ((100, 1e6), (500, 2e7), (3000, 1e7), (10000, 1e6)):
+        assert liquidity_usd[fee] == pytest.approx(configured, rel=0.05)